@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import os
+import re
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Asset pipeline for the static site.
+#
+# Shared CSS/JS leave the HTML and become assets/<name>.<hash>.<ext>: the URL
+# changes whenever the content does, so they can be cached for a year
+# (see write_headers) while HTML stays short-lived. Every HTML file is
+# minified, and everything we ship gets precompressed .gz (and .br when the
+# brotli module is installed) siblings for the host to serve directly.
+
+# --- CONFIGURATION ---
+ASSETS_DIR = "assets"
+HEADERS_FILE = "_headers"     # Netlify / Cloudflare Pages cache rules
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+HTML_MAX_AGE = 300           # Seconds a browser or CDN may reuse a page
+CACHE_HTML = f"public, max-age={HTML_MAX_AGE}"
+BROTLI_QUALITY = 11           # Hashed assets: written once, so squeeze hard
+BROTLI_PAGE_QUALITY = 9       # Per-page HTML: thousands of files, keep builds quick
+# ---------------------
+
+_PROTECTED = re.compile(r"(<(script|style|pre|textarea)\b.*?</\2>)", re.DOTALL | re.IGNORECASE)
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};:,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    # Conservative: indentation and blank lines only (no renaming, and comment
+    # stripping is unsafe around URLs in strings)
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def minify_html(text):
+    # Collapses whitespace outside <script>/<style>/<pre>/<textarea>
+    parts = _PROTECTED.split(text)
+    out = []
+    i = 0
+    while i < len(parts):
+        chunk = parts[i]
+        chunk = re.sub(r">\s+<", "><", chunk)
+        chunk = re.sub(r"\s+", " ", chunk)
+        out.append(chunk)
+        if i + 1 < len(parts):
+            block, tag = parts[i + 1], parts[i + 2].lower()
+            if tag == "style":
+                block = re.sub(r"(<style[^>]*>)(.*?)(</style>)", lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), block, flags=re.DOTALL)
+            elif tag == "script":
+                block = re.sub(r"(<script[^>]*>)(.*?)(</script>)", lambda m: m.group(1) + minify_js(m.group(2)) + m.group(3), block, flags=re.DOTALL)
+            out.append(block)
+        i += 3
+    return re.sub(r">\s+<", "><", "".join(out)).strip()
+
+
+def compressed(payload, brotli_quality=BROTLI_QUALITY):
+    # {suffix: bytes} for every precompressed sibling we can produce
+    out = {".gz": gzip.compress(payload, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out[".br"] = brotli.compress(payload, quality=brotli_quality)
+    return out
+
+
+def write_compressed(path, payload, brotli_quality=BROTLI_QUALITY):
+    # path + .gz/.br siblings; returns {"": raw, ".gz": n, ".br": n} byte counts
+    sizes = {"": len(payload)}
+    with open(path, "wb") as f:
+        f.write(payload)
+    for suffix, data in compressed(payload, brotli_quality).items():
+        with open(path + suffix, "wb") as f:
+            f.write(data)
+        sizes[suffix] = len(data)
+    return sizes
+
+
+def write_missing_compressed(path, payload, brotli_quality=BROTLI_QUALITY):
+    # For a file left as is: add any sibling it lacks (e.g. .br once brotli is
+    # installed on a tree first built without it). Returns the suffixes written.
+    suffixes = [".gz"] + ([".br"] if brotli is not None else [])
+    missing = [suffix for suffix in suffixes if not os.path.exists(path + suffix)]
+    if missing:
+        data = compressed(payload, brotli_quality)
+        for suffix in missing:
+            with open(path + suffix, "wb") as f:
+                f.write(data[suffix])
+    return missing
+
+
+def fingerprint(name, text, ext, out_dir=ASSETS_DIR):
+    # assets/<name>.<sha1[:10]>.<ext> (+ .gz/.br). Old versions are left for
+    # retire()/prune(), which know which builds still reference them.
+    payload = text.encode("utf-8")
+    digest = hashlib.sha1(payload).hexdigest()[:10]
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.{digest}.{ext}")
+    if not os.path.exists(path):
+        write_compressed(path, payload)
+    else:
+        write_missing_compressed(path, payload)
+    return f"{out_dir}/{name}.{digest}.{ext}"
+
+
+def references(paths, dirs):
+    # Fingerprinted URLs ("assets/map.<hash>.js") that the files at `paths`
+    # point at, following them into the assets they name (the map JS names
+    # the data file). Missing files are skipped.
+    pattern = re.compile(r"\b((?:%s)/[\w-]+\.[0-9a-f]{10}\.\w+)" % "|".join(re.escape(d) for d in dirs))
+    found, todo = set(), list(paths)
+    while todo:
+        path = todo.pop()
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8", errors="replace") as f:
+            new = set(pattern.findall(f.read())) - found
+        found |= new
+        todo += sorted(new)
+    return sorted(found)
+
+
+def retire(generations, current, now=None, keep_seconds=HTML_MAX_AGE):
+    # generations: [{"at": epoch seconds it went live, "files": [urls]}],
+    # oldest first, as kept in the build manifest. `current` becomes the
+    # newest generation (unless it already is); an older one is dropped once
+    # its successor has been live for keep_seconds, i.e. once no cached page
+    # can still ask for its files. Returns the generations to keep.
+    now = time.time() if now is None else now
+    current = sorted(current)
+    if not generations or generations[-1]["files"] != current:
+        generations = generations + [{"at": now, "files": current}]
+    kept = [g for g, newer in zip(generations, generations[1:]) if now - newer["at"] <= keep_seconds]
+    return kept + generations[-1:]
+
+
+def prune(generations, dirs):
+    # Removes every fingerprinted file (and its .gz/.br) in `dirs` that no
+    # kept generation references. Returns how many files were removed.
+    keep = {url for g in generations for url in g["files"]}
+    hashed = re.compile(r"^[\w-]+\.[0-9a-f]{10}\.\w+$")
+    removed = 0
+    for folder in dirs:
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            base = re.sub(r"\.(gz|br)$", "", filename)
+            if hashed.match(base) and f"{folder}/{base}" not in keep:
+                os.remove(os.path.join(folder, filename))
+                removed += 1
+    return removed
+
+
+def write_headers(immutable_dirs, path=HEADERS_FILE):
+    # Hashed files never change under the same URL; HTML is revalidated often
+    lines = []
+    for folder in immutable_dirs:
+        lines += [f"/{folder}/*", f"  Cache-Control: {CACHE_FOREVER}", ""]
+    lines += ["/*.html", f"  Cache-Control: {CACHE_HTML}", "", "/", f"  Cache-Control: {CACHE_HTML}", ""]
+    write_text_if_changed(path, "\n".join(lines))
+
+
+def write_text_if_changed(path, text):
+    # Leaves the file (and its mtime) alone when it already holds this text
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return True
+
+
+def human(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
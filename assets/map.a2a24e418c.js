@@ -0,0 +1,191 @@
+var map = L.map('map', { zoomControl: false }).setView([39.8283, -98.5795], 5);
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png').addTo(map);
+var quadIcon = L.divIcon({
+className: 'drone-icon',
+html: `<svg viewBox="0 0 24 24" width="24" height="24" fill="#3b82f6"><path d="M21 16.5c0 .38-.21.71-.53.88l-7.97 4.43c-.16.09-.33.14-.5.14s-.34-.05-.5-.14l-7.97-4.43c-.32-.17-.53-.5-.53-.88V7.5c0-.38.21-.71.53-.88l7.97-4.43c.16-.09.33-.14.5-.14s.34.05.5.14l7.97 4.43c.32.17.53.5.53.88v9z"/></svg>`,
+iconSize: [24, 24], iconAnchor: [12, 12]
+});
+// Clusters are precomputed per zoom level at build time and cut into
+// tiles/z/x/y.json, so we only fetch and draw what is on screen.
+// A cluster is [lat, lng, count, count per service...]; a single pilot is
+// [lat, lng, 1, index].
+var MAX_ZOOM = 14, layer = L.layerGroup().addTo(map), tileCache = {}, pilotData = null, drawId = 0;
+// Service filter: the data file carries one bitset per service, so a
+// pilot passes the filter with a single bit test - no object scanning.
+var activeTag = -1, tagBits = null;
+function hasTag(i) { return activeTag < 0 || ((tagBits[i >> 3] >> (i & 7)) & 1) === 1; }
+document.getElementById('service-filter').addEventListener('change', ev => {
+var tag = parseInt(ev.target.value, 10);
+if (tag < 0) { activeTag = -1; redraw(); return; }
+loadData().then(d => {
+var raw = atob(d.tags[tag].bits), bits = new Uint8Array(raw.length);
+for (var i = 0; i < raw.length; i++) bits[i] = raw.charCodeAt(i);
+tagBits = bits; activeTag = tag;
+redraw();
+});
+});
+// Names/links for single pilots come from the content-hashed data file,
+// fetched the first time someone opens a popup.
+function loadData() {
+if (!pilotData) pilotData = fetch('data/pilots.b72f1f2846.json').then(r => r.json());
+return pilotData;
+}
+function getTile(z, x, y) {
+var key = z + '/' + x + '/' + y;
+if (!tileCache[key]) tileCache[key] = fetch('tiles/' + key + '.json').then(r => r.ok ? r.json() : []).catch(() => []);
+return tileCache[key];
+}
+function tileX(lng, n) { return Math.min(n - 1, Math.max(0, Math.floor((lng + 180) / 360 * n))); }
+function tileY(lat, n) {
+var r = lat * Math.PI / 180;
+return Math.min(n - 1, Math.max(0, Math.floor((1 - Math.log(Math.tan(r) + 1 / Math.cos(r)) / Math.PI) / 2 * n)));
+}
+function clusterIcon(count) {
+var size = count < 10 ? 'small' : count < 100 ? 'medium' : 'large';
+return L.divIcon({ html: '<div><span>' + count + '</span></div>', className: 'marker-cluster marker-cluster-' + size, iconSize: [40, 40] });
+}
+function pilotMarker(e) {
+var m = L.marker([e[0], e[1]], {icon: quadIcon});
+m.on('click', () => loadData().then(d => {
+var s = d.strings, i = e[3];
+m.bindPopup('<b>'+escapeHtml(s[d.name[i]])+'</b><br>'+escapeHtml(s[d.city[i]])+', '+escapeHtml(s[d.state[i]])+'<br><a href="pilot/'+escapeHtml(s[d.slug[i]])+'.html">Details</a>').openPopup();
+}));
+return m;
+}
+function redraw() {
+var id = ++drawId, z = Math.max(0, Math.min(MAX_ZOOM, Math.round(map.getZoom()))), n = Math.pow(2, z), b = map.getBounds();
+var wanted = [];
+for (var x = tileX(b.getWest(), n); x <= tileX(b.getEast(), n); x++)
+for (var y = tileY(b.getNorth(), n); y <= tileY(b.getSouth(), n); y++)
+wanted.push(getTile(z, x, y));
+Promise.all(wanted).then(tiles => {
+if (id !== drawId) return;   // A newer pan/zoom already started
+layer.clearLayers();
+tiles.forEach(entries => entries.forEach(e => {
+if (e[2] === 1) { if (hasTag(e[3])) layer.addLayer(pilotMarker(e)); return; }
+var count = activeTag < 0 ? e[2] : e[3 + activeTag];
+if (!count) return;
+L.marker([e[0], e[1]], {icon: clusterIcon(count)})
+.on('click', () => map.setView([e[0], e[1]], map.getZoom() + 2))
+.addTo(layer);
+}));
+});
+}
+map.on('moveend', redraw);
+redraw();
+// Find Near Me: near/<geohash>.json holds every pilot in that cell and
+// the 8 around it, so one small fetch is enough to rank the closest pilots.
+var BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz';
+function geohash(lat, lng, precision) {
+var lat0 = -90, lat1 = 90, lng0 = -180, lng1 = 180, even = true, bit = 0, ch = 0, out = '';
+while (out.length < precision) {
+var mid;
+if (even) { mid = (lng0 + lng1) / 2; ch = ch * 2 + (lng >= mid ? 1 : 0); if (lng >= mid) lng0 = mid; else lng1 = mid; }
+else { mid = (lat0 + lat1) / 2; ch = ch * 2 + (lat >= mid ? 1 : 0); if (lat >= mid) lat0 = mid; else lat1 = mid; }
+even = !even;
+if (++bit === 5) { out += BASE32[ch]; bit = 0; ch = 0; }
+}
+return out;
+}
+function haversineMiles(lat1, lng1, lat2, lng2) {
+var r = Math.PI / 180, a = Math.sin((lat2 - lat1) * r / 2) ** 2 + Math.cos(lat1 * r) * Math.cos(lat2 * r) * Math.sin((lng2 - lng1) * r / 2) ** 2;
+return 7917.5 * Math.asin(Math.sqrt(a));
+}
+function findNearMe() {
+var out = document.getElementById('near-results');
+out.textContent = 'Locating...';
+navigator.geolocation.getCurrentPosition(pos => {
+var lat = pos.coords.latitude, lng = pos.coords.longitude;
+userPos = {lat: lat, lng: lng};
+map.setView([lat, lng], 9);
+fetch('near/' + geohash(lat, lng, 3) + '.json').then(r => r.ok ? r.json() : []).catch(() => []).then(bucket => {
+bucket = bucket.filter(e => hasTag(e[2]));
+if (!bucket.length) { out.textContent = 'No pilots listed near you yet.'; return; }
+bucket.forEach(e => e.miles = haversineMiles(lat, lng, e[0], e[1]));
+bucket.sort((a, b) => a.miles - b.miles);
+loadData().then(d => {
+var s = d.strings;
+out.innerHTML = bucket.slice(0, 5).map(e => '<div><a href="pilot/' + escapeHtml(s[d.slug[e[2]]]) + '.html">' + escapeHtml(s[d.name[e[2]]]) + '</a> &ndash; ' + Math.round(e.miles) + ' mi</div>').join('');
+});
+});
+}, () => { out.textContent = 'Location unavailable.'; });
+}
+// Search: search/<first 2 letters>.json maps every indexed prefix
+// to its pilots, split by geohash cell; pilots' fields live in
+// search/docs/<cell>.json. Cells are read best first and only until
+// none left can beat the last result kept. Ranking matches search_index.search().
+var WEIGHTS = [8, 4, 2, 1], searchFiles = {}, searchId = 0, userPos = null;
+function tokens(text) { return (text || '').toLowerCase().replace(/'/g, '').match(/[a-z0-9]+/g) || []; }
+function getSearch(name) {
+if (!searchFiles[name]) searchFiles[name] = fetch('search/' + name + '.json').then(r => r.ok ? r.json() : null).catch(() => null);
+return searchFiles[name];
+}
+function cellBounds(cell) {
+var box = [-90, 90, -180, 180], even = true;   // south, north, west, east
+for (var c of cell) for (var bit = 4, v = '0123456789bcdefghjkmnpqrstuvwxyz'.indexOf(c); bit >= 0; bit--, even = !even) {
+var i = even ? 2 : 0, mid = (box[i] + box[i + 1]) / 2;
+box[(v >> bit) & 1 ? i : i + 1] = mid;
+}
+return box;
+}
+function cellMiles(from, cell) {
+// Distance to the nearest point of a cell, as search_index.cell_miles()
+if (cell[0] === '_') return Infinity;
+var [south, north, west, east] = cellBounds(cell), lat = from.lat, lng = from.lng;
+if (west <= lng && lng <= east) return haversineMiles(lat, lng, Math.min(Math.max(lat, south), north), lng);
+var mod = x => ((x % 360) + 360) % 360, edge = mod(west - lng) < mod(lng - east) ? west : east;
+var c = Math.cos((lng - edge) * Math.PI / 180);
+if (c <= 0) return Math.min(haversineMiles(lat, lng, south, edge), haversineMiles(lat, lng, north, edge));
+var foot = Math.atan(Math.tan(lat * Math.PI / 180) / c) * 180 / Math.PI;
+return haversineMiles(lat, lng, Math.min(Math.max(foot, south), north), edge);
+}
+function scorePilot(d, terms) {
+if (!d.t) d.t = WEIGHTS.map((w, f) => tokens(d[f]));
+var score = 0;
+for (var q = 0; q < terms.length; q++) {
+var best = 0;
+d.t.forEach((toks, f) => toks.forEach(tok => { if (tok.startsWith(terms[q])) best = Math.max(best, WEIGHTS[f] * (tok === terms[q] ? 2 : 1)); }));
+if (!best) return 0;
+score += best;
+}
+return score;
+}
+async function rankPilots(terms) {
+var prefixes = terms.map(t => t.slice(0, 10));
+var entries = await Promise.all(prefixes.map(p => getSearch(p.slice(0, 2)).then(shard => shard && shard[p])));
+if (entries.some(e => !e)) return [];
+var from = userPos || map.getCenter(), out = [];
+var area = cell => cell[0] === '_' ? cell : cell.slice(0, 2);
+var cells = Object.keys(entries[0]).filter(cell => entries.every(e => cell in e))
+.map(cell => ({cell: cell, bound: entries.reduce((sum, e) => sum + e[cell][0], 0), near: cellMiles(from, cell)}))
+.sort((a, b) => b.bound - a.bound || a.near - b.near || (a.cell < b.cell ? -1 : 1));
+for (var c of cells) {
+var last = out[8 - 1];
+if (last && (c.bound < last.score || (c.bound === last.score && c.near >= last.miles))) break;
+var files = await Promise.all([getSearch('docs/' + c.cell)].concat(entries.map((e, t) =>
+e[c.cell].length > 1 ? e[c.cell].slice(1) : getSearch(prefixes[t] + '/' + area(c.cell)).then(f => (f && f[c.cell]) || []))));
+var docs = files[0] || [], ids = null;
+files.slice(1).forEach(flat => {
+var keep = new Set();
+for (var k = 0; k < flat.length; k += 2) if (!ids || ids.has(flat[k])) keep.add(flat[k]);
+ids = keep;
+});
+ids.forEach(i => {
+var d = docs[i], score = scorePilot(d, terms);
+if (score) out.push({d: d, score: score, miles: d[5] === null ? Infinity : haversineMiles(from.lat, from.lng, d[5], d[6])});
+});
+out = out.sort((a, b) => b.score - a.score || a.miles - b.miles).slice(0, 8);
+}
+return out;
+}
+function escapeHtml(text) { return String(text).replace(/[&<>"']/g, c => '&#' + c.charCodeAt(0) + ';'); }
+document.getElementById('search').addEventListener('input', ev => {
+var id = ++searchId, out = document.getElementById('search-results');
+var terms = tokens(ev.target.value).filter(t => t.length >= 2);
+if (!terms.length) { out.innerHTML = ''; return; }
+rankPilots(terms).then(hits => {
+if (id !== searchId) return;   // A newer keystroke already started
+out.innerHTML = hits.length ? hits.map(h => '<div><a href="pilot/' + escapeHtml(h.d[4]) + '.html">' + escapeHtml(h.d[0]) + '</a> &ndash; ' +
+escapeHtml([h.d[2], h.d[3]].filter(Boolean).join(', ')) + (h.miles < Infinity ? ' &middot; ' + Math.round(h.miles) + ' mi' : '') + '</div>').join('') : 'No pilots found.';
+});
+});
\ No newline at end of file
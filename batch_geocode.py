@@ -0,0 +1,103 @@
+import pandas as pd
+import metrics
+
+# Resolve each distinct (city, state) once, then broadcast back to every row.
+# Any object with a geopy-style .geocode(query, **kwargs) works as the backend
+# (Nominatim, geocode_cache.CachedGeocoder, geocode_cache.StubGeocoder, ...),
+# and so does a plain function with that same signature. Backends that offer
+# .geocode_many(queries) get the whole de-duplicated batch in one call.
+
+
+def clean_column(series):
+    # NaN / "nan" / whitespace all become "", so they group together
+    return series.fillna("").astype(str).str.strip().replace({"nan": "", "NaN": ""})
+
+
+def text_column(df, name):
+    # clean_column(df[name]), or all "" when the CSV has no such column
+    return clean_column(df[name]) if name in df.columns else pd.Series("", index=df.index)
+
+
+def location_keys(df, city_col="City", state_col="State"):
+    city = text_column(df, city_col)
+    state = text_column(df, state_col)
+    return pd.DataFrame({"_city": city.str.title(), "_state": state.str.upper()}, index=df.index)
+
+
+def city_state_query(city, state):
+    return f"{city}, {state}, USA"
+
+
+def geocode_unique(df, geocoder, city_col="City", state_col="State", mask=None,
+                   query=city_state_query, require_city=True, verbose=True, **geocode_kwargs):
+    # Returns (lat, lng, report). lat/lng are float Series aligned to df.index,
+    # NaN where nothing was found or the row was skipped.
+    keys = location_keys(df, city_col, state_col)
+    wanted = keys["_state"] != ""
+    if require_city:
+        wanted &= keys["_city"] != ""
+    if mask is not None:
+        wanted &= mask
+
+    rows = keys[wanted]
+    unique = rows.drop_duplicates().reset_index(drop=True)
+    searches = [query(city, state) for city, state in zip(unique["_city"], unique["_state"])]
+
+    errors = 0
+    if hasattr(geocoder, "geocode_many"):
+        # Concurrent engines (geocode_async.GeocodeEngine) take the whole batch at once
+        if verbose:
+            print(f"Resolving {len(searches)} unique locations concurrently...")
+        errors_before = getattr(geocoder, "errors", 0)
+        results = geocoder.geocode_many(searches)
+        locations = [results.get(search) for search in searches]
+        errors = getattr(geocoder, "errors", 0) - errors_before
+    else:
+        lookup = getattr(geocoder, "geocode", geocoder)
+        locations = []
+        for i, search in enumerate(searches):
+            if verbose:
+                print(f"[{i+1}/{len(searches)}] Resolving: {search}...", end="", flush=True)
+            try:
+                location = lookup(search, **geocode_kwargs)
+            except Exception as e:
+                location = None
+                errors += 1
+                if verbose:
+                    print(f" Error: {e}")
+            else:
+                if verbose:
+                    print(" OK." if location else " No Match.")
+            locations.append(location)
+
+    lats = [location.latitude if location else float("nan") for location in locations]
+    lngs = [location.longitude if location else float("nan") for location in locations]
+
+    unique["_lat"] = pd.Series(lats, dtype="float64")
+    unique["_lng"] = pd.Series(lngs, dtype="float64")
+
+    # Vectorized broadcast: one left-merge instead of a per-row lookup.
+    # A left merge keeps the left frame's row order, so the index lines up.
+    merged = keys.merge(unique, on=["_city", "_state"], how="left")
+    merged.index = df.index
+    lat = merged["_lat"].where(wanted)
+    lng = merged["_lng"].where(wanted)
+
+    metrics.count("geocode_unique_queries", len(unique))
+    metrics.count("geocode_calls_saved", int(wanted.sum()) - len(unique))
+    metrics.count("rows_skipped", len(df) - int(wanted.sum()))
+    report = {
+        "rows": int(wanted.sum()),
+        "unique_locations": len(unique),
+        "calls_saved": int(wanted.sum()) - len(unique),
+        "found": int(lat.notna().sum()),
+        "errors": errors,
+    }
+    return lat, lng, report
+
+
+def print_report(report):
+    print(f"Rows needing a location: {report['rows']}")
+    print(f"Unique locations looked up: {report['unique_locations']}")
+    print(f"Geocoder calls saved by de-duplication: {report['calls_saved']}")
+    print(f"Rows located: {report['found']} ({report['errors']} lookup errors)")
@@ -0,0 +1,330 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+# Benchmark harness for the whole pipeline.
+#
+# For each size it writes a synthetic pilot CSV shaped like the real one
+# (same header, messy legacy Coordinates + latitude/longitude, states weighted
+# like the live directory, a Zipf-ish spread of towns per state with many
+# cities left blank) into a scratch folder, then times every stage on it:
+# loading, location resolution, scatter, chunked streaming, geocoding against
+# a local geocoder with a fixed latency (an in-process fake by default, or
+# the geocode_server.py HTTP stand-in, run in a subprocess, with --geocoder
+# local), and a full + incremental build_site.run_build. Results go to BENCH_FILE and are compared with
+# BASELINE_FILE; anything more than TOLERANCE slower fails the run.
+#
+# Timings are only comparable on the same hardware, so every run also times
+# a fixed calibration workload and the baseline's timings are scaled by how
+# much slower or faster this machine ran it (stages waiting on the fake
+# geocoder's sleep are not scaled). A no-change rebuild slower than the full
+# build fails the run too, baseline or not.
+#
+#   python benchmark.py                      # 1k, 10k, 100k, 1M
+#   python benchmark.py --sizes 1000,10000   # quick
+#   python benchmark.py --save-baseline      # accept the current numbers
+
+# --- CONFIGURATION ---
+SIZES = (1000, 10000, 100000, 1000000)
+BENCH_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+TOLERANCE = 0.5          # Fail when a stage is >50% slower than the baseline...
+MIN_DELTA = 0.05         # ...and at least 50 ms slower (ignores timer noise on tiny stages)
+LATENCY_STAGES = ("geocode_cold",)   # Dominated by GEOCODER_LATENCY, not by CPU speed
+CALIBRATION_ROUNDS = 5
+GEOCODER_LATENCY = 0.02  # Seconds per fake geocoder call
+GEOCODER_CONCURRENCY = 16
+TOWNS_PER_STATE = 40
+BLANK_CITY = 0.35        # Share of pilots with no City (the live CSV has none at all)
+# ---------------------
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Pilots per state in the live directory when the baseline was recorded.
+# Frozen so the synthetic CSVs depend only on the seed: editing the real
+# directory must not change geocode_calls & co. and look like a regression.
+LIVE_STATE_COUNTS = {
+    "AL": 11, "AR": 4, "AZ": 1, "DE": 1, "FL": 6, "GA": 11, "IA": 5, "IL": 5, "IN": 37, "KS": 1, "KY": 14,
+    "LA": 6, "MA": 2, "MD": 9, "MI": 2, "MN": 4, "MO": 37, "MS": 7, "MT": 1, "NC": 15, "NJ": 4, "NY": 2,
+    "OH": 87, "OK": 9, "PA": 8, "SC": 7, "TN": 7, "TX": 7, "VA": 13, "WA": 1, "WI": 58, "WV": 7,
+}
+FIRST = ["James", "John", "Robert", "Michael", "William", "David", "Richard", "Joseph", "Thomas", "Chris",
+         "Daniel", "Matt", "Anthony", "Mark", "Steven", "Paul", "Andrew", "Josh", "Kevin", "Brian",
+         "Mary", "Sarah", "Jessica", "Emily", "Ashley", "Amanda", "Megan", "Rachel", "Laura", "Kelly"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Taylor",
+        "Thomas", "Moore", "Martin", "Jackson", "Thompson", "White", "Harris", "Clark", "Lewis", "Walker",
+        "Hall", "Young", "Allen", "King", "Wright", "Scott", "Green", "Baker", "Adams", "Nelson",
+        "Hill", "Campbell", "Mitchell", "Roberts", "Carter", "Phillips", "Evans", "Turner", "Parker", "Collins"]
+TOWN_START = ["Spring", "Oak", "Cedar", "Maple", "Green", "River", "Lake", "Fair", "Clear", "Mill",
+              "Pine", "Stone", "Elm", "Ash", "Red", "Wood", "Brook", "Glen", "North", "West"]
+TOWN_END = ["field", "ville", "ton", "wood", "dale", "port", "burg", "view", "ford", "land", " City", " Falls"]
+BUSINESS = ["Thermal Deer Recovery", "Ag Spraying", "Aerial Photo & Video", "Drone Mapping", "Roof Inspections",
+            "Whitetail Tracking", "Precision Ag", "Drone Services", "Wildlife Recovery", "Cinematic Media"]
+
+
+def state_weights():
+    # Every state, weighted like the live directory (LIVE_STATE_COUNTS)
+    from gazetteer import STATE_CENTERS
+    states = sorted(STATE_CENTERS)
+    counts = np.array([1.0 + 10 * LIVE_STATE_COUNTS.get(s, 0) for s in states])
+    return states, counts / counts.sum()
+
+
+def synthetic_csv(path, n, seed=0):
+    from gazetteer import STATE_CENTERS
+    rng = np.random.default_rng(seed)
+    states, weights = state_weights()
+    state = np.array(states)[rng.choice(len(states), n, p=weights)]
+    # Zipf-ish towns: a handful of big towns per state, a long tail of small ones
+    rank = np.minimum(rng.zipf(1.6, n), TOWNS_PER_STATE) - 1
+    salt = np.array([zlib.crc32(s.encode()) for s in state])
+    town = [f"{TOWN_START[(r + h) % len(TOWN_START)]}{TOWN_END[(r * 7 + h) % len(TOWN_END)]}" for r, h in zip(rank, salt)]
+    city = np.where(rng.random(n) < BLANK_CITY, "", town)
+    first = np.array(FIRST)[rng.integers(0, len(FIRST), n)]
+    # A per-row tag keeps every synthetic pilot distinct: same name + state
+    # would otherwise be merged as one pilot by slug_registry
+    last = np.char.add(np.array(LAST)[rng.integers(0, len(LAST), n)], [f"-{i:x}" for i in range(n)])
+    center = np.array([STATE_CENTERS[s] for s in state])
+    # Legacy position fields: scattered Coordinates for everyone, latitude/longitude for
+    # ~60% of rows and pointing at a random (often wrong) state, like the live CSV
+    clat, clng = center[:, 0] + rng.uniform(-0.5, 0.5, n), center[:, 1] + rng.uniform(-0.6, 0.6, n)
+    wrong = np.array([STATE_CENTERS[s] for s in np.array(states)[rng.integers(0, len(states), n)]])
+    has_ll = rng.random(n) < 0.6
+    df = pd.DataFrame({
+        "Name": np.char.add(np.char.add(first, " "), last),
+        "First Name": first, "Last Name": last,
+        "Business": np.array(BUSINESS)[rng.integers(0, len(BUSINESS), n)],
+        "Email": "", "Website": "", "City": city, "State": state, "Bio": "",
+        "Rating": 5.0, "Photo URL": "", "Profile Link": [f"https://www.dronedeerrecovery.com/pilot/p{i:x}" for i in range(n)],
+        "Found_Phone": [f"{a}-{b}-{c}" for a, b, c in zip(rng.integers(200, 999, n), rng.integers(200, 999, n), rng.integers(1000, 9999, n))],
+        "Source_Link": "",
+        "Coordinates": [f"{a}, {b}" for a, b in zip(clat, clng)],
+        "latitude": np.where(has_ll, wrong[:, 0], np.nan),
+        "longitude": np.where(has_ll, wrong[:, 1], np.nan),
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+class FakeGeocoder:
+    # Stand-in for a network geocoder: sleeps `latency`, answers every query
+    # with a stable point derived from the query text
+    def __init__(self, latency=GEOCODER_LATENCY):
+        self.latency = latency
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        from geocode_cache import Location
+        self.calls += 1
+        time.sleep(self.latency)
+        h = zlib.crc32(str(query).encode())
+        return Location(25 + (h % 2400) / 100, -124 + (h // 2400 % 5700) / 100)
+
+
+def calibrate(rounds=CALIBRATION_ROUNDS):
+    # Best-of-N seconds for a fixed mix of the work the stages do: Python
+    # loops over strings, JSON, pandas parsing and numpy sorting
+    values = np.random.default_rng(0).random(200000)
+    text = pd.DataFrame({"v": values[:50000]}).to_csv(index=False)
+
+    def work():
+        sorted(f"{v:.6f}" for v in values[:50000])
+        json.loads(json.dumps([{"i": i, "s": str(i)} for i in range(30000)]))
+        pd.read_csv(io.StringIO(text))
+        np.sort(values)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 4)
+
+
+def timed(results, key, fn):
+    start = time.perf_counter()
+    value = fn()
+    results[key] = round(time.perf_counter() - start, 4)
+    return value
+
+
+def run_size(n, workdir, latency=GEOCODER_LATENCY, backend="fake"):
+    # Every stage for one size; returns {stage: seconds}
+    import build_site
+    import locations
+    import scatter
+    import stream_csv
+    from batch_geocode import geocode_unique
+    from geocode_async import GeocodeEngine, Provider
+    from geocode_cache import GeocodeCache, geocoder_backend
+    from pilot_store import PilotStore
+    from slug_registry import SlugRegistry
+
+    results = {}
+    raw = os.path.join(workdir, "raw.csv")
+    csv_path = os.path.join(workdir, "drone_pilots_WITH_PHONES_FINAL.csv")
+    synthetic_csv(raw, n)
+
+    df = timed(results, "read_csv", lambda: pd.read_csv(raw))
+    timed(results, "resolve", lambda: locations.resolve(df))
+    df.to_csv(csv_path, index=False)
+    slugs = scatter.frame_slugs(df, SlugRegistry(path=os.path.join(workdir, "slugs.json")))
+    timed(results, "scatter", lambda: scatter.displace(df["latitude"], df["longitude"], slugs, df["State"], df["location_precision"]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        timed(results, "stream_resolve", lambda: stream_csv.stream(raw, os.path.join(workdir, "streamed.csv"),
+                                                                   [stream_csv.resolve_stage()]))
+
+    timed(results, "store_from_csv", lambda: PilotStore.from_csv(csv_path))
+    PilotStore.load(csv_path)
+    timed(results, "store_snapshot", lambda: PilotStore.load(csv_path))
+
+    # Geocoding: every unique City/State through the async engine and a fake
+    # provider, cold (empty cache) and then warm
+    geocoder = FakeGeocoder(latency) if backend == "fake" else geocoder_backend(backend)
+    provider = Provider(backend, geocoder, rate=1000, burst=GEOCODER_CONCURRENCY, concurrency=GEOCODER_CONCURRENCY)
+    engine = GeocodeEngine([provider], cache=GeocodeCache(os.path.join(workdir, "cache.sqlite")))
+    _, _, report = timed(results, "geocode_cold", lambda: geocode_unique(df, engine, verbose=False))
+    timed(results, "geocode_warm", lambda: geocode_unique(df, engine, verbose=False))
+    results["geocode_calls"] = provider.calls
+    results["geocode_unique"] = report["unique_locations"]
+
+    # Full build, then a no-change rebuild (should skip every page)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            timed(results, "build", lambda: build_site.run_build(db_file=csv_path))
+            timed(results, "build_incremental", lambda: build_site.run_build(db_file=csv_path))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def check(current):
+    # Regressions visible in one run: a rebuild with nothing to do must beat the full build
+    problems = []
+    for size, stages in current["results"].items():
+        if "build" in stages and stages.get("build_incremental", 0) >= stages["build"]:
+            problems.append(f"{size:>8} build_incremental: {stages['build_incremental']:.3f}s, "
+                            f"not below build {stages['build']:.3f}s")
+    return problems
+
+
+def machine_scale(current, baseline):
+    # How much slower this machine ran the calibration than the baseline's
+    # (None when the baseline predates calibration)
+    ours, theirs = current["meta"].get("calibration"), baseline.get("meta", {}).get("calibration")
+    return ours / theirs if ours and theirs else None
+
+
+def compare(current, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    # Returns a list of regression messages (empty = pass). Counters such as
+    # geocode_calls must match exactly; timings get the tolerance after the
+    # baseline's are scaled to this machine, and are skipped when they can't be.
+    problems = []
+    scale = machine_scale(current, baseline)
+    for size, stages in current["results"].items():
+        base = baseline.get("results", {}).get(size, {})
+        for stage, value in stages.items():
+            if stage not in base:
+                continue
+            old = base[stage]
+            if isinstance(value, int):
+                if value != old:
+                    problems.append(f"{size:>8} {stage}: {old} -> {value}")
+                continue
+            if scale is None:
+                continue
+            expected = old if stage in LATENCY_STAGES else old * scale
+            if value > expected * (1 + tolerance) and value - expected > min_delta:
+                problems.append(f"{size:>8} {stage}: {expected:.3f}s expected -> {value:.3f}s ({value / expected:.1f}x)")
+    return problems
+
+
+def print_table(results):
+    stages = list(next(iter(results.values())))
+    print(f"{'stage':<18}" + "".join(f"{size:>12}" for size in results))
+    for stage in stages:
+        cells = [results[size].get(stage, "") for size in results]
+        print(f"{stage:<18}" + "".join(f"{c:>12}" if isinstance(c, int) else f"{c:>11.3f}s" for c in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the build and geocoding pipeline.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES))
+    parser.add_argument("--latency", type=float, default=GEOCODER_LATENCY, help="fake geocoder seconds per call")
+    parser.add_argument("--geocoder", default="fake",
+                        help="fake (in-process), local (starts the HTTP stand-in) or a Nominatim-compatible URL")
+    parser.add_argument("--out", default=BENCH_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+    sys.path.insert(0, HERE)
+
+    backend, server = args.geocoder, None
+    if backend == "local":
+        # Same latency, but through real HTTP + geopy parsing, served from
+        # another process so it doesn't share the benchmark's GIL
+        from geocode_server import serve_in_subprocess
+        server, backend = serve_in_subprocess(latency=args.latency)
+
+    calibration = calibrate()
+    results = {}
+    for n in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp(prefix=f"bench-{n}-")
+        try:
+            print(f"Benchmarking {n} pilots...", flush=True)
+            results[str(n)] = run_size(n, workdir, args.latency, backend)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if server is not None:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "processor": platform.processor(), "cpus": os.cpu_count(), "calibration": calibration,
+                 "geocoder": args.geocoder, "geocoder_latency": args.latency,
+                 "when": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("------------------------------------------------")
+    print_table(results)
+    print("------------------------------------------------")
+
+    problems = check(report)
+    compared = False
+    if args.save_baseline:
+        if not problems:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems += compare(report, baseline)
+        compared = True
+        scale = machine_scale(report, baseline)
+        if scale is None:
+            print(f"{args.baseline} has no calibration: timings not compared, re-record it with --save-baseline.")
+        else:
+            print(f"This machine ran the calibration {scale:.2f}x as long as the baseline's.")
+    else:
+        print(f"No baseline yet - run with --save-baseline to create {args.baseline}.")
+    if problems:
+        print("PERFORMANCE REGRESSION:")
+        for line in problems:
+            print("  " + line)
+        sys.exit(1)
+    if compared:
+        print(f"No regressions against {args.baseline}.")
@@ -1,9 +1,23 @@
-import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import html
 import os
-import re
 import json
-import random
+import time
 from datetime import datetime
+import numpy as np
+import cluster_tiles
+import spatial_index
+import search_index
+from pilot_store import PilotStore
+from slug_registry import SlugRegistry
+import scatter
+import service_tags
+import sitemap
+import assets
+import images
+import metrics
 
 # --- CONFIGURATION ---
 DB_FILE = "drone_pilots_WITH_PHONES_FINAL" 
@@ -13,14 +27,67 @@ if not os.path.exists(DB_FILE) and os.path.exists(DB_FILE + ".csv"):
 BRAND_NAME = "Direct Drone Recovery"
 TAGLINE = "Find thermal, ag, and photo drone pilots directly. No fees. No Middleman."
 DOMAIN = "https://dnilgis.github.io/drone-recovery" 
+PAGES_DIR = "pilot"
+DATA_DIR = "data"
+TILES_DIR = "tiles"
+NEAR_DIR = "near"
+MANIFEST_FILE = ".build_manifest.json"
+REDIRECTS_FILE = "_redirects"   # Netlify / Cloudflare Pages
+REDIRECT_STUBS = True           # Also write stub pages for old slugs (GitHub Pages has no 301s)
 
-def clean_slug(text):
-    text = str(text).lower()
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    return text.strip('-')
+# Leaflet stays on unpkg, pinned to 1.9.4 with Subresource Integrity hashes
+# so a tampered or swapped CDN file is refused by the browser
+LEAFLET_CSS = ('<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" '
+               'integrity="sha256-p4NxAoJBhIIN+hmNHrzRCf9tD/miZyoHS5obTRR9BMY=" crossorigin=""/>')
+LEAFLET_JS = ('<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js" '
+              'integrity="sha256-20nQCchB9co0qIjJZRGuk2/Z9VM+kNiyxNV1lvTlZBo=" crossorigin=""></script>')
 
-def get_jitter():
-    return random.uniform(-0.04, 0.04)
+# --- SHARED STYLESHEETS ---
+# Plain CSS (not format templates), shipped once as assets/<name>.<hash>.css.
+# The cluster bubble rules are the ones we used from MarkerCluster.Default.css;
+# the markercluster plugin itself is not loaded since clusters come prebuilt.
+INDEX_CSS = """
+body, html { margin: 0; padding: 0; height: 100%; font-family: sans-serif; overflow: hidden; }
+#map { height: 100vh; width: 100vw; z-index: 1; }
+.info-box {
+    position: absolute; top: 20px; right: 20px; width: 300px;
+    background: rgba(255, 255, 255, 0.95); padding: 20px;
+    border-radius: 8px; box-shadow: 0 4px 15px rgba(0,0,0,0.15);
+    z-index: 1000; border: 1px solid #e0e0e0;
+}
+.btn {
+    display: block; width: 100%; padding: 12px 0; margin-bottom: 10px;
+    border-radius: 4px; font-weight: bold; text-align: center;
+    text-decoration: none; font-size: 0.9rem;
+}
+.btn-blue { background: #3b82f6; color: white; }
+.btn-green { background: #10b981; color: white; }
+.marker-cluster { background-clip: padding-box; border-radius: 20px; }
+.marker-cluster div { width: 30px; height: 30px; margin-left: 5px; margin-top: 5px; text-align: center; border-radius: 15px; font: 12px "Helvetica Neue", Arial, Helvetica, sans-serif; }
+.marker-cluster span { line-height: 30px; }
+.marker-cluster-small { background-color: rgba(181, 226, 140, 0.6); }
+.marker-cluster-small div { background-color: rgba(110, 204, 57, 0.6); }
+.marker-cluster-medium { background-color: rgba(241, 211, 87, 0.6); }
+.marker-cluster-medium div { background-color: rgba(240, 194, 12, 0.6); }
+.marker-cluster-large { background-color: rgba(253, 156, 115, 0.6); }
+.marker-cluster-large div { background-color: rgba(241, 128, 23, 0.6); }
+"""
+
+PROFILE_CSS = """
+body { font-family: -apple-system, sans-serif; background: #f8fafc; color: #1e293b; margin: 0; padding: 20px; }
+.container { max-width: 650px; margin: 40px auto; background: white; padding: 40px; border-radius: 12px; border-top: 8px solid #2563eb; box-shadow: 0 4px 6px rgba(0,0,0,0.05); }
+.v-badge { display: none; background: #f59e0b; color: white; padding: 4px 10px; border-radius: 4px; font-weight: 800; font-size: 0.65rem; width: fit-content; margin-bottom: 20px; box-shadow: 0 0 15px rgba(245, 158, 11, 0.6); }
+h1 { margin: 0; font-size: 2.2rem; color: #0f172a; letter-spacing: -0.5px; }
+.meta { color: #64748b; font-size: 1rem; margin-bottom: 30px; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 12px; margin: 30px 0; }
+.card { background: #f1f5f9; padding: 15px; border-radius: 8px; text-align: center; }
+.label { color: #64748b; font-size: 0.65rem; text-transform: uppercase; font-weight: 800; display: block; }
+.val { font-weight: 700; color: #0f172a; font-size: 1rem; }
+.bio { line-height: 1.7; color: #334155; font-size: 0.95rem; }
+.call-btn { display: block; background: #16a34a; color: white; padding: 18px; text-align: center; font-weight: 800; text-decoration: none; border-radius: 8px; font-size: 1.1rem; margin-top: 35px; transition: 0.2s; }
+.call-btn:hover { background: #15803d; }
+.headshot { float: right; width: 128px; height: 128px; border-radius: 50%; object-fit: cover; margin: 0 0 12px 16px; }
+"""
 
 # --- LIGHT THEME CLUSTERED MAP ---
 index_html = """
@@ -30,45 +97,34 @@ index_html = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{brand} | Find Local Pilots</title>
-    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
-    <link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.4.1/dist/MarkerCluster.css"/>
-    <link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.4.1/dist/MarkerCluster.Default.css"/>
-    <style>
-        body, html {{ margin: 0; padding: 0; height: 100%; font-family: sans-serif; overflow: hidden; }}
-        #map {{ height: 100vh; width: 100vw; z-index: 1; }}
-        .info-box {{
-            position: absolute; top: 20px; right: 20px; width: 300px;
-            background: rgba(255, 255, 255, 0.95); padding: 20px;
-            border-radius: 8px; box-shadow: 0 4px 15px rgba(0,0,0,0.15);
-            z-index: 1000; border: 1px solid #e0e0e0;
-        }}
-        .btn {{
-            display: block; width: 100%; padding: 12px 0; margin-bottom: 10px;
-            border-radius: 4px; font-weight: bold; text-align: center;
-            text-decoration: none; font-size: 0.9rem;
-        }}
-        .btn-blue {{ background: #3b82f6; color: white; }}
-        .btn-green {{ background: #10b981; color: white; }}
-    </style>
+    {leaflet_css}
+    <link rel="stylesheet" href="{css_url}">
 </head>
 <body>
 <div class="info-box">
     <h1>🦌 {brand}</h1>
     <span style="font-weight:bold;">{count} Pilots Available</span>
     <p style="font-size:0.8rem; color:#666;">{tagline}</p>
+    <input id="search" type="search" autocomplete="off" placeholder="Search name, business, town or state" style="width:100%; box-sizing:border-box; padding:10px; margin-bottom:6px; border-radius:4px; border:1px solid #ccc;">
+    <div id="search-results" style="font-size:0.8rem; margin-bottom:12px;"></div>
     <label style="font-size:0.75rem; font-weight:bold; color:#555;">Filter by Service:</label>
-    <select style="width:100%; padding:10px; margin-bottom:15px; border-radius:4px; border:1px solid #ccc;">
-        <option>Show All Services</option>
-        <option>Thermal Recovery</option>
-        <option>Agriculture</option>
+    <select id="service-filter" style="width:100%; padding:10px; margin-bottom:15px; border-radius:4px; border:1px solid #ccc;">
+        <option value="-1">Show All Services</option>
+{service_options}
     </select>
-    <a href="#" class="btn btn-blue" onclick="alert('Locating...');">📍 Find Near Me</a>
+    <a href="#" class="btn btn-blue" onclick="findNearMe(); return false;">📍 Find Near Me</a>
+    <div id="near-results" style="font-size:0.8rem; margin-bottom:10px;"></div>
     <a href="join.html" class="btn btn-green">➕ Add Me To Map</a>
 </div>
 <div id="map"></div>
-<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-<script src="https://unpkg.com/leaflet.markercluster@1.4.1/dist/leaflet.markercluster.js"></script>
-<script>
+{leaflet_js}
+<script src="{js_url}"></script>
+</body>
+</html>
+"""
+
+# Map script; formatted like the page templates, then shipped as assets/map.<hash>.js
+index_js = """
     var map = L.map('map', {{ zoomControl: false }}).setView([39.8283, -98.5795], 5);
     L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png').addTo(map);
 
@@ -78,42 +134,610 @@ index_html = """
         iconSize: [24, 24], iconAnchor: [12, 12]
     }});
 
-    var markers = L.markerClusterGroup();
-    var pilots = {json_data};
-    
-    pilots.forEach(p => {{
-        var m = L.marker([p.lat, p.lng], {{icon: quadIcon}}).bindPopup('<b>'+p.name+'</b><br>'+p.city+', '+p.state+'<br><a href="'+p.url+'">Details</a>');
-        markers.addLayer(m);
+    // Clusters are precomputed per zoom level at build time and cut into
+    // {tiles_dir}/z/x/y.json, so we only fetch and draw what is on screen.
+    // A cluster is [lat, lng, count, count per service...]; a single pilot is
+    // [lat, lng, 1, index].
+    var MAX_ZOOM = {max_zoom}, layer = L.layerGroup().addTo(map), tileCache = {{}}, pilotData = null, drawId = 0;
+
+    // Service filter: the data file carries one bitset per service, so a
+    // pilot passes the filter with a single bit test - no object scanning.
+    var activeTag = -1, tagBits = null;
+    function hasTag(i) {{ return activeTag < 0 || ((tagBits[i >> 3] >> (i & 7)) & 1) === 1; }}
+    document.getElementById('service-filter').addEventListener('change', ev => {{
+        var tag = parseInt(ev.target.value, 10);
+        if (tag < 0) {{ activeTag = -1; redraw(); return; }}
+        loadData().then(d => {{
+            var raw = atob(d.tags[tag].bits), bits = new Uint8Array(raw.length);
+            for (var i = 0; i < raw.length; i++) bits[i] = raw.charCodeAt(i);
+            tagBits = bits; activeTag = tag;
+            redraw();
+        }});
     }});
-    map.addLayer(markers);
-</script>
+
+    // Names/links for single pilots come from the content-hashed data file,
+    // fetched the first time someone opens a popup.
+    function loadData() {{
+        if (!pilotData) pilotData = fetch('{data_url}').then(r => r.json());
+        return pilotData;
+    }}
+    function getTile(z, x, y) {{
+        var key = z + '/' + x + '/' + y;
+        if (!tileCache[key]) tileCache[key] = fetch('{tiles_dir}/' + key + '.json').then(r => r.ok ? r.json() : []).catch(() => []);
+        return tileCache[key];
+    }}
+    function tileX(lng, n) {{ return Math.min(n - 1, Math.max(0, Math.floor((lng + 180) / 360 * n))); }}
+    function tileY(lat, n) {{
+        var r = lat * Math.PI / 180;
+        return Math.min(n - 1, Math.max(0, Math.floor((1 - Math.log(Math.tan(r) + 1 / Math.cos(r)) / Math.PI) / 2 * n)));
+    }}
+    function clusterIcon(count) {{
+        var size = count < 10 ? 'small' : count < 100 ? 'medium' : 'large';
+        return L.divIcon({{ html: '<div><span>' + count + '</span></div>', className: 'marker-cluster marker-cluster-' + size, iconSize: [40, 40] }});
+    }}
+    function pilotMarker(e) {{
+        var m = L.marker([e[0], e[1]], {{icon: quadIcon}});
+        m.on('click', () => loadData().then(d => {{
+            var s = d.strings, i = e[3];
+            m.bindPopup('<b>'+escapeHtml(s[d.name[i]])+'</b><br>'+escapeHtml(s[d.city[i]])+', '+escapeHtml(s[d.state[i]])+'<br><a href="{pages_dir}/'+escapeHtml(s[d.slug[i]])+'.html">Details</a>').openPopup();
+        }}));
+        return m;
+    }}
+    function redraw() {{
+        var id = ++drawId, z = Math.max(0, Math.min(MAX_ZOOM, Math.round(map.getZoom()))), n = Math.pow(2, z), b = map.getBounds();
+        var wanted = [];
+        for (var x = tileX(b.getWest(), n); x <= tileX(b.getEast(), n); x++)
+            for (var y = tileY(b.getNorth(), n); y <= tileY(b.getSouth(), n); y++)
+                wanted.push(getTile(z, x, y));
+        Promise.all(wanted).then(tiles => {{
+            if (id !== drawId) return;   // A newer pan/zoom already started
+            layer.clearLayers();
+            tiles.forEach(entries => entries.forEach(e => {{
+                if (e[2] === 1) {{ if (hasTag(e[3])) layer.addLayer(pilotMarker(e)); return; }}
+                var count = activeTag < 0 ? e[2] : e[3 + activeTag];
+                if (!count) return;
+                L.marker([e[0], e[1]], {{icon: clusterIcon(count)}})
+                    .on('click', () => map.setView([e[0], e[1]], map.getZoom() + 2))
+                    .addTo(layer);
+            }}));
+        }});
+    }}
+    map.on('moveend', redraw);
+    redraw();
+
+    // Find Near Me: {near_dir}/<geohash>.json holds every pilot in that cell and
+    // the 8 around it, so one small fetch is enough to rank the closest pilots.
+    var BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz';
+    function geohash(lat, lng, precision) {{
+        var lat0 = -90, lat1 = 90, lng0 = -180, lng1 = 180, even = true, bit = 0, ch = 0, out = '';
+        while (out.length < precision) {{
+            var mid;
+            if (even) {{ mid = (lng0 + lng1) / 2; ch = ch * 2 + (lng >= mid ? 1 : 0); if (lng >= mid) lng0 = mid; else lng1 = mid; }}
+            else {{ mid = (lat0 + lat1) / 2; ch = ch * 2 + (lat >= mid ? 1 : 0); if (lat >= mid) lat0 = mid; else lat1 = mid; }}
+            even = !even;
+            if (++bit === 5) {{ out += BASE32[ch]; bit = 0; ch = 0; }}
+        }}
+        return out;
+    }}
+    function haversineMiles(lat1, lng1, lat2, lng2) {{
+        var r = Math.PI / 180, a = Math.sin((lat2 - lat1) * r / 2) ** 2 + Math.cos(lat1 * r) * Math.cos(lat2 * r) * Math.sin((lng2 - lng1) * r / 2) ** 2;
+        return 7917.5 * Math.asin(Math.sqrt(a));
+    }}
+    function findNearMe() {{
+        var out = document.getElementById('near-results');
+        out.textContent = 'Locating...';
+        navigator.geolocation.getCurrentPosition(pos => {{
+            var lat = pos.coords.latitude, lng = pos.coords.longitude;
+            userPos = {{lat: lat, lng: lng}};
+            map.setView([lat, lng], 9);
+            fetch('{near_dir}/' + geohash(lat, lng, {near_precision}) + '.json').then(r => r.ok ? r.json() : []).catch(() => []).then(bucket => {{
+                bucket = bucket.filter(e => hasTag(e[2]));
+                if (!bucket.length) {{ out.textContent = 'No pilots listed near you yet.'; return; }}
+                bucket.forEach(e => e.miles = haversineMiles(lat, lng, e[0], e[1]));
+                bucket.sort((a, b) => a.miles - b.miles);
+                loadData().then(d => {{
+                    var s = d.strings;
+                    out.innerHTML = bucket.slice(0, 5).map(e => '<div><a href="{pages_dir}/' + escapeHtml(s[d.slug[e[2]]]) + '.html">' + escapeHtml(s[d.name[e[2]]]) + '</a> &ndash; ' + Math.round(e.miles) + ' mi</div>').join('');
+                }});
+            }});
+        }}, () => {{ out.textContent = 'Location unavailable.'; }});
+    }}
+
+    // Search: {search_dir}/<first {shard_chars} letters>.json maps every indexed prefix
+    // to its pilots, split by geohash cell; pilots' fields live in
+    // {search_dir}/docs/<cell>.json. Cells are read best first and only until
+    // none left can beat the last result kept. Ranking matches search_index.search().
+    var WEIGHTS = {field_weights}, searchFiles = {{}}, searchId = 0, userPos = null;
+    function tokens(text) {{ return (text || '').toLowerCase().replace(/'/g, '').match(/[a-z0-9]+/g) || []; }}
+    function getSearch(name) {{
+        if (!searchFiles[name]) searchFiles[name] = fetch('{search_dir}/' + name + '.json').then(r => r.ok ? r.json() : null).catch(() => null);
+        return searchFiles[name];
+    }}
+    function cellBounds(cell) {{
+        var box = [-90, 90, -180, 180], even = true;   // south, north, west, east
+        for (var c of cell) for (var bit = 4, v = '0123456789bcdefghjkmnpqrstuvwxyz'.indexOf(c); bit >= 0; bit--, even = !even) {{
+            var i = even ? 2 : 0, mid = (box[i] + box[i + 1]) / 2;
+            box[(v >> bit) & 1 ? i : i + 1] = mid;
+        }}
+        return box;
+    }}
+    function cellMiles(from, cell) {{
+        // Distance to the nearest point of a cell, as search_index.cell_miles()
+        if (cell[0] === '_') return Infinity;
+        var [south, north, west, east] = cellBounds(cell), lat = from.lat, lng = from.lng;
+        if (west <= lng && lng <= east) return haversineMiles(lat, lng, Math.min(Math.max(lat, south), north), lng);
+        var mod = x => ((x % 360) + 360) % 360, edge = mod(west - lng) < mod(lng - east) ? west : east;
+        var c = Math.cos((lng - edge) * Math.PI / 180);
+        if (c <= 0) return Math.min(haversineMiles(lat, lng, south, edge), haversineMiles(lat, lng, north, edge));
+        var foot = Math.atan(Math.tan(lat * Math.PI / 180) / c) * 180 / Math.PI;
+        return haversineMiles(lat, lng, Math.min(Math.max(foot, south), north), edge);
+    }}
+    function scorePilot(d, terms) {{
+        if (!d.t) d.t = WEIGHTS.map((w, f) => tokens(d[f]));
+        var score = 0;
+        for (var q = 0; q < terms.length; q++) {{
+            var best = 0;
+            d.t.forEach((toks, f) => toks.forEach(tok => {{ if (tok.startsWith(terms[q])) best = Math.max(best, WEIGHTS[f] * (tok === terms[q] ? 2 : 1)); }}));
+            if (!best) return 0;
+            score += best;
+        }}
+        return score;
+    }}
+    async function rankPilots(terms) {{
+        var prefixes = terms.map(t => t.slice(0, {max_prefix}));
+        var entries = await Promise.all(prefixes.map(p => getSearch(p.slice(0, {shard_chars})).then(shard => shard && shard[p])));
+        if (entries.some(e => !e)) return [];
+        var from = userPos || map.getCenter(), out = [];
+        var area = cell => cell[0] === '_' ? cell : cell.slice(0, {split_precision});
+        var cells = Object.keys(entries[0]).filter(cell => entries.every(e => cell in e))
+            .map(cell => ({{cell: cell, bound: entries.reduce((sum, e) => sum + e[cell][0], 0), near: cellMiles(from, cell)}}))
+            .sort((a, b) => b.bound - a.bound || a.near - b.near || (a.cell < b.cell ? -1 : 1));
+        for (var c of cells) {{
+            var last = out[{results} - 1];
+            if (last && (c.bound < last.score || (c.bound === last.score && c.near >= last.miles))) break;
+            var files = await Promise.all([getSearch('docs/' + c.cell)].concat(entries.map((e, t) =>
+                e[c.cell].length > 1 ? e[c.cell].slice(1) : getSearch(prefixes[t] + '/' + area(c.cell)).then(f => (f && f[c.cell]) || []))));
+            var docs = files[0] || [], ids = null;
+            files.slice(1).forEach(flat => {{
+                var keep = new Set();
+                for (var k = 0; k < flat.length; k += 2) if (!ids || ids.has(flat[k])) keep.add(flat[k]);
+                ids = keep;
+            }});
+            ids.forEach(i => {{
+                var d = docs[i], score = scorePilot(d, terms);
+                if (score) out.push({{d: d, score: score, miles: d[5] === null ? Infinity : haversineMiles(from.lat, from.lng, d[5], d[6])}});
+            }});
+            out = out.sort((a, b) => b.score - a.score || a.miles - b.miles).slice(0, {results});
+        }}
+        return out;
+    }}
+    function escapeHtml(text) {{ return String(text).replace(/[&<>"']/g, c => '&#' + c.charCodeAt(0) + ';'); }}
+    document.getElementById('search').addEventListener('input', ev => {{
+        var id = ++searchId, out = document.getElementById('search-results');
+        var terms = tokens(ev.target.value).filter(t => t.length >= {min_prefix});
+        if (!terms.length) {{ out.innerHTML = ''; return; }}
+        rankPilots(terms).then(hits => {{
+            if (id !== searchId) return;   // A newer keystroke already started
+            out.innerHTML = hits.length ? hits.map(h => '<div><a href="{pages_dir}/' + escapeHtml(h.d[4]) + '.html">' + escapeHtml(h.d[0]) + '</a> &ndash; ' +
+                escapeHtml([h.d[2], h.d[3]].filter(Boolean).join(', ')) + (h.miles < Infinity ? ' &middot; ' + Math.round(h.miles) + ' mi' : '') + '</div>').join('') : 'No pilots found.';
+        }});
+    }});
+"""
+
+# --- PILOT PROFILE PAGE ---
+profile_html = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{name} - Professional Pilot</title>
+    {stylesheet}
+</head>
+<body>
+    <div class="container">
+        <nav><a href="../index.html" style="color:#2563eb; text-decoration:none; font-weight:700; font-size:0.85rem;">&larr; BACK TO DIRECTORY</a></nav>
+        <div class="v-badge" style="margin-top:25px;">VERIFIED OPERATOR</div>
+        {photo}
+        <h1>{name}</h1>
+        <div class="meta">{city}, {state} &bull; Professional Drone Services</div>
+        <div class="grid">
+            <div class="card"><span class="label">Service Area</span><span class="val">{state}</span></div>
+            <div class="card"><span class="label">Specialty</span><span class="val">Thermal / Agri</span></div>
+        </div>
+        <div class="bio">{bio}</div>
+        <a href="tel:{tel}" class="call-btn">CALL PILOT: {phone}</a>
+    </div>
 </body>
 </html>
 """
 
-def run_build():
-    if not os.path.exists("pilot"): os.makedirs("pilot")
+def content_hash(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def inputs_hash(*parts):
+    # content_hash for stage inputs: arrays go in as raw bytes, modules as
+    # their source (a code change rebuilds the stage), the rest as JSON
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(f"{part.dtype}{part.shape}".encode("utf-8"))
+            h.update(np.ascontiguousarray(part).tobytes())
+        elif hasattr(part, "__file__"):
+            with open(part.__file__, "rb") as f:
+                h.update(f.read())
+        else:
+            h.update(json.dumps(part, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+def cached_stage(name, out_dir, inputs, build, old, manifest, force=False):
+    # Runs build() (-> JSON-able result) unless the inputs hash matches the
+    # last build's and its output folder is still there; either way the hash
+    # and result go into the new manifest. Returns (result, ran).
+    key = inputs_hash(*inputs)
+    last = old.get("stages", {}).get(name, {})
+    ran = force or last.get("hash") != key or not os.path.isdir(out_dir)
+    result = build() if ran else last["result"]
+    manifest.setdefault("stages", {})[name] = {"hash": key, "result": result}
+    return result, ran
+
+def load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {"pages": {}}
+
+def save_manifest(manifest):
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_FILE)
+
+def display_phone(e164):
+    # "+12707294721" -> "(270) 729-4721"
+    digits = e164[2:]
+    return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+
+def render_profile(row, template=None, stylesheet="", photo=None):
+    # photo: sha of the pilot's processed headshot (see images.py), or None
+    field = lambda key: html.escape(row.get(key, ''))
+    name = html.escape(f"{row['first_name']} {row['last_name']}")
+    headshot = images.picture(photo, name, "../") if photo else ""
+    # E.164 (from enrich_contacts.py) for the tel: link; the raw text when there is none
+    e164 = row.get('phone_e164', '')
+    phone = display_phone(e164) if e164 else row.get('phone', '')
+    return (template or profile_html).format(name=name, city=field('city'), state=field('state'),
+                                             bio=field('bio'), phone=html.escape(phone), tel=html.escape(e164 or phone),
+                                             stylesheet=stylesheet, photo=headshot)
+
+# --- HTML OUTPUT ---
+# Pages are minified and written with .gz/.br siblings. Byte counts are kept so
+# the build report can compare them with the old inline-CSS, unminified pages.
+def html_stats():
+    return {"files": 0, "before": 0, "after": 0, ".gz": 0, ".br": 0}
+
+def add_stats(total, part):
+    for key, value in part.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+def write_html(path, text, before, stats, brotli_quality=assets.BROTLI_PAGE_QUALITY):
+    # Returns True when the bytes differ from the page already on disk
+    payload = assets.minify_html(text).encode("utf-8")
+    changed = True
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            changed = f.read() != payload
+    sizes = assets.write_compressed(path, payload, brotli_quality)
+    stats["files"] += 1
+    stats["before"] += before
+    stats["after"] += sizes.pop("")
+    add_stats(stats, sizes)
+    return changed
+
+def write_pages(jobs_list, template=None, stylesheet="", inline_css=""):
+    # inline_css is what each page carried before the stylesheet moved out.
+    # Returns the stats and the paths whose bytes actually changed.
+    stats, changed = html_stats(), []
+    extra = len(inline_css.encode("utf-8")) - len(stylesheet.encode("utf-8"))
+    for path, row, photo in jobs_list:
+        page = render_profile(row, template, stylesheet, photo)
+        if write_html(path, page, len(page.encode("utf-8")) + extra, stats):
+            changed.append(path)
+    return stats, changed
+
+# --- PARALLEL RENDERING ---
+# Each worker gets the template once at start-up and writes its pages itself,
+# so only (path, row, photo) jobs cross the process boundary - never the HTML.
+_worker_template = None
+
+def _init_worker(template):
+    global _worker_template
+    _worker_template = template
+
+def _render_shard(shard):
+    return write_pages(shard, *_worker_template)
+
+def render_pages(todo, jobs=1, stylesheet="", inline_css=""):
+    if jobs <= 1 or len(todo) < 2:
+        return write_pages(todo, None, stylesheet, inline_css)
+    # A few shards per worker keeps the pool busy when some rows are slower
+    size = max(1, -(-len(todo) // (jobs * 4)))
+    shards = [todo[i:i + size] for i in range(0, len(todo), size)]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=((profile_html, stylesheet, inline_css),)) as pool:
+        stats, changed = html_stats(), []
+        for part, paths in pool.map(_render_shard, shards):
+            add_stats(stats, part)
+            changed += paths
+        return stats, changed
+
+# Old page URLs: a 301 where the host reads REDIRECTS_FILE, and a tiny
+# noindex stub page everywhere else
+redirect_html = """<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>Moved</title><meta name="robots" content="noindex"><link rel="canonical" href="{href}"><meta http-equiv="refresh" content="0; url={href}"></head><body><a href="{href}">This page has moved.</a></body></html>"""
+
+def write_redirects(redirects):
+    lines = []
+    for old_slug, slug in sorted(redirects.items()):
+        href = html.escape(f"{slug}.html")
+        if REDIRECT_STUBS:
+            write_if_changed(os.path.join(PAGES_DIR, f"{old_slug}.html"), redirect_html.format(href=href).encode("utf-8"))
+        lines.append(f"/{PAGES_DIR}/{old_slug}.html /{PAGES_DIR}/{slug}.html 301")
+    assets.write_text_if_changed(REDIRECTS_FILE, "\n".join(lines) + "\n")
+
+def write_if_changed(path, payload):
+    # Skip the write (and the mtime bump) when the bytes are already on disk,
+    # bar any missing .gz/.br sibling; otherwise write it with its siblings
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == payload:
+                assets.write_missing_compressed(path, payload)
+                return False
+    assets.write_compressed(path, payload)
+    return True
+
+# --- MAP DATA ASSET ---
+def columnar_map_data(map_data, tag_matrix=None):
+    # Parallel arrays instead of one object per pilot; every repeated string
+    # (names, cities, states, slugs) lives once in a shared string table.
+    # Service tags ride along as one base64 bitset per tag.
+    strings, index = [], {}
+    def ref(text):
+        if text not in index:
+            index[text] = len(strings)
+            strings.append(text)
+        return index[text]
+    return {
+        "v": 1,
+        "count": len(map_data),
+        "lat": [round(p["lat"], 5) for p in map_data],
+        "lng": [round(p["lng"], 5) for p in map_data],
+        "name": [ref(p["name"]) for p in map_data],
+        "city": [ref(p["city"]) for p in map_data],
+        "state": [ref(p["state"]) for p in map_data],
+        "slug": [ref(p["slug"]) for p in map_data],
+        "strings": strings,
+        "tags": service_tags.bitsets(tag_matrix) if tag_matrix is not None else [],
+    }
+
+def write_data_asset(map_data, tag_matrix=None):
+    # data/pilots.<hash>.json (+ .gz / .br): the name changes only when the data does
+    payload = json.dumps(columnar_map_data(map_data, tag_matrix), separators=(",", ":"), ensure_ascii=False)
+    return assets.fingerprint("pilots", payload, "json", DATA_DIR)
+
+def build_sitemap(manifest):
+    # index.html plus every pilot page, each with the lastmod kept in the manifest
+    entries = [("index.html", manifest["index"]["lastmod"])]
+    entries += ((f"{PAGES_DIR}/{slug}.html", manifest["lastmod"][slug]) for slug in sorted(manifest["pages"]))
+    return sitemap.write_sitemap(DOMAIN, entries)
+
+def run_build(force=False, jobs=1, db_file=DB_FILE, with_sitemap=True):
+    # with_sitemap=False leaves the sitemap to pipeline.py's own stage (build_sitemap)
+    timings = {}
+    started = time.perf_counter()
+    if not os.path.exists(PAGES_DIR): os.makedirs(PAGES_DIR)
     map_data = []
-    
-    with open(DB_FILE, newline='', encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            f, l = row.get('First Name', '').strip(), row.get('Last Name', '').strip()
-            name, city, state = f"{f} {l}", row.get('city', '').strip(), row.get('state', '').strip()
-            slug = clean_slug(f"{name}-{city}-{state}")
-            url = f"pilot/{slug}.html"
-            lat, lng = row.get('latitude'), row.get('longitude')
-            if lat and lng and str(lat) != 'nan' and str(lat) != '':
-                # FIXED SYNTAX: One set of braces to prevent unhashable dict error
-                map_data.append({
-                    "name": name, "lat": float(lat) + get_jitter(), 
-                    "lng": float(lng) + get_jitter(), "city": city, 
-                    "state": state, "url": url
-                })
-
-    with open("index.html", "w", encoding="utf-8") as f:
-        f.write(index_html.format(brand=BRAND_NAME, tagline=TAGLINE, count=len(map_data), json_data=json.dumps(map_data)))
+    pages = {}
+
+    # Column aliases, typing and the binary snapshot are all handled by PilotStore
+    store = PilotStore.load(db_file)
+    has_location = store.has_location()
+    # One slug per pilot; duplicate rows collapse into a single page
+    rows = list(store.rows())
+    registry = SlugRegistry.load()
+    assigned, duplicates = registry.assign(rows)
+    registry.save()
+    for slug, i in assigned:
+        row = rows[i]
+        name, city, state = f"{row['first_name']} {row['last_name']}", row['city'], row['state']
+        pages[slug] = row
+        if has_location[i]:
+            # FIXED SYNTAX: One set of braces to prevent unhashable dict error
+            map_data.append({
+                "name": name, "lat": float(row['latitude']), 
+                "lng": float(row['longitude']), "city": city, 
+                "state": state, "slug": slug, "precision": row['location_precision'],
+                "tags": service_tags.classify(row['business'], row['bio'])
+            })
+    # Spread pilots sharing a point; seeded by slug, so every build puts pins in the same place
+    lats, lngs = scatter.displace([p["lat"] for p in map_data], [p["lng"] for p in map_data],
+                                  [p["slug"] for p in map_data], [p["state"] for p in map_data],
+                                  [p["precision"] for p in map_data])
+    for p, lat, lng in zip(map_data, lats, lngs):
+        p["lat"], p["lng"] = round(float(lat), 5), round(float(lng), 5)
+    timings["load"] = time.perf_counter() - started
+
+    # --- PILOT PAGES (incremental) ---
+    # A page is re-rendered only when its source row or the template changed,
+    # but its lastmod only moves when the rendered bytes do: a geocode fix
+    # re-renders the page without changing a byte of it.
+    phase = time.perf_counter()
+    old = load_manifest()
+    # Shared assets by build generation (see assets.retire). A fresh checkout
+    # has no history, so the HTML on disk says what the live site references.
+    asset_dirs = [assets.ASSETS_DIR, DATA_DIR]
+    generations = old.get("assets") or [{"at": 0, "files": assets.references(
+        ["index.html", os.path.join(PAGES_DIR, f"{next(iter(pages), '')}.html")], asset_dirs)}]
+    # No manifest yet (fresh checkout): carry over the dates in the committed sitemap
+    lastmods = old.get("lastmod") or {path[len(PAGES_DIR) + 1:-len(".html")]: lastmod
+                                      for path, lastmod in sitemap.read_lastmods(DOMAIN).items()
+                                      if path.startswith(f"{PAGES_DIR}/")}
+    # The stylesheet URL carries the CSS hash, so a CSS edit re-renders every page
+    profile_css = assets.fingerprint("profile", assets.minify_css(PROFILE_CSS), "css")
+    stylesheet = f'<link rel="stylesheet" href="../{profile_css}">'
+    template_hash = content_hash(profile_html, stylesheet)
+    manifest = {"template": template_hash, "pages": {}, "lastmod": {}}
+    today = datetime.now().strftime("%Y-%m-%d")
+    todo = []
+    skipped = 0
+    # Headshots already thumbnailed by images.py; the rest render without a photo
+    photos = images.ready()
+    for slug, row in pages.items():
+        photo = photos.get(row['photo_url'])
+        row_hash = content_hash(template_hash, row, photo)
+        path = os.path.join(PAGES_DIR, f"{slug}.html")
+        manifest["pages"][slug] = row_hash
+        manifest["lastmod"][slug] = lastmods.get(slug, today)
+        if not force and old["pages"].get(slug) == row_hash and os.path.exists(path):
+            skipped += 1
+            continue
+        todo.append((path, row, photo))
+    stats, changed = render_pages(todo, jobs, stylesheet, f"<style>{PROFILE_CSS}</style>")
+    for path in changed:
+        manifest["lastmod"][os.path.basename(path)[:-len(".html")]] = today
+    rendered = stats["files"]
+    timings["pages"] = time.perf_counter() - phase
+
+    # Old slugs point at the current page; anything else in PAGES_DIR is stale
+    phase = time.perf_counter()
+    redirects = {old_slug: slug for old_slug, slug in registry.redirects.items() if slug in pages}
+    write_redirects(redirects)
+    deleted = 0
+    for filename in os.listdir(PAGES_DIR):
+        slug = filename.split(".html")[0]
+        if slug in pages or (REDIRECT_STUBS and slug in redirects) or ".html" not in filename:
+            continue
+        os.remove(os.path.join(PAGES_DIR, filename))
+        deleted += filename.endswith(".html")
+    timings["cleanup"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    tag_matrix = service_tags.tag_matrix([p["tags"] for p in map_data])
+    data_url = write_data_asset(map_data, tag_matrix)
+    service_options = "\n".join(f'        <option value="{i}">{html.escape(label)}</option>' for i, (_, label, _) in enumerate(service_tags.TAGS))
+    map_js = index_js.format(data_url=data_url, pages_dir=PAGES_DIR,
+                             tiles_dir=TILES_DIR, max_zoom=cluster_tiles.MAX_ZOOM,
+                             near_dir=NEAR_DIR, near_precision=spatial_index.BUCKET_PRECISION,
+                             search_dir=search_index.SEARCH_DIR, shard_chars=search_index.SHARD_CHARS, split_precision=search_index.SPLIT_PRECISION,
+                             min_prefix=search_index.MIN_PREFIX, max_prefix=search_index.MAX_PREFIX,
+                             field_weights=json.dumps(list(search_index.FIELD_WEIGHTS)), results=search_index.RESULTS)
+    css_url = assets.fingerprint("map", assets.minify_css(INDEX_CSS), "css")
+    js_url = assets.fingerprint("map", assets.minify_js(map_js), "js")
+    index_page = index_html.format(brand=BRAND_NAME, tagline=TAGLINE, count=len(map_data),
+                                   service_options=service_options,
+                                   leaflet_css=LEAFLET_CSS, leaflet_js=LEAFLET_JS,
+                                   css_url=css_url, js_url=js_url)
+    index_bytes = assets.minify_html(index_page).encode("utf-8")
+    index_changed = write_if_changed("index.html", index_bytes)
+    if index_changed:
+        # "before" is the same content with the CSS and JS inline, as it used to ship
+        inline = f"<style>{INDEX_CSS}</style><script>{map_js}</script>"
+        stats["files"] += 1
+        stats["before"] += len(index_page.encode("utf-8")) + len(inline.encode("utf-8"))
+        stats["after"] += len(index_bytes)
+        for suffix, data in assets.compressed(index_bytes).items():
+            stats[suffix] += len(data)
+    images.prune({photos[row['photo_url']] for row in pages.values() if row['photo_url'] in photos})
+    assets.write_headers([assets.ASSETS_DIR, DATA_DIR, images.IMAGES_DIR])
+    shared = [profile_css, css_url, js_url]
+    manifest["assets"] = assets.retire(generations, shared + [data_url])
+    assets.prune(manifest["assets"], asset_dirs)
+    index_lastmod = old.get("index", {}).get("lastmod") or sitemap.read_lastmods(DOMAIN).get("index.html")
+    manifest["index"] = {"hash": hashlib.sha1(index_bytes).hexdigest(),
+                         "lastmod": today if index_changed or not index_lastmod else index_lastmod}
+    timings["index"] = time.perf_counter() - phase
+
+    # --- SITEMAP ---
+    url_count = shard_count = 0
+    if with_sitemap:
+        phase = time.perf_counter()
+        url_count, shard_count = build_sitemap(manifest)
+        timings["sitemap"] = time.perf_counter() - phase
+
+    # Tiles, near-me buckets and the search index are skipped outright while
+    # their inputs (and code) hash the same as in the last build
+    reused = []
+
+    # --- CLUSTER TILES ---
+    phase = time.perf_counter()
+    lats, lngs = [p["lat"] for p in map_data], [p["lng"] for p in map_data]
+    pins = np.array([lats, lngs], dtype="float64")
+    slugs = [p["slug"] for p in map_data]
+    tile_count, ran = cached_stage("tiles", TILES_DIR, (cluster_tiles, pins, slugs, tag_matrix),
+                                   lambda: cluster_tiles.write_tiles(lats, lngs, TILES_DIR, tags=tag_matrix),
+                                   old, manifest, force)
+    if not ran:
+        reused.append("tiles")
+    timings["tiles"] = time.perf_counter() - phase
+
+    # --- FIND NEAR ME BUCKETS ---
+    phase = time.perf_counter()
+    _, ran = cached_stage("near", NEAR_DIR, (spatial_index, pins),
+                          lambda: spatial_index.write_buckets(lats, lngs, NEAR_DIR), old, manifest, force)
+    if not ran:
+        reused.append("near")
+    timings["near"] = time.perf_counter() - phase
+
+    # --- SEARCH INDEX ---
+    # Every pilot with a page, located or not; located ones use their map pin
+    phase = time.perf_counter()
+    pins = {p["slug"]: (p["lat"], p["lng"]) for p in map_data}
+    docs = [{"name": f"{row['first_name']} {row['last_name']}", "business": row['business'], "city": row['city'],
+             "state": row['state'], "slug": slug, "lat": pins.get(slug, (None, None))[0], "lng": pins.get(slug, (None, None))[1]}
+            for slug, row in pages.items()]
+    (search_files, search_bytes), ran = cached_stage("search", search_index.SEARCH_DIR, (search_index, docs),
+                                                     lambda: search_index.write_index(docs), old, manifest, force)
+    if not ran:
+        reused.append("search")
+    timings["search"] = time.perf_counter() - phase
+
+    save_manifest(manifest)
     print("RESTORED: Clustered Map with Quadcopter Icons.")
 
+    print("------------------------------------------------")
+    sitemap_note = f"{url_count} URLs in {shard_count} sitemap file(s)" if with_sitemap else "sitemap left to the pipeline"
+    print(f"BUILD REPORT: {rendered} rendered, {skipped} skipped, {deleted} deleted, {tile_count} cluster tiles, {sitemap_note}")
+    print(f"  search   {search_files} index files, {assets.human(search_bytes)}")
+    if reused:
+        print(f"  reused   {', '.join(reused)} (inputs unchanged)")
+    print(f"  pilots   {len(pages)} pages from {len(rows)} rows ({duplicates} duplicates merged), {len(redirects)} redirects")
+    shared_raw = sum(os.path.getsize(url) for url in shared)
+    shared_gz = sum(os.path.getsize(url + ".gz") for url in shared)
+    compressed = ", ".join(f"{suffix[1:]} {assets.human(stats[suffix])}" for suffix in (".gz", ".br") if suffix == ".gz" or assets.brotli)
+    print(f"  html     {stats['files']} files written: {assets.human(stats['before'])} before -> "
+          f"{assets.human(stats['after'])} minified ({compressed})")
+    print(f"  assets   {len(shared)} shared css/js: {assets.human(shared_raw)} (gz {assets.human(shared_gz)}), cached for a year")
+    for name, seconds in timings.items():
+        print(f"  {name:<8} {seconds * 1000:8.1f} ms")
+        metrics.add_time(f"build_{name}", seconds)
+    print(f"  {'total':<8} {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print("------------------------------------------------")
+    for name, value in (("pages_rendered", rendered), ("pages_skipped", skipped), ("pages_deleted", deleted),
+                        ("cluster_tiles", tile_count), ("html_bytes", stats["after"]), ("html_gz_bytes", stats[".gz"]),
+                        ("html_br_bytes", stats[".br"]), ("search_bytes", search_bytes)):
+        metrics.count(name, value)
+    return {"rendered": rendered, "skipped": skipped, "deleted": deleted, "tiles": tile_count,
+            "pilots": len(pages), "duplicates": duplicates, "redirects": len(redirects),
+            "reused": reused, "bytes": stats, "timings": timings}
+
 if __name__ == "__main__":
-    run_build()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the static pilot directory.")
+    parser.add_argument("--force", action="store_true", help="re-render every page, ignoring the manifest")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="render pages with N worker processes")
+    parser.add_argument("--profile", action="store_true", help="capture a cProfile into the metrics report")
+    parser.add_argument("--trace-memory", action="store_true", help="record peak memory with tracemalloc")
+    args = parser.parse_args()
+    metrics.start("build_site", profile=args.profile or None, trace_memory=args.trace_memory or None)
+    try:
+        run_build(force=args.force, jobs=args.jobs)
+    finally:
+        metrics.finish()
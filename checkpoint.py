@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Append-only checkpoint journal for the row-by-row fix_* scripts.
+#
+# Instead of rewriting the whole CSV every few rows, each processed row is
+# appended to "<csv>.journal" as one small JSON line (row, lat, lng, source,
+# precision, time) and fsync'd before we move on (write-ahead). A restarted
+# run replays the journal and skips rows already done. At the end the changes
+# are folded into the CSV in one atomic temp-file + rename, and the journal is
+# removed.
+
+
+def file_fingerprint(path):
+    # A journal only applies to the exact CSV it was started against
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_csv_atomic(df, path):
+    # Write next to the target, then rename: a crash never leaves a half-written CSV
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".csv", dir=folder)
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Journal:
+    def __init__(self, csv_path, source, columns=("Coordinates",)):
+        # columns: one "lat, lng" text column, (lat, lng) columns, or
+        # (lat, lng, source, precision, updated) - see locations.LOCATION_COLUMNS
+        self.csv_path = csv_path
+        self.path = csv_path + ".journal"
+        self.source = source
+        self.columns = tuple(columns)
+        self.entries = {}
+        self.fingerprint = file_fingerprint(csv_path)
+        self._load()
+        self.file = open(self.path, "a", encoding="utf-8")
+        if os.path.getsize(self.path) == 0:
+            self._append({"csv": self.fingerprint})
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if not isinstance(header, dict):
+            # Torn or empty header: the crash came during the very first write,
+            # so nothing was recorded yet - start a fresh journal
+            print(f"Discarding unreadable checkpoint {self.path}")
+            os.remove(self.path)
+            return
+        if header.get("csv") != self.fingerprint:
+            # The CSV changed since this journal was started - it no longer applies
+            print(f"Ignoring stale checkpoint {self.path}")
+            os.remove(self.path)
+            return
+        good = lines[:1]
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue   # Torn line from a crash mid-append
+            if not isinstance(entry, dict) or "row" not in entry:
+                continue   # Not one of ours: skipped like a torn line
+            good.append(line)
+            self.entries[entry["row"]] = entry
+        if len(good) != len(lines):
+            # Drop the torn line so new appends start on a clean line
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write("\n".join(good) + "\n")
+        if self.entries:
+            print(f"Resuming from checkpoint: {len(self.entries)} rows already done.")
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def done(self, row):
+        return int(row) in self.entries
+
+    def record(self, row, lat=None, lng=None, precision=""):
+        # lat/lng of None means "processed, nothing found" so a resume still skips it
+        entry = {"row": int(row), "lat": lat, "lng": lng, "source": self.source,
+                 "precision": precision, "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        self._append(entry)
+        self.entries[int(row)] = entry
+
+    def apply(self, df):
+        # Replays journal entries onto the DataFrame (positional row ids)
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = None
+        for row, entry in self.entries.items():
+            if entry["lat"] is None:
+                continue
+            if len(self.columns) == 1:
+                df.iat[row, df.columns.get_loc(self.columns[0])] = f"{entry['lat']}, {entry['lng']}"
+                continue
+            values = (entry["lat"], entry["lng"], entry["source"], entry.get("precision", ""), entry.get("at", ""))
+            for col, value in zip(self.columns, values):
+                df.iat[row, df.columns.get_loc(col)] = value
+        return df
+
+    def compact(self, df, path=None):
+        # Fold everything into the CSV atomically, then drop the journal
+        self.apply(df)
+        write_csv_atomic(df, path or self.csv_path)
+        self.file.close()
+        os.remove(self.path)
+        self.entries = {}
+
@@ -0,0 +1,215 @@
+import json
+import math
+import os
+import sys
+import time
+import numpy as np
+import assets
+
+# Server-side marker clustering, in the style of Mapbox's supercluster.
+#
+# Points are projected to Web Mercator [0, 1] space. Starting from the raw pins
+# at MAX_ZOOM, each zoom merges every point/cluster of the level above with its
+# neighbours inside RADIUS pixels (found through a static KD-tree built for
+# that level). Each level is then cut into slippy-map tiles and written as
+# tiles/{z}/{x}/{y}.json, so the page only fetches what is on screen.
+
+# --- CONFIGURATION ---
+MIN_ZOOM = 0
+MAX_ZOOM = 14          # Zooms past this reuse the MAX_ZOOM tiles. At 14, RADIUS
+                       # is ~0.0034 deg: pins scatter.py spreads 0.01 deg apart split
+RADIUS = 40            # Cluster radius in screen pixels
+EXTENT = 256           # Tile size in pixels
+NODE_SIZE = 64         # KD-tree leaf size
+TILES_DIR = "tiles"
+# ---------------------
+
+
+def project(lat, lng):
+    lat = np.clip(np.asarray(lat, dtype="float64"), -85.0511, 85.0511)
+    x = np.asarray(lng, dtype="float64") / 360 + 0.5
+    s = np.sin(np.radians(lat))
+    y = 0.5 - 0.25 * np.log((1 + s) / (1 - s)) / math.pi
+    return x, y
+
+
+def unproject(x, y):
+    lng = (np.asarray(x) - 0.5) * 360
+    lat = np.degrees(2 * np.arctan(np.exp((180 - np.asarray(y) * 360) * math.pi / 180)) - math.pi / 2)
+    return lat, lng
+
+
+class KDTree:
+    # Static 2-D KD-tree (KDBush layout): points are reordered in place so every
+    # node is a contiguous slice, and leaves are scanned with one NumPy mask.
+    def __init__(self, xs, ys, node_size=NODE_SIZE):
+        self.coords = np.column_stack([xs, ys]).astype("float64")
+        self.ids = np.arange(len(self.coords))
+        self.node_size = node_size
+        stack = [(0, len(self.coords) - 1, 0)]
+        while stack:
+            left, right, axis = stack.pop()
+            if right - left <= node_size:
+                continue
+            m = (left + right) // 2
+            order = np.argpartition(self.coords[left:right + 1, axis], m - left)
+            self.coords[left:right + 1] = self.coords[left:right + 1][order]
+            self.ids[left:right + 1] = self.ids[left:right + 1][order]
+            stack.append((left, m - 1, 1 - axis))
+            stack.append((m + 1, right, 1 - axis))
+
+    def within(self, x, y, r):
+        found = []
+        r2 = r * r
+        stack = [(0, len(self.coords) - 1, 0)]
+        while stack:
+            left, right, axis = stack.pop()
+            if left > right:
+                continue
+            if right - left <= self.node_size:
+                seg = self.coords[left:right + 1]
+                mask = (seg[:, 0] - x) ** 2 + (seg[:, 1] - y) ** 2 <= r2
+                found.append(self.ids[left:right + 1][mask])
+                continue
+            m = (left + right) // 2
+            mx, my = self.coords[m]
+            if (mx - x) ** 2 + (my - y) ** 2 <= r2:
+                found.append(self.ids[m:m + 1])
+            split, value = (mx, x) if axis == 0 else (my, y)
+            if value - r <= split:
+                stack.append((left, m - 1, 1 - axis))
+            if value + r >= split:
+                stack.append((m + 1, right, 1 - axis))
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def cluster_level(x, y, count, point_id, tags, zoom, radius=RADIUS, extent=EXTENT):
+    # Merges one level into the next coarser one. point_id is the original
+    # pilot index for single points and -1 for clusters; tags holds per-tag
+    # member counts (one column per service tag) so filtered views can size
+    # clusters without refetching.
+    r = radius / (extent * 2 ** zoom)
+    tree = KDTree(x, y)
+    taken = np.zeros(len(x), dtype=bool)
+    nx, ny, ncount, nid, ntags = [], [], [], [], []
+    for i in range(len(x)):
+        if taken[i]:
+            continue
+        near = tree.within(x[i], y[i], r)
+        near = near[~taken[near]]
+        taken[near] = True
+        taken[i] = True
+        if len(near) <= 1:
+            nx.append(x[i]); ny.append(y[i]); ncount.append(count[i]); nid.append(point_id[i]); ntags.append(tags[i])
+            continue
+        w = count[near]
+        total = w.sum()
+        nx.append((x[near] * w).sum() / total)
+        ny.append((y[near] * w).sum() / total)
+        ncount.append(total)
+        nid.append(-1)
+        ntags.append(tags[near].sum(axis=0))
+    ntags = np.array(ntags, dtype=np.int64).reshape(len(nx), tags.shape[1])
+    return np.array(nx), np.array(ny), np.array(ncount, dtype=np.int64), np.array(nid, dtype=np.int64), ntags
+
+
+def build_levels(lat, lng, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=RADIUS, tags=None):
+    # Returns {zoom: (x, y, count, point_id, tags)}. MAX_ZOOM is clustered from
+    # the raw points, and each coarser zoom from the level above it.
+    x, y = project(lat, lng)
+    count = np.ones(len(x), dtype=np.int64)
+    point_id = np.arange(len(x), dtype=np.int64)
+    tags = np.zeros((len(x), 0), dtype=np.int64) if tags is None else np.asarray(tags, dtype=np.int64)
+    levels = {}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        x, y, count, point_id, tags = cluster_level(x, y, count, point_id, tags, zoom, radius)
+        levels[zoom] = (x, y, count, point_id, tags)
+    return levels
+
+
+def tile_entries(levels):
+    # Yields (zoom, tx, ty, entries). A cluster is [lat, lng, count, per-tag
+    # counts...]; a single pilot is [lat, lng, 1, index into data/pilots.*.json].
+    for zoom, (x, y, count, point_id, tags) in levels.items():
+        n = 2 ** zoom
+        tx = np.clip((x * n).astype(np.int64), 0, n - 1)
+        ty = np.clip((y * n).astype(np.int64), 0, n - 1)
+        lat, lng = unproject(x, y)
+        order = np.lexsort((ty, tx))
+        keys = tx[order] * n + ty[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for chunk in np.split(order, bounds):
+            if not len(chunk):
+                continue
+            entries = []
+            for i in chunk:
+                entry = [round(float(lat[i]), 5), round(float(lng[i]), 5), int(count[i])]
+                if count[i] == 1:
+                    entry.append(int(point_id[i]))
+                else:
+                    entry.extend(int(t) for t in tags[i])
+                entries.append(entry)
+            yield zoom, int(tx[chunk[0]]), int(ty[chunk[0]]), entries
+
+
+def write_tiles(lat, lng, out_dir=TILES_DIR, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, tags=None):
+    # Every level is recomputed (a moved pin can change every zoom), but only
+    # tiles whose bytes changed are rewritten, so caches keep serving the
+    # rest; tiles no longer produced are removed
+    levels = build_levels(lat, lng, min_zoom, max_zoom, tags=tags)
+    keep = set()
+    for zoom, tx, ty, entries in tile_entries(levels):
+        folder = os.path.join(out_dir, str(zoom), str(tx))
+        path = os.path.join(folder, f"{ty}.json")
+        keep.add(path)
+        os.makedirs(folder, exist_ok=True)
+        assets.write_text_if_changed(path, json.dumps(entries, separators=(",", ":")))
+    meta = os.path.join(out_dir, "meta.json")
+    keep.add(meta)
+    os.makedirs(out_dir, exist_ok=True)
+    assets.write_text_if_changed(meta, json.dumps({"minZoom": min_zoom, "maxZoom": max_zoom, "count": len(lat)}))
+    for folder, _, filenames in os.walk(out_dir, topdown=False):
+        for filename in filenames:
+            if os.path.join(folder, filename) not in keep:
+                os.remove(os.path.join(folder, filename))
+        if folder != out_dir and not os.listdir(folder):
+            os.rmdir(folder)
+    return len(keep) - 1
+
+
+# --- BENCHMARK ---
+def synthetic_pilots(n, seed=0):
+    # Pilots scattered around state centers, weighted like the real directory
+    from gazetteer import STATE_CENTERS
+    rng = np.random.default_rng(seed)
+    states = sorted(STATE_CENTERS)
+    weights = rng.pareto(1.2, len(states)) + 1
+    pick = rng.choice(len(states), size=n, p=weights / weights.sum())
+    centers = np.array([STATE_CENTERS[s] for s in states])[pick]
+    return centers[:, 0] + rng.normal(0, 1.0, n), centers[:, 1] + rng.normal(0, 1.3, n)
+
+
+def visible_tiles(zoom, south=24.5, west=-125.0, north=49.5, east=-66.9):
+    # Tiles covering a viewport (default: the continental US)
+    n = 2 ** zoom
+    (x0, x1), (y1, y0) = project([south, north], [west, east])
+    return [(tx, ty) for tx in range(int(x0 * n), int(x1 * n) + 1) for ty in range(int(y0 * n), int(y1 * n) + 1)]
+
+
+def benchmark(sizes=(1000, 10000, 100000), zoom=5):
+    print(f"{'pilots':>8} {'build s':>8} {'markers (old)':>14} {'markers (tiles)':>16} {'tiles fetched':>14} {'KB fetched':>11}")
+    for n in sizes:
+        lat, lng = synthetic_pilots(n)
+        start = time.perf_counter()
+        levels = build_levels(lat, lng)
+        build = time.perf_counter() - start
+        tiles = {(tx, ty): entries for z, tx, ty, entries in tile_entries({zoom: levels[zoom]})}
+        wanted = [tiles[t] for t in visible_tiles(zoom) if t in tiles]
+        markers = sum(len(e) for e in wanted)
+        kb = sum(len(json.dumps(e, separators=(",", ":"))) for e in wanted) / 1024
+        print(f"{n:>8} {build:>8.2f} {n:>14} {markers:>16} {len(wanted):>14} {kb:>11.1f}")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
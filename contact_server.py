@@ -0,0 +1,74 @@
+import argparse
+from enrich_contacts import DB_FILE, contact_columns, contact_fields, contact_key, to_e164
+from batch_geocode import text_column
+from pilot_store import read_frame
+import standin_server
+from standin_server import StandIn
+
+# Local fixture for the contact lookup API used by enrich_contacts.py.
+#
+# Answers GET /lookup?business=&name=&city=&state= with {"phone": ...} from
+# the valid numbers already in a pilots CSV (business or name + state), and
+# {"phone": null} for anyone else. Latency and failures are configurable like
+# geocode_server.py, so concurrency, rate limiting and retries can be
+# exercised without a real provider; injected failures are 503s unless
+# --error-status says otherwise (429 for rate limiting).
+#
+#   python contact_server.py --port 8766 --latency 0.05 --error-rate 0.05
+
+# --- CONFIGURATION ---
+HOST = "127.0.0.1"
+PORT = 8766
+# ---------------------
+
+
+def load_directory(path=DB_FILE):
+    # {contact key: phone} for every row with a usable number
+    # (columns found through the shared alias table, like enrich_contacts)
+    df = read_frame(path)
+    columns = contact_columns(df)
+    phones = to_e164(text_column(df, columns["phone"]))
+    business, name, _, state = contact_fields(df, columns)
+    keys = [contact_key(b, n, s) for b, n, s in zip(business, name, state)]
+    return {key: phone for key, phone in zip(keys, phones) if phone}
+
+
+class ContactStandIn(StandIn):
+    route = "/lookup"
+
+    def __init__(self, directory=None, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=0):
+        super().__init__(latency, jitter, error_rate, error_status, seed)
+        self.directory = load_directory() if directory is None else directory
+
+    def answer(self, params):
+        return self.lookup(params.get("business", ""), params.get("name", ""), params.get("state", ""))
+
+    def lookup(self, business, name, state):
+        phone = self.directory.get(contact_key(business, name, state.upper()))
+        if phone:
+            self.hit()
+        return {"phone": phone}
+
+    def stats(self):
+        return {**super().stats(), "directory": len(self.directory)}
+
+
+def make_server(host=HOST, port=PORT, **options):
+    return standin_server.make_server(ContactStandIn(**options), host, port)
+
+
+def serve_in_background(host=HOST, port=0, **options):
+    # Port 0 picks a free port. Returns (server, base_url); call server.shutdown() when done.
+    return standin_server.serve_in_background(make_server(host, port, **options))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contact lookup fixture backed by a pilots CSV.")
+    parser.add_argument("--csv", default=DB_FILE, help="where the known numbers come from")
+    standin_server.add_arguments(parser, HOST, PORT, error_help="share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of those errors (e.g. 429)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, directory=load_directory(args.csv), latency=args.latency,
+                         jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    standin_server.serve_forever(server, "Contact lookup fixture on {url}/lookup (Ctrl+C to stop)")
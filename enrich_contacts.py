@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode, urlparse
+import pandas as pd
+from batch_geocode import clean_column, text_column
+from checkpoint import write_csv_atomic
+from pilot_store import COLUMN_ALIASES, read_frame, resolve_columns
+from geocode_async import TokenBucket, backoff_delay
+from metrics import LatencyHistogram, bound_text
+
+# Phone enrichment.
+#
+# The original phones were found by hand: one DuckDuckGo search per pilot
+# ("Hagan's Drone Service nan KY phone number" - a blank city leaked in as
+# "nan"), with the result pasted into Found_Phone. This step does it in bulk:
+#
+#   1. every Found_Phone is normalized to E.164 (+12707294721) in one
+#      vectorized pass into Phone_E164; numbers that can't be a US number are
+#      left blank there
+#   2. pilots still without a usable number are looked up concurrently
+#      through a pluggable backend, rate limited per host
+#   3. answers (including "nothing found") are cached in SQLite by
+#      (business, state) - the pilot's name when there is no business - so a
+#      pilot whose details haven't changed is never looked up twice
+#
+#   python enrich_contacts.py --lookup-url http://127.0.0.1:8766   # see contact_server.py
+#
+# Any object with .lookup(business, name, city, state) -> phone text or None
+# works as a backend; HttpLookup speaks the contact_server.py protocol.
+
+# --- CONFIGURATION ---
+DB_FILE = "drone_pilots_WITH_PHONES_FINAL.csv"
+CACHE_FILE = "contact_cache.sqlite"
+LOOKUP_URL = os.environ.get("CONTACT_LOOKUP_URL", "")
+HOST_RATE = 10          # Requests/second per host
+HOST_BURST = 10
+CONCURRENCY = 16
+MAX_RETRIES = 3
+TIMEOUT = 10
+NEGATIVE_TTL_DAYS = 30  # Retry "no number found" after this long
+USER_AGENT = "drone_directory_contacts_v1"
+SEARCH_URL = "https://duckduckgo.com/?q="
+# ---------------------
+
+NANP = r"[2-9]\d{2}[2-9]\d{6}"   # area code and exchange can't start with 0 or 1
+FAILED = object()                 # Lookup gave up: not cached, tried again next run
+
+
+def to_e164(series):
+    # "270-729-4721", "(920) 949-1651", "1 615 607 0830" -> "+1..."; anything
+    # else -> "". Whole-column string ops, no per-row Python.
+    digits = clean_column(series).str.replace(r"\D", "", regex=True)
+    digits = digits.where(~((digits.str.len() == 11) & digits.str.startswith("1")), digits.str[1:])
+    return ("+1" + digits).where(digits.str.fullmatch(NANP), "")
+
+
+def contact_key(business, name, state):
+    # Cache key: business (or the pilot's name) + state, case/space-insensitive
+    who = business or name
+    return "|".join(re.sub(r"\s+", " ", str(part)).strip().lower() for part in (who, state))
+
+
+def search_link(business, name, city, state):
+    # The manual fallback, minus the "nan": blank parts are simply left out
+    words = " ".join(part for part in (business or name, city, state) if part)
+    return SEARCH_URL + urlencode({"q": f"{words} phone number"})[2:]
+
+
+class ContactCache:
+    def __init__(self, path=CACHE_FILE, negative_ttl_days=NEGATIVE_TTL_DAYS):
+        self.negative_ttl = negative_ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS contacts ("
+            " key TEXT PRIMARY KEY,"
+            " phone TEXT,"
+            " created REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        # {key: phone or None} for every fresh entry; expired misses are left out
+        found, now = {}, time.time()
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, phone, created in self.conn.execute(
+                    f"SELECT key, phone, created FROM contacts WHERE key IN ({marks})", chunk):
+                if phone or now - created <= self.negative_ttl:
+                    found[key] = phone or None
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, answers):
+        now = time.time()
+        self.conn.executemany("INSERT OR REPLACE INTO contacts VALUES (?, ?, ?)",
+                              [(key, phone or None, now) for key, phone in answers.items()])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class RetryableError(Exception):
+    pass
+
+
+class HttpLookup:
+    # GET <base>/lookup?business=&name=&city=&state= -> {"phone": "..." or null}.
+    # 429/5xx and timeouts raise RetryableError.
+    def __init__(self, base_url, timeout=TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.host = urlparse(self.base_url).netloc
+        self.timeout = timeout
+
+    def url(self, business, name, city, state):
+        return f"{self.base_url}/lookup?" + urlencode({"business": business, "name": name, "city": city, "state": state})
+
+    def lookup(self, business, name, city, state):
+        request = urllib.request.Request(self.url(business, name, city, state), headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response).get("phone")
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise RetryableError(f"HTTP {e.code}")
+            raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise RetryableError(str(e))
+
+
+class Enricher:
+    # Runs lookups concurrently: one token bucket per host, a shared cap on
+    # requests in flight, full-jitter retries for transient failures.
+    def __init__(self, backend, rate=HOST_RATE, burst=HOST_BURST, concurrency=CONCURRENCY, max_retries=MAX_RETRIES):
+        self.backend = backend
+        self.rate, self.burst = rate, burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.latency = LatencyHistogram()
+        self.calls = self.errors = 0
+        self.failures = Counter()   # Non-retryable errors by kind, e.g. {"HTTP 404": 3}
+
+    async def _one(self, query):
+        host = getattr(self.backend, "host", "default")
+        for attempt in range(self.max_retries + 1):
+            async with self.slots:
+                await self.buckets.setdefault(host, TokenBucket(self.rate, self.burst)).acquire()
+                start = time.perf_counter()
+                self.calls += 1
+                try:
+                    # Backends are blocking clients, so each call runs on a worker thread
+                    return await asyncio.to_thread(self.backend.lookup, *query)
+                except RetryableError:
+                    self.errors += 1
+                except Exception as e:
+                    # Not worth retrying (a 404, a reply that isn't JSON...), but
+                    # counted by kind so a broken backend doesn't pass unnoticed
+                    self.errors += 1
+                    self.failures[f"HTTP {e.code}" if isinstance(e, urllib.error.HTTPError) else type(e).__name__] += 1
+                    return FAILED
+                finally:
+                    self.latency.record((time.perf_counter() - start) * 1000)
+            if attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt))
+        return FAILED
+
+    async def lookup_many_async(self, queries):
+        # queries: {key: (business, name, city, state)} -> {key: phone, None or FAILED}
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.buckets = {}
+        answers = await asyncio.gather(*(self._one(q) for q in queries.values()))
+        return dict(zip(queries, answers))
+
+    def lookup_many(self, queries):
+        return asyncio.run(self.lookup_many_async(queries))
+
+
+def contact_columns(df):
+    # {canonical: header} through the shared alias table; columns the CSV
+    # lacks get the directory's own spelling (written if the step adds them)
+    columns = resolve_columns(df.columns)
+    return {name: columns.get(name, aliases[0]) for name, aliases in COLUMN_ALIASES.items()}
+
+
+def contact_fields(df, columns=None):
+    # Cleaned (business, name, city, state) Series. The name is First + Last,
+    # or the Name column when both are blank.
+    col = columns or contact_columns(df)
+    business = text_column(df, col["business"])
+    name = (text_column(df, col["first_name"]) + " " + text_column(df, col["last_name"])).str.strip()
+    name = name.where(name != "", text_column(df, col["name"]))
+    return business, name, text_column(df, col["city"]), text_column(df, col["state"]).str.upper()
+
+
+def enrich(df, backend=None, cache=None, refresh_all=False, verbose=True):
+    # Adds/updates Phone_E164 (and Found_Phone, Source_Link) in place, under
+    # whatever spelling the CSV uses for them. Returns a report dict.
+    columns = contact_columns(df)
+    business, name, city, state = contact_fields(df, columns)
+    phone_col, e164_col, link_col = columns["phone"], columns["phone_e164"], columns["source_link"]
+    phone = text_column(df, phone_col)
+
+    df[e164_col] = to_e164(phone)
+    keys = pd.Series([contact_key(b, n, s) for b, n, s in zip(business, name, state)], index=df.index)
+    wanted = (df[e164_col] == "") & (business + name != "")
+    if refresh_all:
+        wanted = business + name != ""
+    report = {"rows": len(df), "valid": int((df[e164_col] != "").sum()), "wanted": int(wanted.sum()),
+              "cached": 0, "looked_up": 0, "found": 0}
+
+    first = ~keys[wanted].duplicated()
+    todo = keys[wanted][first]
+    known = cache.get_many(todo) if cache is not None else {}
+    report["cached"] = len(known)
+    pending = {key: (business[i], name[i], city[i], state[i]) for i, key in todo.items() if key not in known}
+    if pending and backend is not None:
+        if verbose:
+            print(f"Looking up {len(pending)} pilots ({len(known)} answered from cache)...")
+        engine = Enricher(backend)
+        answers = {k: v for k, v in engine.lookup_many(pending).items() if v is not FAILED}
+        if cache is not None:
+            cache.put_many(answers)
+        known.update(answers)
+        report["looked_up"] = len(pending)
+        report["failed"] = len(pending) - len(answers)
+        report["errors"] = engine.errors
+        report["failures"] = dict(engine.failures)
+        report["latency"] = engine.latency.as_dict()
+
+    found = keys.map(lambda k: known.get(k) or "")
+    found_e164 = to_e164(found)
+    fill = wanted & (found_e164 != "")
+    report["found"] = int(fill.sum())
+    df.loc[fill, phone_col] = found[fill]
+    df.loc[fill, e164_col] = found_e164[fill]
+    if link_col in df.columns:
+        # Old search links are rebuilt without the "nan" so a human can still
+        # follow them; numbers filled by a lookup point at where they came from
+        search = clean_column(df[link_col]).str.startswith(SEARCH_URL.split("?")[0])
+        df.loc[search, link_col] = [search_link(b, n, c, s) for b, n, c, s in
+                                    zip(business[search], name[search], city[search], state[search])]
+        if hasattr(backend, "url"):
+            df.loc[fill, link_col] = [backend.url(b, n, c, s) for b, n, c, s in
+                                      zip(business[fill], name[fill], city[fill], state[fill])]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize pilot phones to E.164 and look up missing ones.")
+    parser.add_argument("csv", nargs="?", default=DB_FILE)
+    parser.add_argument("--lookup-url", default=LOOKUP_URL, help="contact lookup service (see contact_server.py)")
+    parser.add_argument("--all", action="store_true", help="look up every pilot, not just those without a valid number")
+    parser.add_argument("--cache", default=CACHE_FILE)
+    args = parser.parse_args()
+
+    print(f"📞 Loading {args.csv}...")
+    df = read_frame(args.csv)
+    cache = ContactCache(args.cache)
+    backend = HttpLookup(args.lookup_url) if args.lookup_url else None
+    if backend is None:
+        print("No --lookup-url / CONTACT_LOOKUP_URL: normalizing and answering from cache only")
+    started = time.perf_counter()
+    report = enrich(df, backend, cache, refresh_all=args.all)
+    cache.close()
+    write_csv_atomic(df, args.csv)
+
+    print("------------------------------------------------")
+    print(f"DONE! {report['valid']}/{report['rows']} valid numbers before lookup; "
+          f"{report['wanted']} wanted, {report['cached']} answered from cache, "
+          f"{report['looked_up']} looked up, {report['found']} filled "
+          f"({time.perf_counter() - started:.1f}s)")
+    if report.get("latency"):
+        lat = report["latency"]
+        print(f"Lookups: {report['failed']} gave up, {report['errors']} errors, mean {lat['mean_ms']}ms, p95 {bound_text(lat['p95_ms'])}")
+        if report["failures"]:
+            print("Not retried: " + ", ".join(f"{count} x {kind}" for kind, count in report["failures"].items()))
+    print("------------------------------------------------")
@@ -1,27 +1,25 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
 import os
 import glob
+from geocode_async import default_engine
+from geocode_cache import geocoder_option
+from batch_geocode import geocode_unique, print_report
+from checkpoint import write_csv_atomic
+from pilot_store import read_frame, resolve_columns
+from locations import ensure_columns, needs, assign, query_precision
+import metrics
 
 # --- CONFIGURATION ---
 OUTPUT_FILE = "pilots_geocoded.csv"
 USER_AGENT = "drone_recovery_network_nuclear_v1"
 # ---------------------
 
-def get_coordinates(location_name, attempt=1, max_attempts=3):
-    geolocator = Nominatim(user_agent=USER_AGENT)
-    try:
-        location = geolocator.geocode(location_name, country_codes='us', timeout=10)
-        if location:
-            return location.latitude, location.longitude
-        return None, None
-    except (GeocoderTimedOut, GeocoderServiceError):
-        if attempt <= max_attempts:
-            time.sleep(2 * attempt)
-            return get_coordinates(location_name, attempt + 1, max_attempts)
-        return None, None
+# One shared engine: cache + offline gazetteer first, then every provider in
+# geocoders.json concurrently (default: Nominatim at 1 req/s). Failed calls
+# back off with jitter instead of recursing.
+engine = default_engine(USER_AGENT, backend=geocoder_option())
+
+def location_query(city, state):
+    return ", ".join(part for part in (city, state) if part)
 
 def find_csv_file():
     # Find any CSV file that isn't our output file
@@ -48,53 +46,42 @@ def run_nuclear_fix():
     print(f"Target Acquired: Using database '{input_file}'")
 
     # 2. Load Data
+    metrics.mark("read")
     try:
-        df = pd.read_csv(input_file)
+        df = read_frame(input_file)
         print(f"Loaded {len(df)} pilots.")
     except Exception as e:
         print(f"Error reading CSV: {e}")
         return
 
-    # 3. Ensure Columns Exist
-    if 'latitude' not in df.columns: df['latitude'] = None
-    if 'longitude' not in df.columns: df['longitude'] = None
-
-    # 4. Processing Loop
-    updated_count = 0
-    
-    for index, row in df.iterrows():
-        # Skip if already done
-        if pd.notna(row['latitude']) and row['latitude'] != "":
-            continue
+    # 3. One canonical location per pilot (folds any legacy Coordinates column in)
+    ensure_columns(df)
 
-        # Construct Location String
-        # Try different column names for city/state
-        city = row.get('city') or row.get('City') or ''
-        state = row.get('state') or row.get('State') or ''
-        
-        loc_str = f"{city}, {state}"
-        if len(loc_str) < 4: 
-            continue 
+    # 4. Resolve each unique city/state once, only for rows coarser than the query can do
+    # City/State may be spelled any way the shared alias table knows about
+    columns = resolve_columns(df.columns)
+    city_col, state_col = columns.get('city', 'City'), columns.get('state', 'State')
+    metrics.mark("geocode")
+    precision = query_precision(df, city_col)
+    missing = needs(df, precision)
 
-        print(f"[{index+1}/{len(df)}] Pinging satellite for: {loc_str}...")
-        
-        lat, lon = get_coordinates(loc_str)
-        
-        if lat:
-            df.at[index, 'latitude'] = lat
-            df.at[index, 'longitude'] = lon
-            updated_count += 1
-            print(f"   >>> ACQUIRED: {lat}, {lon}")
-        else:
-            print("   >>> FAILED: Location not found.")
+    lat, lon, report = geocode_unique(
+        df, engine, city_col=city_col, state_col=state_col,
+        mask=missing, query=location_query, require_city=False,
+    )
+    updated_count = int(assign(df, lat.notna(), lat, lon, "nuclear", precision).sum())
+    metrics.count("rows_updated", updated_count)
+    print_report(report)
 
-        time.sleep(1.1)
-
-        if updated_count % 10 == 0:
-            df.to_csv(OUTPUT_FILE, index=False)
-
-    df.to_csv(OUTPUT_FILE, index=False)
+    metrics.mark("save")
+    write_csv_atomic(df, OUTPUT_FILE)
     print(f"\n--- MISSION COMPLETE ---\nUpdated {updated_count} pilots.\nSaved to: {OUTPUT_FILE}")
+    engine.print_stats()
 
 if __name__ == "__main__":
-    run_nuclear_fix()
\ No newline at end of file
+    metrics.start("fix_geolocation_nuclear")
+    try:
+        run_nuclear_fix()
+    finally:
+        # Early exits (no CSV, unreadable CSV) still leave a report behind
+        metrics.finish()
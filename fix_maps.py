@@ -1,52 +1,63 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
+from pilot_store import read_frame, _clean
 from geopy.exc import GeocoderTimedOut
 import time
+from geocode_cache import cached_geocoder, geocoder_option
+from checkpoint import write_csv_atomic
+from locations import ensure_columns, needs, assign
+import metrics
 
 # FILE CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
+metrics.start("fix_maps")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("❌ Error: CSV file not found. Make sure this script is in the same folder as your CSV.")
+    metrics.finish()
     exit()
+ensure_columns(df)
 
-# Initialize Geolocator
-geolocator = Nominatim(user_agent="drone_pilot_locator_v1")
+# Initialize Geolocator (cached, rate-limited only on real lookups)
+geolocator = cached_geocoder("drone_pilot_locator_v1", min_delay=1, backend=geocoder_option())
 
 def get_location(row):
-    # If coordinates already exist, skip
-    if 'Coordinates' in row and pd.notna(row['Coordinates']) and row['Coordinates'] != "0,0":
-        return row['Coordinates']
-    
-    city = str(row.get('City', '')).strip()
-    state = str(row.get('State', '')).strip()
+    city = _clean(row.get('City', ''))
+    state = _clean(row.get('State', ''))
     
     if not city or not state:
-        return "0,0"
+        return None
 
     address = f"{city}, {state}, USA"
     try:
         location = geolocator.geocode(address, timeout=10)
         if location:
             print(f"Found: {address} -> {location.latitude}, {location.longitude}")
-            return f"{location.latitude}, {location.longitude}"
+            return location
     except:
         time.sleep(1)
             
     print(f"Not Found: {address}")
-    return "0,0"
+    return None
 
 print("------------------------------------------------")
 print(f"Locating {len(df)} pilots. This will take about 5-6 minutes...")
 print("------------------------------------------------")
 
-# Apply the locator (with a pause to be polite to the server)
-df['Coordinates'] = df.apply(lambda row: (time.sleep(1), get_location(row))[1], axis=1)
+# Only pilots not already located to their city (the geocoder pauses between network calls to be polite)
+metrics.mark("geocode")
+metrics.count("rows_skipped", int((~needs(df, "place")).sum()))
+for index, row in df[needs(df, "place")].iterrows():
+    location = get_location(row)
+    if location:
+        metrics.count("rows_updated", int(assign(df, [index], location.latitude, location.longitude, "maps", "place").sum()))
 
 # Save the new file
-df.to_csv(input_file, index=False)
+metrics.mark("save")
+write_csv_atomic(df, input_file)
 print("------------------------------------------------")
-print("DONE! Coordinates added to your CSV file.")
\ No newline at end of file
+print("DONE! Coordinates added to your CSV file.")
+print(geolocator.stats())
+metrics.finish()
\ No newline at end of file
@@ -1,30 +1,33 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
-import time
+from pilot_store import read_frame, _clean
+from geocode_cache import cached_geocoder, geocoder_option
+from checkpoint import write_csv_atomic
+from locations import ensure_columns, needs, assign
+import metrics
 
 # CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
 # LOAD DATA
+metrics.start("fix_maps_advanced")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("❌ Error: CSV file not found.")
+    metrics.finish()
     exit()
+ensure_columns(df)
 
 # SETUP GEOLOCATOR
-geolocator = Nominatim(user_agent="drone_pilot_locator_round2")
+geolocator = cached_geocoder("drone_pilot_locator_round2", min_delay=1, backend=geocoder_option())
 
 def get_smart_location(row):
-    # 1. If we already have good coordinates, keep them!
-    current_coords = str(row.get('Coordinates', '0,0'))
-    if current_coords != "0,0" and "," in current_coords:
-        return current_coords
+    # 1. Rows already located to their city never get here (see needs() below)
 
     # 2. Get City and State
-    city = str(row.get('City', '')).replace("nan", "").strip()
-    state = str(row.get('State', '')).replace("nan", "").strip()
+    city = _clean(row.get('City', ''))
+    state = _clean(row.get('State', ''))
 
     # 3. Try Specific: "City, State, USA"
     if city and state:
@@ -33,12 +36,9 @@ def get_smart_location(row):
             location = geolocator.geocode(search_query, timeout=10)
             if location:
                 print(f"✅ Fixed: {search_query}")
-                return f"{location.latitude}, {location.longitude}"
+                return location, "place"
         except:
             pass # If it fails, just move to the next step
-        
-        # PAUSE (to be polite to the server)
-        time.sleep(1)
 
     # 4. FALLBACK: Try Generic "State, USA" (So they at least show up!)
     if state:
@@ -47,22 +47,30 @@ def get_smart_location(row):
             location = geolocator.geocode(search_query, timeout=10)
             if location:
                 print(f"⚠️  State-Level Match: {search_query}")
-                return f"{location.latitude}, {location.longitude}"
+                return location, "state"
         except:
             pass
 
     print(f"❌ Failed: {city}, {state}")
-    return "0,0"
+    return None, ""
 
 print("------------------------------------------------")
 print(f"🚀 Starting Round 2 Repairs on {len(df)} pilots...")
 print("------------------------------------------------")
 
-# Run the smart locator
-df['Coordinates'] = df.apply(get_smart_location, axis=1)
+# Run the smart locator (a state-level match never replaces a finer location)
+metrics.mark("geocode")
+metrics.count("rows_skipped", int((~needs(df, "place")).sum()))
+for index, row in df[needs(df, "place")].iterrows():
+    location, precision = get_smart_location(row)
+    if location:
+        metrics.count("rows_updated", int(assign(df, [index], location.latitude, location.longitude, "maps_advanced", precision).sum()))
 
 # Save
-df.to_csv(input_file, index=False)
+metrics.mark("save")
+write_csv_atomic(df, input_file)
 print("------------------------------------------------")
 print("🎉 REPAIR COMPLETE.")
-print("All pilots should now have coordinates (at least state-level).")
\ No newline at end of file
+print("All pilots should now have coordinates (at least state-level).")
+print(geolocator.stats())
+metrics.finish()
\ No newline at end of file
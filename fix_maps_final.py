@@ -1,79 +1,91 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
+from pilot_store import read_frame, _clean
 from geopy.exc import GeocoderTimedOut
-import time
 import os
+from geocode_cache import cached_geocoder, geocoder_option
+from checkpoint import Journal
+from locations import LOCATION_COLUMNS, ensure_columns, needs, assign
+import metrics
 
 # CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
 # LOAD DATA
+metrics.start("fix_maps_final")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("Error: CSV file not found.")
+    metrics.finish()
     exit()
 
-# Ensure Coordinates column exists
-if 'Coordinates' not in df.columns:
-    df['Coordinates'] = "0,0"
+# One canonical location per pilot (folds any legacy Coordinates column in)
+ensure_columns(df)
 
 # SETUP GEOLOCATOR
-geolocator = Nominatim(user_agent="drone_pilot_locator_final_v3")
+geolocator = cached_geocoder("drone_pilot_locator_final_v3", min_delay=0.5, backend=geocoder_option())
 
 def get_location(row):
-    # If we already have good coordinates, keep them!
-    current = str(row.get('Coordinates', '0,0'))
-    if current != "0,0" and "," in current and "nan" not in current:
-        return current
-
     # Prepare search
-    city = str(row.get('City', '')).replace("nan", "").strip()
-    state = str(row.get('State', '')).replace("nan", "").strip()
+    city = _clean(row.get('City', ''))
+    state = _clean(row.get('State', ''))
     
     if not city or not state:
-        return "0,0"
+        return None, ""
 
     # Strategy 1: City + State
     search1 = f"{city}, {state}, USA"
     try:
         loc = geolocator.geocode(search1, timeout=5)
         if loc:
-            return f"{loc.latitude}, {loc.longitude}"
+            return loc, "place"
     except:
         pass
-    
-    time.sleep(0.5) # Be polite to server
 
     # Strategy 2: State Center (Fallback)
     search2 = f"{state}, USA"
     try:
         loc = geolocator.geocode(search2, timeout=5)
         if loc:
-            return f"{loc.latitude}, {loc.longitude}"
+            return loc, "state"
     except:
         pass
 
-    return "0,0"
+    return None, ""
 
 print("------------------------------------------------")
 print(f"Starting GPS Search for {len(df)} pilots...")
-print("Saving progress every 10 rows...")
+print("Checkpointing every row (safe to stop and re-run)...")
 print("------------------------------------------------")
 
-# Iterate and save incrementally
+# Progress goes to an append-only journal; a restarted run picks up where it stopped
+journal = Journal(input_file, source="maps_final", columns=LOCATION_COLUMNS)
+journal.apply(df)
+
+# Rows already located to their city are never searched again
+metrics.mark("geocode")
+todo = needs(df, "place")
 for index, row in df.iterrows():
-    new_coords = get_location(row)
-    df.at[index, 'Coordinates'] = new_coords
+    if not todo[index] or journal.done(index):
+        metrics.count("rows_skipped")
+        continue
+    loc, precision = get_location(row)
+    if loc and assign(df, [index], loc.latitude, loc.longitude, "maps_final", precision).any():
+        journal.record(index, loc.latitude, loc.longitude, precision)
+        metrics.count("rows_updated")
+    else:
+        journal.record(index)
     
-    # Progress Bar & Save
+    # Progress Bar
     if index % 10 == 0:
-        print(f"Processed {index}/{len(df)} pilots... (Saved)")
-        df.to_csv(input_file, index=False)
+        print(f"Processed {index}/{len(df)} pilots...")
 
-# Final Save
-df.to_csv(input_file, index=False)
+# Final Save (atomic)
+metrics.mark("save")
+journal.compact(df)
 print("------------------------------------------------")
 print("COMPLETED! All pilots located.")
+print(geolocator.stats())
+metrics.finish()
 print("------------------------------------------------")
\ No newline at end of file
@@ -1,29 +1,44 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
-import time
+from pilot_store import read_frame
+from geocode_cache import cached_geocoder, geocoder_option
+from checkpoint import Journal
+from locations import LOCATION_COLUMNS, ensure_columns, needs, assign
+import metrics
 
 # CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
+metrics.start("fix_precision")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("Error: CSV file not found.")
+    metrics.finish()
     exit()
+ensure_columns(df)
 
-# Setup Geolocator
-geolocator = Nominatim(user_agent="drone_directory_precision_v3")
-geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1.5)
+# Setup Geolocator (cached; the 1.5s delay only applies to real lookups)
+geolocator = cached_geocoder("drone_directory_precision_v3", min_delay=1.5, backend=geocoder_option())
 
 print("------------------------------------------------")
 print(f"Starting PRECISION FIX on {len(df)} pilots...")
-print("This will take about 10-15 minutes. Please wait.")
+print("First run takes about 10-15 minutes. Cached re-runs take seconds.")
 print("------------------------------------------------")
 
+# Progress goes to an append-only journal; a restarted run picks up where it stopped
+journal = Journal(input_file, source="precision", columns=LOCATION_COLUMNS)
+journal.apply(df)
+
+# Pilots already located to their city are skipped without a lookup
+metrics.mark("geocode")
+todo = needs(df, "place")
 count = 0
 for index, row in df.iterrows():
+    if not todo[index] or journal.done(index):
+        metrics.count("rows_skipped")
+        continue
+
     city = str(row.get('City', '')).strip()
     state = str(row.get('State', '')).strip()
     
@@ -38,19 +53,22 @@ for index, row in df.iterrows():
         location = geolocator.geocode(search_query, timeout=10)
         
         if location:
-            df.at[index, 'Coordinates'] = f"{location.latitude}, {location.longitude}"
+            assign(df, [index], location.latitude, location.longitude, "precision", "place")
+            journal.record(index, location.latitude, location.longitude, "place")
             print(f" Fixed.")
             count += 1
+            metrics.count("rows_updated")
         else:
+            journal.record(index)
             print(" City not found (Keeping State center).")
             
     except Exception as e:
         print(f" Error: {e}")
 
-    if index % 10 == 0:
-        df.to_csv(input_file, index=False)
-
-df.to_csv(input_file, index=False)
+metrics.mark("save")
+journal.compact(df)
 print("------------------------------------------------")
 print(f"DONE! Updated {count} pilots with exact city locations.")
+print(geolocator.stats())
+metrics.finish()
 print("------------------------------------------------")
\ No newline at end of file
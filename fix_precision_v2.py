@@ -1,16 +1,22 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
-import time
+from geocode_async import default_engine
+from geocode_cache import geocoder_option
+from batch_geocode import geocode_unique, print_report
+from pilot_store import read_frame, resolve_columns
+from checkpoint import write_csv_atomic
+from locations import ensure_columns, needs, assign
+import metrics
 
 # CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
+metrics.start("fix_precision_v2")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("Error: CSV file not found.")
+    metrics.finish()
     exit()
 
 # SAFETY 1: Clean column names (remove spaces)
@@ -19,61 +25,38 @@ df.columns = df.columns.str.strip()
 # CHECK: Print columns to verify
 print(f"Columns found: {list(df.columns)}")
 
-# SAFETY 2: Check if City exists
-if 'City' not in df.columns:
-    print("CRITICAL ERROR: 'City' column is missing from CSV!")
-    print("Trying to find it...")
-    # Try to guess if it's named something else
-    for col in df.columns:
-        if "city" in col.lower():
-            print(f"Found '{col}' - renaming to 'City'")
-            df.rename(columns={col: 'City'}, inplace=True)
+# SAFETY 2: Resolve City/State whatever they are called (shared alias table)
+columns = resolve_columns(df.columns)
+if 'city' not in columns:
+    print("CRITICAL ERROR: no City column found in CSV!")
+city_col, state_col = columns.get('city', 'City'), columns.get('state', 'State')
+ensure_columns(df)
 
-# Setup Geolocator
-geolocator = Nominatim(user_agent="drone_directory_precision_v4")
+# Setup Geolocator (cached, offline-first, concurrent across configured providers)
+engine = default_engine("drone_directory_precision_v4", backend=geocoder_option())
 
 print("------------------------------------------------")
 print(f"Starting PRECISION FIX on {len(df)} pilots...")
 print("------------------------------------------------")
 
-count = 0
-for index, row in df.iterrows():
-    city = str(row.get('City', '')).strip()
-    state = str(row.get('State', '')).strip()
-    
-    # Debug first row only
-    if index == 0:
-        print(f"TEST ROW 1: Name={row.get('Name')} | City={city} | State={state}")
+# Debug first row only
+if len(df):
+    first = df.iloc[0]
+    print(f"TEST ROW 1: Name={first.get(columns.get('name'))} | City={first.get(city_col)} | State={first.get(state_col)}")
 
-    # Skip ONLY if truly empty
-    if not city or city == "nan" or not state or state == "nan":
-        continue
-
-    search_query = f"{city}, {state}, USA"
-    
-    # Print progress without special characters
-    print(f"[{index+1}] Finding: {search_query}...", end="", flush=True)
-    
-    try:
-        location = geolocator.geocode(search_query, timeout=10)
-        
-        if location:
-            df.at[index, 'Coordinates'] = f"{location.latitude}, {location.longitude}"
-            print(f" OK.")
-            count += 1
-        else:
-            print(f" No Match.")
-            
-    except Exception as e:
-        print(f" Error.")
-        time.sleep(1)
-
-    # Save every 10 rows
-    if index % 10 == 0:
-        df.to_csv(input_file, index=False)
+metrics.mark("geocode")
+# Each unique City/State is looked up once, then copied to every matching pilot
+# (pilots already located to their city are not looked up again)
+lat, lng, report = geocode_unique(df, engine, city_col=city_col, state_col=state_col, mask=needs(df, "place"))
+count = int(assign(df, lat.notna(), lat, lng, "precision_v2", "place").sum())
+metrics.count("rows_updated", count)
 
 # Final Save
-df.to_csv(input_file, index=False)
+metrics.mark("save")
+write_csv_atomic(df, input_file)
 print("------------------------------------------------")
+print_report(report)
 print(f"DONE! Updated {count} pilots.")
+engine.print_stats()
+metrics.finish()
 print("------------------------------------------------")
\ No newline at end of file
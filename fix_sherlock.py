@@ -1,28 +1,45 @@
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+from pilot_store import read_frame
 import time
+from geocode_cache import cached_geocoder, geocoder_option
+from checkpoint import Journal
+from locations import LOCATION_COLUMNS, ensure_columns, needs, assign, in_claimed_state
+import metrics
 
 # CONFIGURATION
 input_file = "drone_pilots_WITH_PHONES_FINAL.csv"
 
+metrics.start("fix_sherlock")
+metrics.mark("read")
 print(f"Reading {input_file}...")
 try:
-    df = pd.read_csv(input_file)
+    df = read_frame(input_file)
 except FileNotFoundError:
     print("Error: CSV file not found.")
+    metrics.finish()
     exit()
+ensure_columns(df)
 
 # Setup Geolocator
-geolocator = Nominatim(user_agent="drone_directory_sherlock_v2")
+geolocator = cached_geocoder("drone_directory_sherlock_v2", backend=geocoder_option())
 
 print("------------------------------------------------")
 print(f"Starting SHERLOCK SCAN on {len(df)} pilots...")
 print("If City is missing, we will search by Name or Business.")
 print("------------------------------------------------")
 
+# Progress goes to an append-only journal; a restarted run picks up where it stopped
+journal = Journal(input_file, source="sherlock", columns=LOCATION_COLUMNS)
+journal.apply(df)
+
+# Pilots already located to their city are skipped without a lookup
+metrics.mark("geocode")
+todo = needs(df, "place")
 count = 0
 for index, row in df.iterrows():
+    if not todo[index] or journal.done(index):
+        metrics.count("rows_skipped")
+        continue
+
     # Get all potential data points
     name = str(row.get('Name', '')).strip()
     business = str(row.get('Business', '')).strip()
@@ -37,38 +54,49 @@ for index, row in df.iterrows():
     search_query = ""
     strategy = ""
 
+    # A Business/Name hit can't be checked against a city, so it ranks below
+    # one and a later city geocode may still replace it
     if city and city != "nan":
         search_query = f"{city}, {state}, USA"
         strategy = "City"
+        precision = "place"
     elif business and business != "nan":
         search_query = f"{business}, {state}, USA"
         strategy = "Business"
+        precision = "county"
     else:
         search_query = f"{name}, {state}, USA"
         strategy = "Name"
+        precision = "county"
 
     print(f"[{index+1}] Searching ({strategy}): {search_query}...", end="", flush=True)
     
     try:
         location = geolocator.geocode(search_query, timeout=10)
         
-        if location:
-            df.at[index, 'Coordinates'] = f"{location.latitude}, {location.longitude}"
+        if location and not in_claimed_state([location.latitude], [location.longitude], [state])[0]:
+            # A namesake in another state, not this pilot
+            journal.record(index)
+            print(f" Wrong state.")
+        elif location:
+            assign(df, [index], location.latitude, location.longitude, "sherlock", precision)
+            journal.record(index, location.latitude, location.longitude, precision)
             print(f" FOUND.")
             count += 1
+            metrics.count("rows_updated")
         else:
+            journal.record(index)
             print(f" No match.")
             
     except Exception as e:
         print(f" Error.")
         time.sleep(1)
 
-    # Save every 5 rows
-    if index % 5 == 0:
-        df.to_csv(input_file, index=False)
-
-# Final Save
-df.to_csv(input_file, index=False)
+# Final Save (atomic)
+metrics.mark("save")
+journal.compact(df)
 print("------------------------------------------------")
 print(f"DONE! Sherlock found locations for {count} pilots.")
+print(geolocator.stats())
+metrics.finish()
 print("------------------------------------------------")
\ No newline at end of file
@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import difflib
+import statistics
+import numpy as np
+from geocode_cache import Location
+
+# --- CONFIGURATION ---
+GAZETTEER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer")
+FUZZY_CUTOFF = 0.85   # difflib ratio needed to accept a misspelled city
+# ---------------------
+
+# Match levels, finest first
+PLACE, COUNTY, STATE, NONE = 3, 2, 1, 0
+
+# STATE CENTERS (Lat, Lng) - the one copy every script should use
+STATE_CENTERS = {
+    'AL': (32.806671, -86.791130), 'AK': (61.370716, -152.404419), 'AZ': (33.729759, -111.431221),
+    'AR': (34.969704, -92.373123), 'CA': (36.116203, -119.681564), 'CO': (39.059811, -105.311104),
+    'CT': (41.597782, -72.755371), 'DE': (39.318523, -75.507141), 'DC': (38.897438, -77.026817),
+    'FL': (27.766279, -81.686783), 'GA': (33.040619, -83.643074), 'HI': (21.094318, -157.498337),
+    'ID': (44.240459, -114.478828), 'IL': (40.349457, -88.986137), 'IN': (39.849426, -86.258278),
+    'IA': (42.011539, -93.210526), 'KS': (38.526600, -96.726486), 'KY': (37.668140, -84.670067),
+    'LA': (31.169546, -91.867805), 'ME': (44.693947, -69.381927), 'MD': (39.063946, -76.802101),
+    'MA': (42.230171, -71.530106), 'MI': (43.326618, -84.536095), 'MN': (45.694454, -93.900192),
+    'MS': (32.741646, -89.678696), 'MO': (38.456085, -92.288368), 'MT': (46.921925, -110.454353),
+    'NE': (41.125370, -98.268082), 'NV': (38.313515, -117.055374), 'NH': (43.452492, -71.563896),
+    'NJ': (40.298904, -74.521011), 'NM': (34.840515, -106.248482), 'NY': (42.165726, -74.948051),
+    'NC': (35.630066, -79.806419), 'ND': (47.528912, -99.784012), 'OH': (40.388783, -82.764915),
+    'OK': (35.565342, -96.928917), 'OR': (44.572021, -122.070938), 'PA': (40.590752, -77.209755),
+    'RI': (41.680893, -71.511780), 'SC': (33.856892, -80.945007), 'SD': (44.299782, -99.438828),
+    'TN': (35.747845, -86.692345), 'TX': (31.054487, -97.563461), 'UT': (40.150032, -111.862434),
+    'VT': (44.045876, -72.710686), 'VA': (37.769337, -78.169968), 'WA': (47.400902, -121.490494),
+    'WV': (38.491226, -80.954453), 'WI': (44.268543, -89.616508), 'WY': (42.755966, -107.302490)
+}
+
+# STATE BOUNDING BOXES (south, north, west, east) - rounded outward to 0.01 deg.
+# Alaska's Aleutians cross 180; its box stops at -180 and points east of the
+# line are wrapped by callers (see locations.in_claimed_state).
+STATE_BOUNDS = {
+    'AL': (30.14, 35.01, -88.48, -84.88), 'AK': (51.21, 71.39, -180.0, -129.97), 'AZ': (31.33, 37.01, -114.82, -109.04),
+    'AR': (33.00, 36.50, -94.62, -89.64), 'CA': (32.53, 42.01, -124.42, -114.13), 'CO': (36.99, 41.01, -109.06, -102.04),
+    'CT': (40.98, 42.06, -73.73, -71.78), 'DE': (38.45, 39.84, -75.79, -75.04), 'DC': (38.79, 39.00, -77.12, -76.90),
+    'FL': (24.39, 31.01, -87.64, -79.97), 'GA': (30.35, 35.01, -85.61, -80.83), 'HI': (18.91, 28.41, -178.34, -154.80),
+    'ID': (41.98, 49.01, -117.25, -111.04), 'IL': (36.97, 42.51, -91.52, -87.49), 'IN': (37.77, 41.77, -88.10, -84.78),
+    'IA': (40.37, 43.51, -96.64, -90.14), 'KS': (36.99, 40.01, -102.06, -94.58), 'KY': (36.49, 39.15, -89.58, -81.96),
+    'LA': (28.92, 33.02, -94.05, -88.81), 'ME': (42.97, 47.46, -71.09, -66.94), 'MD': (37.88, 39.73, -79.49, -75.04),
+    'MA': (41.23, 42.89, -73.51, -69.92), 'MI': (41.69, 48.31, -90.42, -82.41), 'MN': (43.49, 49.39, -97.24, -89.48),
+    'MS': (30.17, 35.01, -91.66, -88.09), 'MO': (35.99, 40.62, -95.78, -89.09), 'MT': (44.35, 49.01, -116.06, -104.03),
+    'NE': (39.99, 43.01, -104.06, -95.30), 'NV': (35.00, 42.01, -120.01, -114.03), 'NH': (42.69, 45.31, -72.56, -70.60),
+    'NJ': (38.92, 41.36, -75.57, -73.88), 'NM': (31.33, 37.01, -109.06, -103.00), 'NY': (40.49, 45.02, -79.77, -71.85),
+    'NC': (33.84, 36.59, -84.33, -75.45), 'ND': (45.93, 49.01, -104.05, -96.55), 'OH': (38.40, 42.00, -84.83, -80.51),
+    'OK': (33.61, 37.01, -103.01, -94.43), 'OR': (41.99, 46.30, -124.71, -116.46), 'PA': (39.71, 42.27, -80.53, -74.68),
+    'RI': (41.14, 42.02, -71.91, -71.11), 'SC': (32.03, 35.22, -83.36, -78.54), 'SD': (42.47, 45.95, -104.07, -96.43),
+    'TN': (34.98, 36.68, -90.32, -81.64), 'TX': (25.83, 36.51, -106.65, -93.50), 'UT': (36.99, 42.01, -114.06, -109.04),
+    'VT': (42.72, 45.02, -73.44, -71.46), 'VA': (36.54, 39.47, -83.68, -75.16), 'WA': (45.54, 49.01, -124.85, -116.91),
+    'WV': (37.20, 40.64, -82.65, -77.71), 'WI': (42.49, 47.31, -92.89, -86.24), 'WY': (40.99, 45.01, -111.06, -104.05)
+}
+
+STATE_NAMES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL',
+    'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA',
+    'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV',
+    'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY',
+    'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR',
+    'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD',
+    'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+    'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY'
+}
+
+# Census place names carry a legal suffix ("Akron city", "Sunbury village")
+PLACE_SUFFIX = re.compile(r"\s+(city|town|village|borough|cdp|municipality|township|charter township|plantation)$")
+
+
+def state_code(state):
+    text = str(state).strip()
+    if text.upper() in STATE_CENTERS:
+        return text.upper()
+    return STATE_NAMES.get(text.lower(), "")
+
+
+def normalize_name(name):
+    text = str(name).lower().strip()
+    if text == "nan":
+        return ""
+    text = re.sub(r"\bsaint\b", "st", text)
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def read_census_file(path, level):
+    # Census Gazetteer files: tab separated, columns include USPS, NAME, INTPTLAT, INTPTLONG
+    rows = []
+    with open(path, encoding="latin-1") as f:
+        header = [h.strip() for h in f.readline().split("\t")]
+        col = {name: i for i, name in enumerate(header)}
+        for line in f:
+            parts = [p.strip() for p in line.split("\t")]
+            name = normalize_name(parts[col["NAME"]])
+            if level == PLACE:
+                name = PLACE_SUFFIX.sub("", name)
+            rows.append((name, parts[col["USPS"]], float(parts[col["INTPTLAT"]]), float(parts[col["INTPTLONG"]]), level))
+    return rows
+
+
+def read_zipcodes():
+    # Place and county layers from the `zipcodes` package's ZIP centroids, for
+    # when the Census files aren't at hand: a place (or county) sits at the
+    # median of its ZIP centroids, which keeps one outlying PO box from
+    # dragging it off. Military and inactive ZIPs are left out, and so are the
+    # few whose centroid is a placeholder (0, 0) or lies outside their state.
+    import zipcodes
+    places, counties = {}, {}
+    for z in zipcodes.list_all():
+        if not z["active"] or z["zip_code_type"] == "MILITARY" or z["state"] not in STATE_CENTERS:
+            continue
+        point = (float(z["lat"]), float(z["long"]))
+        south, north, west, east = STATE_BOUNDS[z["state"]]
+        if not (south <= point[0] <= north and west <= point[1] <= east):
+            continue
+        places.setdefault((PLACE_SUFFIX.sub("", normalize_name(z["city"])), z["state"]), []).append(point)
+        if z["county"]:
+            counties.setdefault((normalize_name(z["county"]), z["state"]), []).append(point)
+    rows = []
+    for level, groups in ((PLACE, places), (COUNTY, counties)):
+        for (name, st), points in groups.items():
+            rows.append((name, st, statistics.median(p[0] for p in points), statistics.median(p[1] for p in points), level))
+    return rows
+
+
+def build_gazetteer(out_dir=GAZETTEER_DIR, place_files=(), county_files=(), zip_centroids=False):
+    rows = [("", st, lat, lng, STATE) for st, (lat, lng) in STATE_CENTERS.items()]
+    for path in county_files:
+        rows += read_census_file(path, COUNTY)
+    for path in place_files:
+        rows += read_census_file(path, PLACE)
+    if zip_centroids:
+        # Census entries win where both name the same place or county
+        have = {(r[0], r[1], r[4]) for r in rows}
+        rows += [r for r in read_zipcodes() if (r[0], r[1], r[4]) not in have]
+    # Sorted by (state, name, finest level first) so each state is one contiguous slice
+    rows.sort(key=lambda r: (r[1], r[0], -r[4]))
+
+    os.makedirs(out_dir, exist_ok=True)
+    width = max(len(r[0]) for r in rows) or 1
+    np.save(os.path.join(out_dir, "name.npy"), np.array([r[0] for r in rows], dtype=f"S{width}"))
+    np.save(os.path.join(out_dir, "state.npy"), np.array([r[1] for r in rows], dtype="S2"))
+    np.save(os.path.join(out_dir, "lat.npy"), np.array([r[2] for r in rows], dtype="float64"))
+    np.save(os.path.join(out_dir, "lng.npy"), np.array([r[3] for r in rows], dtype="float64"))
+    np.save(os.path.join(out_dir, "level.npy"), np.array([r[4] for r in rows], dtype="int8"))
+    return len(rows)
+
+
+class Gazetteer:
+    def __init__(self, path=GAZETTEER_DIR):
+        if os.path.exists(os.path.join(path, "lat.npy")):
+            # Memory-mapped: only the pages a lookup touches are read from disk
+            load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+            self.name, self.state = load("name.npy"), load("state.npy")
+            self.lat, self.lng, self.level = load("lat.npy"), load("lng.npy"), load("level.npy")
+        else:
+            states = sorted(STATE_CENTERS)
+            self.name = np.array([b""] * len(states), dtype="S1")
+            self.state = np.array(states, dtype="S2")
+            self.lat = np.array([STATE_CENTERS[s][0] for s in states])
+            self.lng = np.array([STATE_CENTERS[s][1] for s in states])
+            self.level = np.full(len(states), STATE, dtype="int8")
+        self._index = None
+        self._names_by_state = None
+        self._fuzzy = {}
+
+    def _build_index(self):
+        # name|ST -> row, keeping the finest level when a place and county share a name
+        self._index, self._names_by_state = {}, {}
+        names = self.name.astype(str).tolist()
+        states = self.state.astype(str).tolist()
+        levels = np.asarray(self.level).tolist()   # Plain ints: indexing a memmap per row is slow
+        for i, (name, st) in enumerate(zip(names, states)):
+            key = f"{name}|{st}"
+            if key not in self._index or levels[i] > levels[self._index[key]]:
+                self._index[key] = i
+            if name:
+                self._names_by_state.setdefault(st, {}).setdefault(name[0], set()).add(name)
+
+    def _close_match(self, name, st):
+        # Only names that could reach FUZZY_CUTOFF: same first letter, and a
+        # length inside the band difflib's ratio (2 * matches / total) allows.
+        # Answers are memoized, misses included; a miss costs the most.
+        key = (name, st)
+        if key not in self._fuzzy:
+            low, high = len(name) * FUZZY_CUTOFF / (2 - FUZZY_CUTOFF), len(name) * (2 - FUZZY_CUTOFF) / FUZZY_CUTOFF
+            candidates = [c for c in self._names_by_state.get(st, {}).get(name[0], ()) if low <= len(c) <= high]
+            close = difflib.get_close_matches(name, sorted(candidates), n=1, cutoff=FUZZY_CUTOFF)
+            self._fuzzy[key] = self._index[f"{close[0]}|{st}"] if close else -1
+        return self._fuzzy[key]
+
+    def find(self, city, state, fuzzy=True):
+        # Returns the row number of the best match, or -1
+        if self._index is None:
+            self._build_index()
+        st = state_code(state)
+        if not st:
+            return -1
+        name = normalize_name(city)
+        if not name:
+            return self._index.get(f"|{st}", -1)
+        for candidate in (name, f"{name} county", PLACE_SUFFIX.sub("", name)):
+            if f"{candidate}|{st}" in self._index:
+                return self._index[f"{candidate}|{st}"]
+        if fuzzy:
+            return self._close_match(name, st)
+        return -1
+
+    def lookup(self, cities, states, fuzzy=True, fallback_to_state=True, return_level=False):
+        # Vectorized: each distinct (city, state) pair is resolved once, then broadcast
+        cities = np.asarray(cities, dtype=object)
+        states = np.asarray(states, dtype=object)
+        keys = np.array([f"{normalize_name(c)}|{state_code(s)}" for c, s in zip(cities, states)], dtype=object)
+        unique, inverse = np.unique(keys, return_inverse=True)
+
+        rows = np.full(len(unique), -1, dtype=np.int64)
+        for i, key in enumerate(unique):
+            city, st = key.split("|")
+            row = self.find(city, st, fuzzy=fuzzy)
+            if row < 0 and city and fallback_to_state:
+                row = self.find("", st)
+            rows[i] = row
+
+        hit = rows >= 0
+        u_lat = np.where(hit, np.asarray(self.lat)[rows.clip(0)], np.nan)
+        u_lng = np.where(hit, np.asarray(self.lng)[rows.clip(0)], np.nan)
+        u_level = np.where(hit, np.asarray(self.level)[rows.clip(0)], NONE).astype("int8")
+        lat, lng = u_lat[inverse], u_lng[inverse]
+        if return_level:
+            return lat, lng, u_level[inverse]
+        return lat, lng
+
+
+class GazetteerGeocoder:
+    # Answers "City, ST, USA" / "ST, USA" queries offline and only hands the
+    # query to the next geocoder when the gazetteer has nothing at that precision.
+    # A city query is only answered by a place: callers record the answer as
+    # place-level, so a county centroid (from find()'s "<name> county" guess)
+    # must not stand in for it. resolve() picks those up labelled "county".
+    def __init__(self, fallback=None, gazetteer=None):
+        self.fallback = fallback
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer()
+        self.offline_hits = 0
+
+    def geocode(self, query, **kwargs):
+        parts = [p.strip() for p in str(query).split(",")]
+        parts = [p for p in parts if p and p.lower() not in ("usa", "us", "united states", "nan")]
+        if 1 <= len(parts) <= 2 and state_code(parts[-1]):
+            city = parts[0] if len(parts) == 2 else ""
+            row = self.gazetteer.find(city, parts[-1])
+            if row >= 0 and self.gazetteer.level[row] == (PLACE if city else STATE):
+                self.offline_hits += 1
+                return Location(float(self.gazetteer.lat[row]), float(self.gazetteer.lng[row]))
+        if self.fallback is None:
+            return None
+        return self.fallback.geocode(query, **kwargs)
+
+
+if __name__ == "__main__":
+    # python gazetteer.py [--places 2023_Gaz_place_national.txt] [--counties 2023_Gaz_counties_national.txt] [--zipcodes]
+    # The shipped gazetteer/ was built with --zipcodes (pip install zipcodes)
+    args = sys.argv[1:]
+    places = [args[i + 1] for i, a in enumerate(args) if a == "--places"]
+    counties = [args[i + 1] for i, a in enumerate(args) if a == "--counties"]
+    count = build_gazetteer(place_files=places, county_files=counties, zip_centroids="--zipcodes" in args)
+    print(f"Gazetteer written to {GAZETTEER_DIR}/ ({count} entries)")
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import random
+import time
+from geopy.exc import GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited
+import metrics
+from metrics import LatencyHistogram   # Lives with the other run metrics; re-exported here
+from geocode_cache import Location, GeocodeCache, MISS, cache_key, CACHE_FILE, geocoder_backend, backend_cache_file, is_public
+
+# --- CONFIGURATION ---
+PROVIDERS_FILE = os.environ.get("GEOCODERS_CONFIG", "geocoders.json")
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0     # Seconds; doubles each attempt
+BACKOFF_CAP = 30.0
+LOCAL_RATE = 500       # Requests/second allowed against a local or self-hosted backend
+LOCAL_CONCURRENCY = 32
+# ---------------------
+
+# Errors worth retrying. Anything else (bad API key, bad query) fails fast.
+RETRYABLE = (GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited, ConnectionError, TimeoutError)
+
+# geocoders.json example - the commercial key is read from the environment:
+# [
+#   {"name": "commercial", "service": "googlev3", "rate": 50, "burst": 50,
+#    "concurrency": 20, "options": {"api_key": "$GEOCODER_API_KEY"}},
+#   {"name": "nominatim", "service": "nominatim", "rate": 1, "burst": 1,
+#    "options": {"user_agent": "drone_recovery_network"}, "geocode": {"country_codes": "us"}}
+# ]
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    # "Full jitter": spreads retries out so clients don't stampede together
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Provider:
+    def __init__(self, name, geocoder, rate=1.0, burst=1, concurrency=None, geocode_kwargs=None):
+        self.name = name
+        self.geocoder = geocoder
+        self.rate, self.burst = rate, burst
+        self.concurrency = concurrency or max(1, int(burst))
+        self.geocode_kwargs = geocode_kwargs or {}
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.errors = 0
+
+    def bind(self):
+        # Bucket and semaphore must be created inside the running event loop
+        self.bucket = TokenBucket(self.rate, self.burst)
+        self.slots = asyncio.Semaphore(self.concurrency)
+
+    async def geocode(self, query):
+        async with self.slots:
+            await self.bucket.acquire()
+            start = time.perf_counter()
+            self.calls += 1
+            metrics.count("geocode_calls")
+            try:
+                # geopy clients are blocking, so each call runs on a worker thread
+                return await asyncio.to_thread(self.geocoder.geocode, query, **self.geocode_kwargs)
+            except Exception:
+                self.errors += 1
+                metrics.count("geocode_errors")
+                raise
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                self.latency.record(ms)
+                metrics.observe("geocode_latency", ms)
+
+
+class GeocodeEngine:
+    # Resolves many queries concurrently. Queries are spread over the providers
+    # in proportion to their rate limits, each provider has its own token
+    # bucket, and a query that keeps failing on one provider fails over to the rest.
+    def __init__(self, providers, cache=None, offline=None, max_retries=MAX_RETRIES):
+        self.providers = list(providers)
+        self.cache = cache
+        self.offline = offline
+        self.max_retries = max_retries
+        self.cache_hits = 0
+        self.offline_hits = 0
+        self.errors = 0         # Queries that hit an error and ended without a location
+
+    async def _resolve(self, query, primary):
+        order = [primary] + [p for p in self.providers if p is not primary]
+        failed = False
+        for provider in order:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    location = await provider.geocode(query)
+                except RETRYABLE:
+                    failed = True
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                except Exception:
+                    failed = True
+                    break   # Not worth retrying here; try the next provider
+                if location is not None:
+                    location = Location(location.latitude, location.longitude)
+                elif failed:
+                    # Counted before the negative is cached: a later run answers
+                    # from the cache and would never see the error
+                    self.errors += 1
+                if self.cache is not None:
+                    # Keyed like CachedGeocoder: a US-only answer is not a worldwide one
+                    self.cache.put(query, location, **provider.geocode_kwargs)
+                return location
+        self.errors += 1
+        return None
+
+    def cached(self, query):
+        # Any provider's answer will do, as long as it was asked the same way
+        keys = {cache_key(query, **p.geocode_kwargs): p.geocode_kwargs for p in self.providers}
+        for kwargs in keys.values():
+            cached = self.cache.get(query, **kwargs)
+            if cached is not MISS:
+                return cached
+        return MISS
+
+    async def geocode_many_async(self, queries):
+        results, pending = {}, []
+        for query in dict.fromkeys(queries):
+            if self.cache is not None:
+                cached = self.cached(query)
+                if cached is not MISS:
+                    self.cache_hits += 1
+                    results[query] = cached
+                    continue
+            if self.offline is not None:
+                location = self.offline.geocode(query)
+                if location is not None:
+                    self.offline_hits += 1
+                    metrics.count("geocode_offline_hits")
+                    results[query] = location
+                    continue
+            pending.append(query)
+
+        for provider in self.providers:
+            provider.bind()
+        primaries = random.choices(self.providers, weights=[p.rate for p in self.providers], k=len(pending))
+        answers = await asyncio.gather(*(self._resolve(q, p) for q, p in zip(pending, primaries)))
+        results.update(zip(pending, answers))
+        return results
+
+    def geocode_many(self, queries):
+        return asyncio.run(self.geocode_many_async(queries))
+
+    def geocode(self, query, **kwargs):
+        return self.geocode_many([query])[query]
+
+    def stats(self):
+        return {
+            "cache_hits": self.cache_hits,
+            "offline_hits": self.offline_hits,
+            "errors": self.errors,
+            "providers": {
+                p.name: {"calls": p.calls, "errors": p.errors, "latency": p.latency.as_dict()}
+                for p in self.providers
+            },
+        }
+
+    def print_stats(self):
+        print(f"Answered from cache: {self.cache_hits}, offline: {self.offline_hits}, "
+              f"lookup errors: {self.errors}")
+        for p in self.providers:
+            lat = p.latency.as_dict()
+            print(f"  {p.name}: {p.calls} calls, {p.errors} errors, "
+                  f"mean {lat['mean_ms']}ms, p50 {metrics.bound_text(lat['p50_ms'])}, p95 {metrics.bound_text(lat['p95_ms'])}")
+
+
+def load_providers(path=PROVIDERS_FILE, user_agent="drone_recovery_network"):
+    # Falls back to a single polite Nominatim provider when no config exists
+    from geopy.geocoders import get_geocoder_for_service
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = [{"name": "nominatim", "service": "nominatim", "rate": 1, "burst": 1,
+                   "options": {"user_agent": user_agent}, "geocode": {"country_codes": "us"}}]
+
+    providers = []
+    for entry in config:
+        options = {k: os.path.expandvars(v) if isinstance(v, str) else v
+                   for k, v in entry.get("options", {}).items()}
+        geocoder = get_geocoder_for_service(entry["service"])(**options)
+        geocode_kwargs = {"timeout": 10, **entry.get("geocode", {})}
+        providers.append(Provider(entry.get("name", entry["service"]), geocoder,
+                                  rate=entry.get("rate", 1), burst=entry.get("burst", 1),
+                                  concurrency=entry.get("concurrency"), geocode_kwargs=geocode_kwargs))
+    return providers
+
+
+def default_engine(user_agent, cache_file=CACHE_FILE, offline=True, backend="nominatim"):
+    # backend: a --geocoder choice (see geocode_cache.BACKENDS). The public one
+    # uses geocoders.json; anything else is a single fast local provider.
+    from gazetteer import GazetteerGeocoder
+    if is_public(backend):
+        providers = load_providers(user_agent=user_agent)
+    else:
+        providers = [Provider(backend, geocoder_backend(backend, user_agent), rate=LOCAL_RATE, burst=LOCAL_RATE,
+                              concurrency=LOCAL_CONCURRENCY, geocode_kwargs={"timeout": 10})]
+    if backend in ("local", "offline"):
+        offline = False
+    return GeocodeEngine(providers, cache=GeocodeCache(backend_cache_file(backend, cache_file)),
+                         offline=GazetteerGeocoder() if offline else None)
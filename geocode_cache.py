@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+import metrics
+
+# --- CONFIGURATION ---
+CACHE_FILE = os.environ.get("GEOCODE_CACHE", "geocode_cache.sqlite")
+TTL_DAYS = 180            # How long a found location stays fresh
+NEGATIVE_TTL_DAYS = 14    # How long a "not found" answer is trusted
+MAX_ENTRIES = 50000       # Least-recently-used rows are evicted past this
+MIN_DELAY = 1.1           # Seconds between real network calls (Nominatim policy)
+LOCAL_URL = os.environ.get("GEOCODER_LOCAL_URL", "http://127.0.0.1:8765")  # geocode_server.py
+# ---------------------
+
+# --geocoder choices. "nominatim" is the public service; "local" is the
+# geocode_server.py stand-in; "offline" answers from the gazetteer in-process.
+# Any http(s):// URL is treated as a Nominatim-compatible server.
+BACKENDS = ("nominatim", "local", "offline")
+
+# Same shape geopy returns, so callers can keep using .latitude / .longitude
+Location = namedtuple("Location", ["latitude", "longitude"])
+
+MISS = object()
+
+# geocode() kwargs that change how a call is made but not what it answers
+TRANSPORT_KWARGS = ("timeout",)
+
+
+def normalize_query(query):
+    # "  Akron , oh,USA " and "akron, OH, USA" should share one cache row
+    text = str(query).lower()
+    parts = [re.sub(r"\s+", " ", p).strip() for p in text.split(",")]
+    parts = [p for p in parts if p and p != "nan"]
+    return ", ".join(parts)
+
+
+def cache_key(query, **kwargs):
+    # The normalized query, plus any kwargs that shape the answer
+    # (country_codes, language, ...): a US-only answer is not a worldwide one
+    options = {k: v for k, v in kwargs.items() if k not in TRANSPORT_KWARGS and v is not None}
+    if options.get("exactly_one") is True:
+        del options["exactly_one"]  # geopy's default
+    key = normalize_query(query)
+    if options:
+        key += " | " + json.dumps(options, sort_keys=True, default=str).lower()
+    return key
+
+
+class GeocodeCache:
+    def __init__(self, path=CACHE_FILE, ttl_days=TTL_DAYS,
+                 negative_ttl_days=NEGATIVE_TTL_DAYS, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " query TEXT PRIMARY KEY,"
+            " lat REAL, lng REAL,"
+            " found INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used)")
+        self.conn.commit()
+
+    def get(self, query, **kwargs):
+        # Returns MISS, None (cached "not found") or a Location
+        key = cache_key(query, **kwargs)
+        row = self.conn.execute(
+            "SELECT lat, lng, found, created FROM geocode WHERE query = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is not None:
+            lat, lng, found, created = row
+            ttl = self.ttl if found else self.negative_ttl
+            if now - created <= ttl:
+                self.hits += 1
+                metrics.count("geocode_cache_hits")
+                self.conn.execute("UPDATE geocode SET last_used = ? WHERE query = ?", (now, key))
+                self.conn.commit()
+                return Location(lat, lng) if found else None
+        self.misses += 1
+        metrics.count("geocode_cache_misses")
+        return MISS
+
+    def put(self, query, location, **kwargs):
+        key = cache_key(query, **kwargs)
+        now = time.time()
+        if location is None:
+            values = (key, None, None, 0, now, now)
+        else:
+            values = (key, float(location.latitude), float(location.longitude), 1, now, now)
+        self.conn.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)", values)
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+        extra = count - self.max_entries
+        if extra > 0:
+            self.conn.execute(
+                "DELETE FROM geocode WHERE query IN "
+                "(SELECT query FROM geocode ORDER BY last_used ASC LIMIT ?)", (extra,)
+            )
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {len(self)} entries"
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedGeocoder:
+    # Drop-in for a geopy geocoder: .geocode(query, **kwargs) -> Location or None.
+    # The politeness delay is only paid when we actually go to the network.
+    # `offline` (e.g. gazetteer.GazetteerGeocoder) is asked before the network.
+    def __init__(self, geolocator, cache=None, min_delay=MIN_DELAY, offline=None):
+        self.geolocator = geolocator
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.min_delay = min_delay
+        self.offline = offline
+        self.offline_hits = 0
+        self.last_call = 0.0
+
+    def geocode(self, query, **kwargs):
+        if kwargs.get("exactly_one") is False:
+            # A list of candidates: nothing the one-location cache can hold
+            return self.geolocator.geocode(query, **kwargs)
+        cached = self.cache.get(query, **kwargs)
+        if cached is not MISS:
+            return cached
+
+        if self.offline is not None:
+            location = self.offline.geocode(query)
+            if location is not None:
+                self.offline_hits += 1
+                metrics.count("geocode_offline_hits")
+                return location
+
+        wait = self.min_delay - (time.time() - self.last_call)
+        if wait > 0:
+            time.sleep(wait)
+        metrics.count("geocode_calls")
+        start = time.perf_counter()
+        try:
+            # Errors are not cached, so a flaky run doesn't poison later ones
+            location = self.geolocator.geocode(query, **kwargs)
+        except Exception:
+            metrics.count("geocode_errors")
+            raise
+        finally:
+            self.last_call = time.time()
+            metrics.observe("geocode_latency", (time.perf_counter() - start) * 1000)
+
+        if location is not None:
+            location = Location(location.latitude, location.longitude)
+        self.cache.put(query, location, **kwargs)
+        return location
+
+    def stats(self):
+        return f"{self.cache.stats()}, {self.offline_hits} answered offline"
+
+
+class StubGeocoder:
+    # Offline stand-in for tests: answers from a {query: (lat, lng)} dict
+    def __init__(self, answers=None):
+        self.answers = {normalize_query(k): v for k, v in (answers or {}).items()}
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        self.calls += 1
+        hit = self.answers.get(normalize_query(query))
+        return Location(*hit) if hit else None
+
+
+def backend_choice(backend):
+    # argparse type= for --geocoder, for scripts that declare it themselves
+    if backend not in BACKENDS and not backend.startswith(("http://", "https://")):
+        raise argparse.ArgumentTypeError(f"must be one of {', '.join(BACKENDS)} or a URL, not {backend!r}")
+    return backend
+
+
+def geocoder_option(default="nominatim"):
+    # Reads --geocoder from the command line without disturbing a script's own arguments
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--geocoder", default=default)
+    backend = parser.parse_known_args(sys.argv[1:])[0].geocoder
+    try:
+        return backend_choice(backend)
+    except argparse.ArgumentTypeError as e:
+        sys.exit(f"--geocoder {e}")
+
+
+def geocoder_backend(backend="nominatim", user_agent="drone_recovery_network"):
+    # A geopy-style object with .geocode(query, **kwargs) for each --geocoder choice
+    from gazetteer import GazetteerGeocoder
+    if backend == "offline":
+        return GazetteerGeocoder()
+    from geopy.geocoders import Nominatim
+    if backend == "nominatim":
+        return Nominatim(user_agent=user_agent)
+    url = urlparse(LOCAL_URL if backend == "local" else backend)
+    return Nominatim(user_agent=user_agent, domain=url.netloc, scheme=url.scheme)
+
+
+def backend_cache_file(backend, cache_file=CACHE_FILE):
+    # Stand-in answers must never end up in the real cache
+    if backend == "nominatim":
+        return cache_file
+    root, ext = os.path.splitext(cache_file)
+    return f"{root}.{re.sub(r'[^a-z0-9]+', '_', backend.lower()).strip('_')}{ext}"
+
+
+def is_public(backend):
+    return backend == "nominatim"
+
+
+def cached_geocoder(user_agent, min_delay=MIN_DELAY, cache_file=CACHE_FILE, offline=True, backend="nominatim"):
+    from gazetteer import GazetteerGeocoder
+    # The stand-ins are the gazetteer already and need no politeness delay
+    if backend in ("local", "offline"):
+        offline = False
+    if not is_public(backend):
+        min_delay = 0
+    return CachedGeocoder(geocoder_backend(backend, user_agent), GeocodeCache(backend_cache_file(backend, cache_file)),
+                          min_delay, offline=GazetteerGeocoder() if offline else None)
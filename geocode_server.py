@@ -0,0 +1,83 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import zlib
+from gazetteer import GazetteerGeocoder
+import standin_server
+from standin_server import StandIn
+
+# Local stand-in for the Nominatim search API.
+#
+# Answers GET /search?q=City, ST, USA&format=json from the bundled gazetteer,
+# in the same JSON shape Nominatim returns, so geopy's Nominatim client (and
+# therefore every script here) can point at it with --geocoder local. Latency
+# and failures are configurable, which makes throughput and retry behaviour
+# reproducible without touching the public service.
+#
+#   python geocode_server.py --port 8765 --latency 0.05 --jitter 0.02 --error-rate 0.05
+
+# --- CONFIGURATION ---
+HOST = "127.0.0.1"
+PORT = 8765
+# ---------------------
+
+
+class GeocodeStandIn(StandIn):
+    route = "/search"
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        super().__init__(latency, jitter, error_rate, seed=seed)
+        self.geocoder = GazetteerGeocoder()
+
+    def answer(self, params):
+        # Free-form q=..., or Nominatim's structured city=/state= form
+        return self.search(params.get("q") or ", ".join(p for p in (params.get("city"), params.get("state")) if p))
+
+    def search(self, query):
+        location = self.geocoder.geocode(query)
+        if location is None:
+            return []
+        self.hit()
+        return [{
+            "place_id": zlib.crc32(query.encode("utf-8")),
+            "lat": str(location.latitude), "lon": str(location.longitude),
+            "display_name": query, "class": "place", "type": "gazetteer",
+            "importance": 0.5,
+        }]
+
+
+def make_server(host=HOST, port=PORT, **options):
+    return standin_server.make_server(GeocodeStandIn(**options), host, port)
+
+
+def serve_in_background(host=HOST, port=0, **options):
+    # For benchmarks: port 0 picks a free port. Returns (server, base_url);
+    # call server.shutdown() when done.
+    return standin_server.serve_in_background(make_server(host, port, **options))
+
+
+def serve_in_subprocess(host=HOST, port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+    # Like serve_in_background, but in its own process so the server's request
+    # threads don't compete for the caller's GIL. Returns (process, base_url);
+    # call process.terminate() when done.
+    command = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(port),
+               "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate), "--seed", str(seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()   # Printed once the socket is listening
+    found = re.search(r"http://\S+?:\d+", banner)
+    if not found:
+        process.kill()
+        raise RuntimeError(f"geocoder stand-in failed to start: {banner.strip()!r}")
+    return process, found.group(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nominatim-compatible geocoder backed by the local gazetteer.")
+    standin_server.add_arguments(parser, HOST, PORT)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, seed=args.seed)
+    standin_server.serve_forever(server, "Geocoder stand-in on {url}/search (Ctrl+C to stop)")
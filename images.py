@@ -0,0 +1,270 @@
+import argparse
+import functools
+import hashlib
+import io
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import pillow_heif
+    pillow_heif.register_heif_opener()   # Some headshots are iPhone .heic
+except ImportError:
+    pillow_heif = None
+
+# Headshot pipeline.
+#
+# Photo URLs point at full-size originals on the Shopify CDN (some .heic,
+# which browsers can't show). This step downloads each one once into a
+# content-addressed cache (CACHE_DIR/<sha[:2]>/<sha>), remembering its ETag
+# so later runs send a conditional request and skip unchanged images. Each
+# new original is then cropped and resized into small WebP thumbnails, plus
+# AVIF where Pillow can write it (IMAGES_DIR/<sha>-<px>.<ext>), in a process pool. The builder links only
+# those thumbnails; it never hotlinks the originals.
+#
+#   python images.py                           # fetch + convert everything new
+#   python images.py --source ~/headshots      # offline: originals from a folder
+#
+# With --source (or IMAGE_SOURCE_DIR) the URL's file name is looked up in a
+# local folder instead of the network, with the file's size and mtime
+# standing in for the ETag.
+
+# --- CONFIGURATION ---
+DB_FILE = "drone_pilots_WITH_PHONES_FINAL.csv"
+CACHE_DIR = ".image_cache"
+INDEX_FILE = os.path.join(CACHE_DIR, "index.json")   # url -> etag, sha, thumbnails done
+IMAGES_DIR = "img"
+SIZES = (128, 256)                 # Displayed at 128 CSS px: 1x and 2x
+FORMATS = {"avif": 50, "webp": 75}  # format -> quality, preferred first
+FALLBACK = "webp"                   # The <img> format; a headshot without it is not usable
+FETCH_WORKERS = 8
+TIMEOUT = 20
+USER_AGENT = "drone_directory_images_v1"
+SOURCE_DIR = os.environ.get("IMAGE_SOURCE_DIR")
+# ---------------------
+
+
+class HttpSource:
+    # Returns (status, body, etag); 304 means "same as the etag you sent"
+    def fetch(self, url, etag=None):
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                return response.status, response.read(), response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            return e.code, None, etag
+
+
+class LocalSource:
+    # Offline stand-in: <folder>/<file name from the URL>
+    def __init__(self, folder):
+        self.folder = folder
+
+    def fetch(self, url, etag=None):
+        path = os.path.join(self.folder, os.path.basename(urlparse(url).path))
+        if not os.path.exists(path):
+            return 404, None, etag
+        stat = os.stat(path)
+        tag = f'"{stat.st_size}-{stat.st_mtime_ns}"'
+        if tag == etag:
+            return 304, None, etag
+        with open(path, "rb") as f:
+            return 200, f.read(), tag
+
+
+def original_path(sha):
+    return os.path.join(CACHE_DIR, sha[:2], sha)
+
+
+def thumbnail_name(sha, size, ext):
+    return f"{sha}-{size}.{ext}"
+
+
+def has_thumbnails(sha, out_dir=IMAGES_DIR, ext=FALLBACK):
+    return all(os.path.exists(os.path.join(out_dir, thumbnail_name(sha, size, ext))) for size in SIZES)
+
+
+@functools.lru_cache(maxsize=None)
+def writable_formats():
+    # The FORMATS this Pillow build can save (AVIF needs a recent Pillow or a plugin)
+    usable = []
+    for ext in FORMATS:
+        try:
+            Image.new("RGB", (1, 1)).save(io.BytesIO(), format=ext)
+        except Exception:
+            continue
+        usable.append(ext)
+    return tuple(usable)
+
+
+def load_index(path=INDEX_FILE):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_index(index, path=INDEX_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def fetch_one(source, url, entry):
+    # -> (url, new entry or None, outcome)
+    try:
+        status, body, etag = source.fetch(url, entry.get("etag") if entry else None)
+    except (OSError, ValueError) as e:
+        return url, None, f"error: {e}"
+    if status == 304 and entry:
+        return url, entry, "unchanged"
+    if status != 200 or not body:
+        return url, None, f"HTTP {status}"
+    sha = hashlib.sha256(body).hexdigest()[:20]
+    path = original_path(sha)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+    updated = {"etag": etag, "sha": sha, "bytes": len(body)}
+    if entry and entry.get("sha") == sha:
+        updated["thumbnails"] = entry.get("thumbnails", False)
+    return url, updated, "fetched"
+
+
+def make_thumbnails(sha, out_dir=IMAGES_DIR):
+    # Runs in a worker process. Square centre crop, one file per size and format.
+    # Returns (sha, None) or (sha, error text). Only a failed FALLBACK is an
+    # error: a missing AVIF just leaves that <source> out of the page.
+    try:
+        with Image.open(original_path(sha)) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            thumbs = [(size, ImageOps.fit(img, (size, size), Image.LANCZOS)) for size in SIZES]
+    except Exception as e:   # Corrupt or unsupported file: keep going, report it
+        return sha, f"{type(e).__name__}: {e}"
+    error = None
+    for ext in writable_formats():
+        try:
+            for size, thumb in thumbs:
+                thumb.save(os.path.join(out_dir, thumbnail_name(sha, size, ext)), quality=FORMATS[ext])
+        except Exception as e:
+            if ext == FALLBACK:
+                error = f"{type(e).__name__}: {e}"
+    if FALLBACK not in writable_formats():
+        error = f"Pillow cannot write {FALLBACK}"
+    return sha, error
+
+
+def process(urls, source=None, jobs=None, out_dir=IMAGES_DIR, verbose=True):
+    # Fetch + convert every URL. Returns a report dict; the index is saved.
+    source = source or (LocalSource(SOURCE_DIR) if SOURCE_DIR else HttpSource())
+    index = load_index()
+    urls = sorted({u for u in urls if u})
+    report = {"urls": len(urls), "fetched": 0, "unchanged": 0, "failed": 0, "converted": 0,
+              "skipped": 0, "ready": 0, "original_bytes": 0, "thumbnail_bytes": 0}
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        for url, entry, outcome in pool.map(lambda u: fetch_one(source, u, index.get(u)), urls):
+            if entry is None:
+                report["failed"] += 1
+                if verbose:
+                    print(f"   ! {outcome}: {url}")
+                continue   # A previous good copy (if any) stays in the index
+            index[url] = entry
+            report[outcome] += 1
+
+    os.makedirs(out_dir, exist_ok=True)
+    entries = [index[u] for u in urls if u in index]
+    todo = sorted({e["sha"] for e in entries if not e.get("thumbnails") or not has_thumbnails(e["sha"], out_dir)})
+    report["skipped"] = len({e["sha"] for e in entries}) - len(todo)
+    if todo and Image is None:
+        print("   ! Pillow is not installed: originals are cached, no thumbnails made")
+    elif todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            errors = dict(pool.map(make_thumbnails, todo, [out_dir] * len(todo)))
+        for entry in entries:
+            if entry["sha"] in errors:
+                entry["thumbnails"] = errors[entry["sha"]] is None
+                if errors[entry["sha"]] and verbose:
+                    print(f"   ! {errors[entry['sha']]}: {entry['sha']}")
+        report["converted"] = sum(1 for error in errors.values() if error is None)
+    save_index(index)
+
+    # What one profile view downloads: the original vs the 1x thumbnail in the
+    # first (preferred) format
+    for entry in entries:
+        if entry.get("thumbnails"):
+            report["ready"] += 1
+            report["original_bytes"] += entry["bytes"]
+            ext = formats(entry["sha"], out_dir)[0]
+            report["thumbnail_bytes"] += os.path.getsize(os.path.join(out_dir, thumbnail_name(entry["sha"], SIZES[0], ext)))
+    return report
+
+
+def ready(index=None, out_dir=IMAGES_DIR):
+    # url -> sha for every headshot whose thumbnails are on disk (what the builder may link)
+    index = load_index() if index is None else index
+    return {url: e["sha"] for url, e in index.items() if e.get("thumbnails") and has_thumbnails(e["sha"], out_dir)}
+
+
+def prune(keep_shas, out_dir=IMAGES_DIR):
+    # Thumbnails no current pilot uses
+    removed = 0
+    if os.path.exists(out_dir):
+        for filename in os.listdir(out_dir):
+            if filename.split("-")[0] not in keep_shas:
+                os.remove(os.path.join(out_dir, filename))
+                removed += 1
+    return removed
+
+
+def formats(sha, out_dir=IMAGES_DIR):
+    # The FORMATS this headshot has thumbnails in, preferred first
+    return [ext for ext in FORMATS if has_thumbnails(sha, out_dir, ext)]
+
+
+def picture(sha, alt, prefix="", out_dir=IMAGES_DIR):
+    # <picture> with a source per format on disk (AVIF/WebP) at 1x/2x; the <img> fallback is WebP
+    def srcset(ext):
+        return ", ".join(f"{prefix}{IMAGES_DIR}/{thumbnail_name(sha, size, ext)} {size // SIZES[0]}x" for size in SIZES)
+    sources = "".join(f'<source type="image/{ext}" srcset="{srcset(ext)}">' for ext in formats(sha, out_dir))
+    fallback = f"{prefix}{IMAGES_DIR}/{thumbnail_name(sha, SIZES[0], FALLBACK)}"
+    return (f'<picture>{sources}<img class="headshot" src="{fallback}" alt="{alt}" '
+            f'width="{SIZES[0]}" height="{SIZES[0]}" decoding="async"></picture>')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, cache and thumbnail pilot headshots.")
+    parser.add_argument("csv", nargs="?", default=DB_FILE)
+    parser.add_argument("--source", default=SOURCE_DIR, help="read originals from this folder instead of the network")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="conversion worker processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    from pilot_store import PilotStore
+    store = PilotStore.load(args.csv)
+    started = time.perf_counter()
+    print(f"🖼️  Processing headshots for {len(store)} pilots...")
+    report = process([row["photo_url"] for row in store.rows()],
+                     LocalSource(args.source) if args.source else HttpSource(), args.jobs)
+    print("------------------------------------------------")
+    print(f"DONE! {report['urls']} images: {report['fetched']} fetched, {report['unchanged']} unchanged, "
+          f"{report['failed']} failed; {report['converted']} converted, {report['skipped']} already done "
+          f"({time.perf_counter() - started:.1f}s)")
+    if report["ready"]:
+        print(f"Per profile: {report['original_bytes'] / report['ready'] / 1024:.0f} KB original -> "
+              f"{report['thumbnail_bytes'] / report['ready'] / 1024:.1f} KB thumbnail")
+    print("------------------------------------------------")
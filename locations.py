@@ -0,0 +1,214 @@
+import sys
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from gazetteer import Gazetteer, STATE_CENTERS, STATE_BOUNDS, PLACE, COUNTY, STATE, state_code
+
+# One canonical location per pilot.
+#
+# Over time the CSV grew three competing position fields: "Coordinates" (a
+# "lat, lng" string written by the fix_* scripts) and separate latitude /
+# longitude columns (written by fix_geolocation_nuclear), and they often
+# disagree - row 1 (KY) had Kentucky in one and Georgia in the other.
+#
+# resolve() parses every candidate once (vectorized), scores it by precision
+# (geocoded city > county > state centroid > scatter), throws out candidates
+# that are not in the pilot's own state, and keeps the winner in
+# latitude / longitude together with where it came from, how precise it is
+# and when it was set. Coordinates is then dropped. Every script and the
+# builder read and write only these columns; assign() never lets a coarser
+# answer overwrite a finer one, so resolved rows are not re-geocoded.
+
+# --- CONFIGURATION ---
+DB_FILE = "drone_pilots_WITH_PHONES_FINAL.csv"
+LAT_COL, LNG_COL = "latitude", "longitude"
+SOURCE_COL, PRECISION_COL, UPDATED_COL = "location_source", "location_precision", "location_updated"
+LEGACY_COL = "Coordinates"
+STATE_MARGIN = 0.1          # Degrees a point may sit outside its state's bounding box (coastal/border geocodes)
+SCATTER_BOX = (0.5, 0.6)    # fix_scatter's jitter (deg lat, deg lng) around a centroid
+# ---------------------
+
+LOCATION_COLUMNS = (LAT_COL, LNG_COL, SOURCE_COL, PRECISION_COL, UPDATED_COL)
+
+# Precision labels, coarsest last. A higher rank always wins.
+PRECISION_RANK = {"place": 4, "county": 3, "state": 2, "scatter": 1, "": 0}
+LEVEL_PRECISION = {PLACE: "place", COUNTY: "county", STATE: "state"}
+
+_states = sorted(STATE_CENTERS)
+_bounds = np.array([STATE_BOUNDS[s] for s in _states])   # south, north, west, east
+
+
+def now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_coordinates(values):
+    # Vectorized "lat, lng" parser: one regex pass over the whole column.
+    # Blank, "nan", junk and the old "0,0" placeholder all become NaN.
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(r"^\s*(-?[\d.]+)\s*,\s*(-?[\d.]+)\s*$")
+    lat = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype="float64", copy=True)
+    lng = pd.to_numeric(parts[1], errors="coerce").to_numpy(dtype="float64", copy=True)
+    zero = (lat == 0) & (lng == 0)
+    lat[zero] = np.nan
+    lng[zero] = np.nan
+    return lat, lng
+
+
+def in_claimed_state(lat, lng, states, margin=STATE_MARGIN):
+    # True where the point lies inside the pilot's state's bounding box (plus
+    # `margin` degrees). Boxes over-accept near borders but never reject a real
+    # geocode, however far it is from the state's center; they exist to catch
+    # a Kentucky pilot sitting in Georgia. Rows without a recognised state
+    # can't be checked and pass; missing points fail.
+    lat, lng = np.asarray(lat, dtype="float64"), np.asarray(lng, dtype="float64")
+    codes = np.array([state_code(s) for s in states], dtype=object)
+    ok = ~(np.isnan(lat) | np.isnan(lng))
+    known = np.isin(codes, _states) & ok
+    if known.any():
+        south, north, west, east = _bounds[np.searchsorted(_states, codes[known].astype(str))].T
+        x = np.where(lng[known] > 0, lng[known] - 360, lng[known])   # Aleutians east of 180
+        ok[known] = ((lat[known] >= south - margin) & (lat[known] <= north + margin) &
+                     (x >= west - margin) & (x <= east + margin))
+    return ok
+
+
+def looks_scattered(lat, lng, base_lat, base_lng):
+    # A point inside the jitter box around its centroid (but not on it) is a
+    # scattered centroid, not a real geocode
+    dlat, dlng = np.abs(lat - base_lat), np.abs(lng - base_lng)
+    return (dlat <= SCATTER_BOX[0]) & (dlng <= SCATTER_BOX[1]) & ((dlat > 1e-6) | (dlng > 1e-6))
+
+
+def column(df, name, default=""):
+    if name in df.columns:
+        return df[name].fillna(default).to_numpy()
+    return np.full(len(df), default, dtype=object)
+
+
+def precision_rank(df):
+    if PRECISION_COL not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    has = ~(pd.to_numeric(df[LAT_COL], errors="coerce").isna().to_numpy())
+    ranks = np.array([PRECISION_RANK.get(str(p), 0) for p in column(df, PRECISION_COL)], dtype=np.int64)
+    return np.where(has, ranks, 0)
+
+
+def needs(df, precision="place"):
+    # Rows whose canonical location is coarser than `precision` (or missing).
+    # `precision` may be one label or one per row.
+    target = pd.Series(precision, index=df.index, dtype=object).map(PRECISION_RANK).fillna(0).to_numpy()
+    return pd.Series(precision_rank(df) < target, index=df.index)
+
+
+def query_precision(df, city_col="City"):
+    # What a "City, ST" geocode is worth per row: a city if there is one, else the state
+    return np.where([bool(str(c).strip()) for c in column(df, city_col)], "place", "state")
+
+
+def ensure_columns(df):
+    # Scripts call this right after read_csv. A CSV still carrying the legacy
+    # Coordinates column is resolved first, so nothing downstream parses it.
+    if LEGACY_COL in df.columns or SOURCE_COL not in df.columns:
+        resolve(df)
+    return df
+
+
+def assign(df, rows, lat, lng, source, precision, force=False):
+    # Writes new locations for `rows` (bool mask or index labels), skipping any
+    # row whose location is already as fine (so a re-run doesn't churn the
+    # provenance columns). force=True writes regardless. Returns the mask written.
+    for name in LOCATION_COLUMNS:
+        if name not in df.columns:
+            df[name] = np.nan if name in (LAT_COL, LNG_COL) else ""
+    mask = np.asarray(rows)
+    rows = pd.Series(mask if mask.dtype == bool else df.index.isin(mask), index=df.index)
+    lat = pd.Series(lat, index=df.index, dtype="float64")
+    lng = pd.Series(lng, index=df.index, dtype="float64")
+    precision = pd.Series(precision, index=df.index, dtype=object)
+    new_rank = precision.map(PRECISION_RANK).fillna(0).to_numpy()
+    write = rows & lat.notna() & lng.notna()
+    if not force:
+        write &= new_rank > precision_rank(df)
+    df.loc[write, LAT_COL] = lat[write]
+    df.loc[write, LNG_COL] = lng[write]
+    df.loc[write, SOURCE_COL] = source
+    df.loc[write, PRECISION_COL] = precision[write]
+    df.loc[write, UPDATED_COL] = now()
+    return write
+
+
+def resolve(df, gazetteer=None):
+    # Picks one location per row from every candidate on hand and stores it in
+    # the canonical columns (in place). Returns a small report dict.
+    n = len(df)
+    cities, states = column(df, "City"), column(df, "State")
+    geocoded = query_precision(df)
+    has_city = geocoded == "place"
+    base_lat, base_lng, base_level = (gazetteer or Gazetteer()).lookup(cities, states, return_level=True)
+
+    # (lat, lng, source, precision) - on equal precision, earlier candidates win
+    candidates = []
+    if SOURCE_COL in df.columns:
+        candidates.append((pd.to_numeric(df[LAT_COL], errors="coerce").to_numpy(dtype="float64"),
+                           pd.to_numeric(df[LNG_COL], errors="coerce").to_numpy(dtype="float64"),
+                           column(df, SOURCE_COL), column(df, PRECISION_COL)))
+    if LEGACY_COL in df.columns:
+        lat, lng = parse_coordinates(column(df, LEGACY_COL))
+        kind = np.where(looks_scattered(lat, lng, base_lat, base_lng) & ~has_city, "scatter", geocoded)
+        candidates.append((lat, lng, np.full(n, "coordinates", dtype=object), kind))
+    if SOURCE_COL not in df.columns and LAT_COL in df.columns:
+        lat = pd.to_numeric(df[LAT_COL], errors="coerce").to_numpy(dtype="float64")
+        lng = pd.to_numeric(df[LNG_COL], errors="coerce").to_numpy(dtype="float64")
+        candidates.append((lat, lng, np.full(n, "latlng", dtype=object), geocoded))
+    candidates.append((base_lat, base_lng, np.full(n, "gazetteer", dtype=object),
+                       np.array([LEVEL_PRECISION.get(int(l), "") for l in base_level], dtype=object)))
+
+    # Score = precision rank, or -1 when the point is missing or in the wrong state
+    scores = np.stack([
+        np.where(in_claimed_state(lat, lng, states),
+                 [PRECISION_RANK.get(str(p), 0) for p in precision], -1)
+        for lat, lng, _, precision in candidates
+    ])
+    best = np.argmax(scores, axis=0)          # argmax keeps the first of equal scores
+    rows = np.arange(n)
+    found = scores[best, rows] > 0
+    pick = lambda k: np.array([candidates[b][k][i] for i, b in enumerate(best)], dtype=object)
+    lat, lng = pick(0).astype("float64"), pick(1).astype("float64")
+    source, precision = pick(2), pick(3)
+
+    old_updated = column(df, UPDATED_COL) if UPDATED_COL in df.columns else np.full(n, "", dtype=object)
+    kept = (best == 0) & (SOURCE_COL in df.columns)
+    stamp = now()
+    df[LAT_COL] = np.where(found, lat, np.nan)
+    df[LNG_COL] = np.where(found, lng, np.nan)
+    df[SOURCE_COL] = np.where(found, source, "")
+    df[PRECISION_COL] = np.where(found, precision, "")
+    df[UPDATED_COL] = np.where(found & ~kept, stamp, np.where(found, old_updated, ""))
+    rejected = int(((scores == -1) & ~np.isnan(np.stack([c[0].astype("float64") for c in candidates]))).sum())
+    if LEGACY_COL in df.columns:
+        df.drop(columns=[LEGACY_COL], inplace=True)
+    return {
+        "rows": n,
+        "located": int(found.sum()),
+        "rejected_candidates": rejected,
+        "by_source": pd.Series(df[SOURCE_COL]).value_counts().to_dict(),
+        "by_precision": pd.Series(df[PRECISION_COL]).value_counts().to_dict(),
+    }
+
+
+def print_report(report):
+    print(f"Located {report['located']}/{report['rows']} pilots "
+          f"({report['rejected_candidates']} candidate points rejected as out-of-state).")
+    for key in ("by_precision", "by_source"):
+        print(f"  {key[3:]:<10} " + ", ".join(f"{k or 'none'}: {v}" for k, v in report[key].items()))
+
+
+if __name__ == "__main__":
+    # python locations.py [file.csv] - resolves the CSV in place
+    from checkpoint import write_csv_atomic
+    from pilot_store import read_frame
+    path = sys.argv[1] if len(sys.argv) > 1 else DB_FILE
+    df = read_frame(path)
+    report = resolve(df)
+    write_csv_atomic(df, path)
+    print_report(report)
@@ -0,0 +1,246 @@
+import bisect
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Run metrics for the geocoding scripts, the builder and the pipeline.
+#
+# A script calls start("<name>") once, marks its phases, and finish() at the
+# end; library code (geocode cache, geocoders, builder) just bumps counters
+# and records latencies on whatever run is current. Nothing is written unless
+# a script called start(), so library calls cost one dict update.
+#
+#   metrics.start("fix_precision")
+#   metrics.mark("read")            # phase timer: runs until the next mark
+#   metrics.count("rows_skipped")
+#   metrics.observe("geocode_latency", ms)
+#   metrics.finish()                # -> metrics/fix_precision.json + .prom
+#
+# finish() writes a JSON run report and a Prometheus text file (point the
+# node_exporter textfile collector at METRICS_DIR to scrape nightly builds).
+# METRICS_PROFILE=1 adds a cProfile capture (<name>.pstats plus the top
+# functions in the report); METRICS_TRACEMALLOC=1 adds per-phase peak memory
+# and the top allocation sites.
+
+# --- CONFIGURATION ---
+METRICS_DIR = os.environ.get("METRICS_DIR", "metrics")
+PROFILE = os.environ.get("METRICS_PROFILE", "") not in ("", "0")
+TRACE_MEMORY = os.environ.get("METRICS_TRACEMALLOC", "") not in ("", "0")
+PREFIX = "drone_"                 # Prometheus metric name prefix
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+TOP_FUNCTIONS = 20
+TOP_ALLOCATIONS = 10
+# ---------------------
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets_ms)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile; None when it
+        # is the +Inf bucket (JSON has no Infinity - the report says null)
+        if not self.total:
+            return 0.0
+        target = p / 100 * self.total
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ["+Inf"], self.counts)},
+        }
+
+
+def bound_text(ms, buckets_ms=LATENCY_BUCKETS_MS):
+    # A percentile from as_dict() for humans: "<= 250ms", or "> 10000ms" past the last bucket
+    return f"<= {ms}ms" if ms is not None else f"> {buckets_ms[-1]}ms"
+
+
+class Run:
+    def __init__(self, name, profile=False, trace_memory=False):
+        self.name = name
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.stages = {}        # phase -> seconds (repeats add up)
+        self.memory = {}        # phase -> peak traced bytes
+        self.counters = {}
+        self.histograms = {}
+        self.current = None     # (phase, start) of the open mark()
+        self.profiler = cProfile.Profile() if profile else None
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler:
+            self.profiler.enable()
+
+    def add_time(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def _open(self, stage):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        return stage, time.perf_counter()
+
+    def _close(self, opened):
+        stage, start = opened
+        self.add_time(stage, time.perf_counter() - start)
+        if self.trace_memory:
+            self.memory[stage] = max(self.memory.get(stage, 0), tracemalloc.get_traced_memory()[1])
+
+    def mark(self, stage=None):
+        # Ends the open phase (if any) and starts `stage` (if given)
+        if self.current:
+            self._close(self.current)
+        self.current = self._open(stage) if stage else None
+
+    @contextmanager
+    def stage(self, stage):
+        opened = self._open(stage)
+        try:
+            yield
+        finally:
+            self._close(opened)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def histogram(self, name):
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        return self.histograms[name]
+
+    def observe(self, name, ms):
+        self.histogram(name).record(ms)
+
+    def report(self):
+        self.mark()
+        report = {
+            "run": self.name,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "seconds": round(time.perf_counter() - self.clock, 4),
+            "python": platform.python_version(),
+            "argv": sys.argv[1:],
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "counters": self.counters,
+            "histograms": {k: h.as_dict() for k, h in self.histograms.items()},
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            report["memory"] = {"peak_bytes": peak, "stages_peak_bytes": self.memory,
+                                "top_allocations": [str(s) for s in tracemalloc.take_snapshot()
+                                                    .statistics("lineno")[:TOP_ALLOCATIONS]]}
+        return report
+
+    def prometheus(self, report):
+        # Prometheus text exposition format; every series is labelled with the run name
+        run = f'run="{self.name}"'
+        lines = [f"# TYPE {PREFIX}run_seconds gauge", f"{PREFIX}run_seconds{{{run}}} {report['seconds']}",
+                 f"# TYPE {PREFIX}run_timestamp_seconds gauge", f"{PREFIX}run_timestamp_seconds{{{run}}} {int(self.started)}",
+                 f"# TYPE {PREFIX}stage_seconds gauge"]
+        lines += [f'{PREFIX}stage_seconds{{{run},stage="{k}"}} {v}' for k, v in report["stages"].items()]
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE {PREFIX}{name}_total counter", f"{PREFIX}{name}_total{{{run}}} {value}"]
+        for name, h in sorted(self.histograms.items()):
+            # Buckets are kept in ms; Prometheus convention is seconds
+            base = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {base} histogram")
+            seen = 0
+            for bound, count in zip(h.buckets + ["+Inf"], h.counts):
+                seen += count
+                le = bound if bound == "+Inf" else bound / 1000
+                lines.append(f'{base}_bucket{{{run},le="{le}"}} {seen}')
+            lines += [f"{base}_sum{{{run}}} {h.sum_ms / 1000:.6f}", f"{base}_count{{{run}}} {h.total}"]
+        if "memory" in report:
+            lines += [f"# TYPE {PREFIX}peak_memory_bytes gauge",
+                      f"{PREFIX}peak_memory_bytes{{{run}}} {report['memory']['peak_bytes']}"]
+        return "\n".join(lines) + "\n"
+
+    def finish(self, out_dir=METRICS_DIR):
+        # Writes <out_dir>/<name>.json and .prom (and .pstats when profiling); returns the report
+        if self.profiler:
+            self.profiler.disable()
+        report = self.report()
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, self.name)
+        if self.profiler:
+            self.profiler.dump_stats(base + ".pstats")
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            report["profile"] = {"file": base + ".pstats", "top": text.getvalue().strip().splitlines()[-TOP_FUNCTIONS:]}
+        for path, payload in ((base + ".json", json.dumps(report, indent=1)),
+                              (base + ".prom", self.prometheus(report))):
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, path)   # A scraper never sees half a file
+        if self.trace_memory:
+            tracemalloc.stop()
+        return report
+
+
+# --- MODULE-LEVEL RUN ---
+# Library code reports into whatever run is current; before start() that is
+# a scratch run nobody writes out.
+_run = Run("unstarted")
+
+
+def start(name, profile=None, trace_memory=None):
+    global _run
+    _run = Run(name, PROFILE if profile is None else profile, TRACE_MEMORY if trace_memory is None else trace_memory)
+    return _run
+
+
+def current():
+    return _run
+
+
+def mark(stage=None):
+    _run.mark(stage)
+
+
+def stage(name):
+    return _run.stage(name)
+
+
+def add_time(name, seconds):
+    _run.add_time(name, seconds)
+
+
+def count(name, n=1):
+    _run.count(name, n)
+
+
+def observe(name, ms):
+    _run.observe(name, ms)
+
+
+def finish(out_dir=METRICS_DIR, verbose=True):
+    report = _run.finish(out_dir)
+    if verbose:
+        print(f"Metrics: {os.path.join(out_dir, _run.name)}.json / .prom ({report['seconds']:.2f}s)")
+    return report
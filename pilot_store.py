@@ -0,0 +1,272 @@
+import csv
+import re
+import json
+import os
+import sys
+import numpy as np
+from checkpoint import file_fingerprint
+
+# One place to load the pilot CSV.
+#
+# The scripts grew up guessing column names ('city' vs 'City', 'latitude' vs
+# 'Latitude'...). PilotStore resolves every alias once, parses the CSV into
+# typed columns (float64 lat/lng, categorical state, interned strings) and
+# keeps a binary .npz snapshot next to the CSV so the next tool invocation
+# skips CSV parsing entirely while the CSV is unchanged.
+#
+# The typed columns are cleaned (stripped, "nan" -> "") for reading and
+# querying; the original cells are kept as well, and those are what the
+# fix_* scripts get back from read_frame() and write to disk, so a script
+# only changes the cells it actually updates.
+
+# --- CONFIGURATION ---
+DB_FILE = "drone_pilots_WITH_PHONES_FINAL.csv"
+SNAPSHOT_VERSION = 4
+# ---------------------
+
+# canonical name -> spellings seen in the wild (matched case/space-insensitively)
+COLUMN_ALIASES = {
+    "name": ["Name", "Full Name", "Pilot"],
+    "first_name": ["First Name", "first_name", "firstname", "First"],
+    "last_name": ["Last Name", "last_name", "lastname", "Last"],
+    "business": ["Business", "Company", "Business Name"],
+    "email": ["Email", "E-mail"],
+    "website": ["Website", "URL", "Site"],
+    "city": ["City", "Town"],
+    "state": ["State", "ST", "Province"],
+    "bio": ["Bio", "About", "Description"],
+    "rating": ["Rating", "Stars"],
+    "photo_url": ["Photo URL", "Photo", "Headshot"],
+    "profile_link": ["Profile Link", "Profile", "Profile URL"],
+    "phone": ["Found_Phone", "Phone", "Phone Number", "Telephone"],
+    "phone_e164": ["Phone_E164"],   # written by enrich_contacts.py
+    "source_link": ["Source_Link", "Source"],
+    "latitude": ["latitude", "Lat"],
+    "longitude": ["longitude", "Lng", "Lon", "Long"],
+    # provenance of latitude/longitude, written by locations.py
+    "location_source": ["location_source"],
+    "location_precision": ["location_precision"],
+    "location_updated": ["location_updated"],
+}
+
+FLOAT_COLUMNS = ("latitude", "longitude", "rating")
+# Typed columns to_csv_frame() hands back instead of the raw text (the scripts compute on them)
+FRAME_TYPED_COLUMNS = ("latitude", "longitude")
+
+
+def _squash(name):
+    return "".join(str(name).lower().split()).replace("_", "").replace("-", "")
+
+
+def resolve_columns(header):
+    # {canonical: actual header} for every canonical column present.
+    # Exact alias matches win; otherwise fall back to "city" in "Pilot City".
+    actual = {_squash(h): h for h in header}
+    resolved = {}
+    for canonical, aliases in COLUMN_ALIASES.items():
+        for alias in [canonical] + aliases:
+            if _squash(alias) in actual:
+                resolved[canonical] = actual[_squash(alias)]
+                break
+    for canonical in ("city", "state"):
+        if canonical not in resolved:
+            for h in header:
+                if canonical in str(h).lower():
+                    resolved[canonical] = h
+                    break
+    return resolved
+
+
+def clean_slug(text):
+    text = str(text).lower()
+    text = re.sub(r'[^a-z0-9]+', '-', text)
+    return text.strip('-')
+
+
+def _clean(value):
+    text = "" if value is None else str(value).strip()
+    return "" if text.lower() == "nan" else text
+
+
+def _to_float(values):
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except ValueError:
+            pass
+    return out
+
+
+class PilotStore:
+    def __init__(self, columns, header, source=None, raw=None):
+        # columns: canonical name -> numpy array (every column has the same length)
+        # raw: header -> the CSV's own cells, untouched (for writing the CSV back)
+        self.columns = columns
+        self.header = header          # original CSV header, in order
+        self.raw = raw
+        self.source = source
+        self.meta = {}
+        self._state_codes = None
+
+    # --- loading ---
+    @classmethod
+    def from_csv(cls, path=DB_FILE):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            raw = list(reader)
+        resolved = resolve_columns(header)
+        position = {h: i for i, h in enumerate(header)}
+        intern = {}
+        columns = {}
+        for canonical in COLUMN_ALIASES:
+            i = position.get(resolved.get(canonical))
+            values = [_clean(r[i]) if i is not None and i < len(r) else "" for r in raw]
+            if canonical in FLOAT_COLUMNS:
+                columns[canonical] = _to_float(values)
+            else:
+                # Interned: repeated strings (states, cities) share one object
+                columns[canonical] = np.array([intern.setdefault(v, v) for v in values], dtype=object)
+        # Unknown extra columns ride along untouched under their own header
+        known = set(resolved.values())
+        for h in header:
+            if h not in known:
+                columns[h] = np.array([_clean(r[position[h]]) if position[h] < len(r) else "" for r in raw], dtype=object)
+        cells = {h: np.array([intern.setdefault(r[i], r[i]) if i < len(r) else "" for r in raw], dtype=object)
+                 for i, h in enumerate(header)}
+        if len(raw) and not any(columns["name"]):
+            columns["name"] = np.array([f"{a} {b}".strip() for a, b in zip(columns["first_name"], columns["last_name"])], dtype=object)
+        columns["state"] = np.array([s.upper() for s in columns["state"]], dtype=object)
+        return cls(columns, header, source=path, raw=cells)
+
+    @classmethod
+    def load(cls, path=DB_FILE, snapshot=True):
+        # Fast path: reuse the .npz snapshot while the CSV is byte-for-byte unchanged
+        if not snapshot:
+            return cls.from_csv(path)
+        snap = path + ".npz"
+        digest = file_fingerprint(path)
+        if os.path.exists(snap):
+            try:
+                store = cls.from_snapshot(snap)
+                if store.meta.get("csv") == digest and store.meta.get("version") == SNAPSHOT_VERSION:
+                    store.source = path
+                    return store
+            except (OSError, ValueError, KeyError):
+                pass
+        store = cls.from_csv(path)
+        store.save_snapshot(snap, digest)
+        return store
+
+    def save_snapshot(self, path, digest):
+        arrays = {}
+        for name, values in self.columns.items():
+            key = f"c_{name}"
+            arrays[key] = values if values.dtype.kind == "f" else values.astype(str)
+        for i, h in enumerate(self.header if self.raw is not None else []):
+            arrays[f"r_{i}"] = self.raw[h].astype(str)
+        meta = {"version": SNAPSHOT_VERSION, "csv": digest, "header": self.header, "columns": list(self.columns),
+                "raw": self.raw is not None}
+        arrays["meta"] = np.array(json.dumps(meta))
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            columns = {}
+            for name in meta["columns"]:
+                values = data[f"c_{name}"]
+                if values.dtype.kind != "f":
+                    values = np.array([sys.intern(v) for v in values.tolist()], dtype=object)
+                columns[name] = values
+            raw = None
+            if meta.get("raw"):
+                raw = {h: np.array([sys.intern(v) for v in data[f"r_{i}"].tolist()], dtype=object)
+                       for i, h in enumerate(meta["header"])}
+        store = cls(columns, meta["header"], raw=raw)
+        store.meta = meta
+        return store
+
+    # --- accessors ---
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def lat(self):
+        return self.columns["latitude"]
+
+    @property
+    def lng(self):
+        return self.columns["longitude"]
+
+    def state_codes(self):
+        # Categorical view of state: (int16 codes, category labels)
+        if self._state_codes is None:
+            categories, codes = np.unique(self.columns["state"].astype(str), return_inverse=True)
+            self._state_codes = (codes.astype(np.int16), categories)
+        return self._state_codes
+
+    def in_state(self, state):
+        codes, categories = self.state_codes()
+        hit = np.flatnonzero(categories == str(state).upper())
+        return codes == hit[0] if len(hit) else np.zeros(len(self), dtype=bool)
+
+    def has_location(self):
+        return ~(np.isnan(self.lat) | np.isnan(self.lng))
+
+    def full_names(self):
+        return np.array([f"{a} {b}" for a, b in zip(self.columns["first_name"], self.columns["last_name"])], dtype=object)
+
+    def row(self, i):
+        # One pilot as {canonical name: value}
+        return {name: values[i] for name, values in self.columns.items()}
+
+    def rows(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns)
+
+    def to_csv_frame(self):
+        # DataFrame laid out like the CSV (same column order, extras included)
+        # with every alias renamed to the directory's own spelling ("Town" ->
+        # "City"), for the fix_* scripts that edit rows and write the CSV back.
+        # Cells are the CSV's own text (not the cleaned columns), except
+        # latitude/longitude, which are float64 for the location code.
+        import pandas as pd
+        canonical = {actual: name for name, actual in resolve_columns(self.header).items()}
+        data = {}
+        for h in self.header:
+            name = canonical.get(h)
+            if self.raw is None or name in FRAME_TYPED_COLUMNS:
+                values = self.columns[name or h]
+            else:
+                values = self.raw[h]
+            data[COLUMN_ALIASES[name][0] if name else h] = values
+        return pd.DataFrame(data)
+
+
+def read_frame(path=DB_FILE):
+    # pd.read_csv replacement for the scripts: goes through the snapshot and the alias table
+    return PilotStore.load(path).to_csv_frame()
+
+
+def frame_rows(df):
+    # PilotStore.rows()-style dicts (canonical names, cleaned text) for a DataFrame
+    resolved = resolve_columns(df.columns)
+    data = {name: [_clean(v) for v in df[resolved[name]].tolist()] if name in resolved else [""] * len(df)
+            for name in COLUMN_ALIASES}
+    data["state"] = [s.upper() for s in data["state"]]
+    known = set(resolved.values())
+    data.update({h: [_clean(v) for v in df[h].tolist()] for h in df.columns if h not in known})
+    return [dict(zip(data, values)) for values in zip(*data.values())]
+
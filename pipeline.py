@@ -0,0 +1,345 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from checkpoint import file_fingerprint
+from geocode_cache import backend_choice
+import metrics
+
+# One entry point from the pilot CSV to the published site.
+#
+# Replaces running fix_*.py scripts by hand in some order and then
+# build_site.py. Those scripts each rewrite the CSV, so a later one can
+# undo an earlier one (fix_scatter re-scattered pilots fix_precision had
+# just geocoded). Here every step is a stage with declared inputs:
+#
+#   load -> clean -> geocode -> reconcile -> scatter -> render -> sitemap
+#      \-> images ------------------------------------/
+#
+# Stages never write to the source CSV; each one's output is kept in
+# CACHE_DIR under a key hashed from its code, its parameters and the keys of
+# the stages it reads. A stage re-runs only when that key changes (or an
+# output file it promised is missing), so editing scatter.py re-runs scatter,
+# render and sitemap and nothing else. Stages whose inputs are ready run in
+# parallel (images alongside the location stages). A run where nothing
+# changed only hashes a few files and exits.
+#
+#   python pipeline.py                       # build whatever is out of date
+#   python pipeline.py --dry-run             # just say what would run
+#   python pipeline.py --force scatter       # re-run scatter and everything after it
+
+# --- CONFIGURATION ---
+DB_FILE = "drone_pilots_WITH_PHONES_FINAL.csv"
+CACHE_DIR = ".pipeline"
+STATE_FILE = os.path.join(CACHE_DIR, "state.json")
+SITE_CSV = os.path.join(CACHE_DIR, "site.csv")   # What render reads: the scatter stage's output
+REGISTRY_FILE = "slugs.json"                     # slug_registry.REGISTRY_FILE
+# Everything build_site.run_build writes (its *_DIR / *_FILE settings), so
+# deleting any of it re-runs render
+SITE_OUTPUTS = ("index.html", "pilot", "data", "tiles", "near", "search", "assets",
+                "_headers", "_redirects", ".build_manifest.json")
+USER_AGENT = "drone_directory_pipeline_v1"
+# ---------------------
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), code=(), outputs=(), params=None):
+        self.name = name
+        self.run = run                  # function(inputs dict, params) -> DataFrame or JSON-able dict
+        self.deps = tuple(deps)
+        self.code = tuple(code)         # module files the stage's result depends on
+        self.outputs = tuple(outputs)   # files/folders it writes outside CACHE_DIR
+        self.params = params or {}
+
+    def key(self, upstream):
+        h = hashlib.sha1()
+        h.update(inspect.getsource(self.run).encode("utf-8"))
+        for path in self.code:
+            with open(os.path.join(HERE, path), "rb") as f:
+                h.update(f.read())
+        h.update(json.dumps([self.params, [upstream[d] for d in self.deps]], sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+
+# --- STAGES ---
+# Heavy imports live inside the stage functions: a run where everything is
+# cached never pays for pandas, the gazetteer or the builder.
+
+def load_stage(inputs, params):
+    # Every cell as the text in the file (no "+1270..." -> 1270....0); later
+    # stages parse the columns they compute on
+    import pandas as pd
+    return pd.read_csv(params["csv"], dtype=str, keep_default_na=False)
+
+
+def clean_stage(inputs, params):
+    # Text columns trimmed with "nan" gone; phones normalized to E.164 (no lookups)
+    from batch_geocode import clean_column
+    from enrich_contacts import enrich
+    df = inputs["load"].copy()
+    for name in ("First Name", "Last Name", "Business", "City", "State"):
+        if name in df.columns:
+            df[name] = clean_column(df[name])
+    if "State" in df.columns:
+        df["State"] = df["State"].str.upper()
+    enrich(df, verbose=False)
+    return df
+
+
+def geocode_stage(inputs, params):
+    # City-level points for rows not yet located to their city. Only the
+    # answers are kept; reconcile decides what to do with them.
+    import pandas as pd
+    from batch_geocode import geocode_unique
+    from geocode_async import default_engine
+    from locations import needs
+    df = inputs["clean"]
+    engine = default_engine(USER_AGENT, backend=params["geocoder"])
+    lat, lng, _ = geocode_unique(df, engine, mask=needs(df, "place"), verbose=False)
+    found = lat.notna()
+    return pd.DataFrame({"lat": lat[found], "lng": lng[found]})
+
+
+def reconcile_stage(inputs, params):
+    # One location per pilot from the stored candidates, then the geocoded
+    # cities on top (assign() never lets a coarser point win)
+    from locations import resolve, assign
+    df = inputs["clean"].copy()
+    resolve(df)
+    points = inputs["geocode"]
+    rows = df.index.isin(points.index)
+    assign(df, rows, points["lat"].reindex(df.index), points["lng"].reindex(df.index), "geocode", "place")
+    return df
+
+
+def scatter_stage(inputs, params):
+    # Pilots still without a location get a deterministic spot in their state
+    import pandas as pd
+    from gazetteer import Gazetteer
+    from locations import needs, assign
+    import scatter
+    df = inputs["reconcile"].copy()
+    blank = pd.Series("", index=df.index)
+    base_lats, base_lngs = Gazetteer().lookup(df.get("City", blank), df.get("State", blank))
+    todo = needs(df, "scatter").to_numpy() & pd.notna(base_lats)
+    lats, lngs = base_lats.copy(), base_lngs.copy()
+    lats[todo], lngs[todo] = scatter.displace(base_lats[todo], base_lngs[todo],
+                                              [s for s, t in zip(scatter.frame_slugs(df), todo) if t],
+                                              df.get("State", blank)[todo], ["scatter"] * int(todo.sum()))
+    assign(df, todo, lats, lngs, "scatter", "scatter")
+    return df
+
+
+def images_stage(inputs, params):
+    import images
+    from batch_geocode import text_column
+    report = images.process(text_column(inputs["load"], "Photo URL"), jobs=params["jobs"], verbose=False)
+    return {k: report[k] for k in ("urls", "fetched", "failed", "converted", "ready")}
+
+
+def render_stage(inputs, params):
+    from checkpoint import write_csv_atomic
+    import build_site
+    write_csv_atomic(inputs["scatter"], SITE_CSV)
+    report = build_site.run_build(jobs=params["jobs"], db_file=SITE_CSV, with_sitemap=False)
+    return {k: report[k] for k in ("rendered", "skipped", "deleted", "tiles", "pilots", "redirects")}
+
+
+def sitemap_stage(inputs, params):
+    import build_site
+    urls, shards = build_site.build_sitemap(build_site.load_manifest())
+    return {"urls": urls, "shards": shards}
+
+
+def stages(csv=DB_FILE, geocoder="nominatim", jobs=1, with_images=True):
+    geo = ("batch_geocode.py", "geocode_async.py", "geocode_cache.py", "gazetteer.py")
+    site = ("build_site.py", "pilot_store.py", "slug_registry.py", "assets.py", "images.py", "cluster_tiles.py",
+            "spatial_index.py", "search_index.py", "service_tags.py", "scatter.py")
+    out = [
+        Stage("load", load_stage, params={"csv": csv, "input": file_key(csv)}),
+        Stage("clean", clean_stage, ["load"], ("batch_geocode.py", "enrich_contacts.py")),
+        Stage("geocode", geocode_stage, ["clean"], geo + ("locations.py",), params={"geocoder": geocoder}),
+        Stage("reconcile", reconcile_stage, ["clean", "geocode"], ("locations.py", "gazetteer.py")),
+        # Scatter seeds come from the page slugs, so the registry is an input too
+        Stage("scatter", scatter_stage, ["reconcile"], ("scatter.py", "locations.py", "gazetteer.py", "pilot_store.py",
+                                                        "slug_registry.py"),
+              params={"slugs": file_key(REGISTRY_FILE) if os.path.exists(REGISTRY_FILE) else ""}),
+        Stage("render", render_stage, ["scatter"] + (["images"] if with_images else []), site,
+              outputs=SITE_OUTPUTS, params={"jobs": jobs}),
+        Stage("sitemap", sitemap_stage, ["render"], ("build_site.py", "sitemap.py"), outputs=("sitemap.xml",)),
+    ]
+    if with_images:
+        out.insert(1, Stage("images", images_stage, ["load"], ("images.py",), outputs=("img",), params={"jobs": jobs}))
+    return out
+
+
+# --- CACHE ---
+_state = None
+
+
+def load_state():
+    global _state
+    if _state is None:
+        _state = {"stages": {}, "files": {}}
+        if os.path.exists(STATE_FILE):
+            with open(STATE_FILE, encoding="utf-8") as f:
+                _state = json.load(f)
+    return _state
+
+
+def save_state(state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+
+def file_key(path):
+    # Content hash of an input file; re-hashed only when its size or mtime moved
+    state = load_state()
+    stat = os.stat(path)
+    seen = state["files"].get(path)
+    if seen and seen[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return seen[2]
+    digest = file_fingerprint(path)
+    state["files"][path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+def output_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.pkl")
+
+
+def store_output(name, result, state):
+    import pandas as pd
+    if isinstance(result, pd.DataFrame):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = output_path(name) + ".tmp"
+        result.to_pickle(tmp)
+        os.replace(tmp, output_path(name))
+        state.setdefault("results", {})[name] = {"rows": len(result)}
+    else:
+        state.setdefault("results", {})[name] = result
+
+
+def read_output(name, state):
+    import pandas as pd
+    path = output_path(name)
+    return pd.read_pickle(path) if os.path.exists(path) else state.get("results", {}).get(name)
+
+
+def is_fresh(stage, key, state):
+    if state["stages"].get(stage.name) != key:
+        return False
+    if stage.name in state.get("results", {}) and "rows" in state["results"][stage.name] \
+            and not os.path.exists(output_path(stage.name)):
+        return False
+    return all(os.path.exists(path) for path in stage.outputs)
+
+
+# --- RUNNER ---
+def run(pipeline, force=(), dry_run=False, workers=4, verbose=True):
+    # Returns {stage: "cached" | "ran" | "failed" | "blocked"} and the timings
+    state = load_state()
+    keys = {}
+    for stage in pipeline:   # Listed in dependency order
+        keys[stage.name] = stage.key(keys)
+
+    # A forced stage takes everything downstream of it along
+    stale = set()
+    for stage in pipeline:
+        if stage.name in force or not is_fresh(stage, keys[stage.name], state) or stale & set(stage.deps):
+            stale.add(stage.name)
+    status = {s.name: "cached" for s in pipeline if s.name not in stale}
+    timings = {}
+    if dry_run or not stale:
+        for name in stale:
+            status[name] = "would run"
+        return status, timings
+
+    results, running = {}, {}
+    pending = [s for s in pipeline if s.name in stale]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for stage in list(pending):
+                if any(d in stale and d not in status for d in stage.deps):
+                    continue   # An input is still being built
+                pending.remove(stage)
+                if any(status.get(d) in ("failed", "blocked") for d in stage.deps):
+                    status[stage.name] = "blocked"
+                    continue
+                inputs = {d: results[d] if d in results else read_output(d, state) for d in stage.deps}
+                if verbose:
+                    print(f"  > {stage.name}")
+                running[pool.submit(timed, stage, inputs)] = stage
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    status[stage.name] = "failed"
+                    print(f"  ! {stage.name} failed: {type(e).__name__}: {e}")
+                    continue
+                results[stage.name] = result
+                store_output(stage.name, result, state)
+                state["stages"][stage.name] = keys[stage.name]
+                save_state(state)
+                status[stage.name] = "ran"
+                timings[stage.name] = seconds
+    return status, timings
+
+
+def timed(stage, inputs):
+    start = time.perf_counter()
+    result = stage.run(inputs, stage.params)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the site from the pilot CSV, re-running only what changed.")
+    parser.add_argument("csv", nargs="?", default=DB_FILE)
+    parser.add_argument("--geocoder", default="nominatim", type=backend_choice, help="nominatim, local, offline or a Nominatim-compatible URL")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for page rendering and thumbnails")
+    parser.add_argument("--force", nargs="*", metavar="STAGE", help="re-run these stages (all when none given) and everything after them")
+    parser.add_argument("--no-images", action="store_true", help="skip headshot fetching/thumbnailing")
+    parser.add_argument("--dry-run", action="store_true", help="show what would run without running it")
+    parser.add_argument("--profile", action="store_true", help="capture a cProfile into the metrics report")
+    parser.add_argument("--trace-memory", action="store_true", help="record peak memory with tracemalloc")
+    args = parser.parse_args()
+
+    metrics.start("pipeline", profile=args.profile or None, trace_memory=args.trace_memory or None)
+    started = time.perf_counter()
+    pipeline = stages(args.csv, args.geocoder, args.jobs, with_images=not args.no_images)
+    names = [s.name for s in pipeline]
+    force = names if args.force == [] else (args.force or [])
+    unknown = set(force) - set(names)
+    if unknown:
+        sys.exit(f"Unknown stage(s): {', '.join(sorted(unknown))}. Stages: {', '.join(names)}")
+
+    status, timings = run(pipeline, force, args.dry_run)
+    if not args.dry_run and not timings and "failed" not in status.values():
+        save_state(load_state())   # Keep any re-hashed input fingerprints
+    print("------------------------------------------------")
+    for name in names:
+        took = f"{timings[name]:8.2f}s" if name in timings else ""
+        print(f"  {name:<10} {status[name]:<10}{took}")
+    for name, seconds in timings.items():
+        metrics.add_time(name, seconds)
+    for outcome in ("ran", "cached", "failed"):
+        metrics.count(f"stages_{outcome}", sum(1 for s in status.values() if s == outcome))
+    if not args.dry_run:
+        metrics.finish(verbose=False)
+    print(f"PIPELINE DONE in {time.perf_counter() - started:.2f}s")
+    print("------------------------------------------------")
+    if "failed" in status.values():
+        sys.exit(1)
@@ -0,0 +1,75 @@
+import hashlib
+import math
+import numpy as np
+from locations import in_claimed_state
+from pilot_store import frame_rows
+from slug_registry import SlugRegistry
+
+# Deterministic pin displacement.
+#
+# Many pilots share one point (every pilot located only to "KY" sits on the
+# Kentucky centroid). Instead of adding random.uniform() noise per row - a
+# different amount in every script, and different on every run - pins that
+# share a point are laid out on a sunflower spiral around it: evenly spaced,
+# never overlapping, and ordered by a seed hashed from each pilot's slug, so
+# the same data always gives byte-identical positions. A pin pushed out of
+# its own state is pulled back toward the center until it is inside again.
+
+# --- CONFIGURATION ---
+# Gap between neighbouring pins (degrees of latitude) by location precision
+SPACING = {"place": 0.01, "county": 0.03, "state": 0.08, "scatter": 0.08, "": 0.08}
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+# ---------------------
+
+
+def seeds(keys):
+    # Stable 64-bit seed per pilot: the first 8 bytes of sha1(slug)
+    return np.array([int.from_bytes(hashlib.sha1(str(k).encode("utf-8")).digest()[:8], "big") for k in keys], dtype=np.uint64)
+
+
+def frame_slugs(df, registry=None):
+    # The builder's page slug for every row of a raw CSV DataFrame, taken from
+    # the slug registry the way build_site assigns them, so a pilot gets the
+    # same seed here as on the site
+    return (registry or SlugRegistry.load()).row_slugs(frame_rows(df))
+
+
+def displace(lat, lng, keys, states=None, precision=None):
+    # Returns new (lat, lng) arrays. Pins sharing a point (to 5 decimals) get
+    # spiral slots k = 0, 1, 2... in seed order: slot 0 stays on the point,
+    # slot k sits spacing * sqrt(k) out at k golden angles (Vogel's spiral),
+    # turned by a per-point angle so neighbouring clusters don't line up.
+    lat = np.asarray(lat, dtype="float64")
+    lng = np.asarray(lng, dtype="float64")
+    n = len(lat)
+    if precision is None:
+        precision = np.full(n, "", dtype=object)
+    spacing = np.array([SPACING.get(str(p), SPACING[""]) for p in precision])
+
+    # Group co-located pins and rank them by seed inside each group
+    seed = seeds(keys)
+    qlat, qlng = np.round(np.nan_to_num(lat) * 1e5).astype(np.int64), np.round(np.nan_to_num(lng) * 1e5).astype(np.int64)
+    order = np.lexsort((seed, qlng, qlat))
+    same = np.r_[False, (np.diff(qlat[order]) == 0) & (np.diff(qlng[order]) == 0)]
+    start = np.maximum.accumulate(np.where(same, 0, np.arange(n)))
+    slot = np.empty(n, dtype=np.int64)
+    slot[order] = np.arange(n) - start
+
+    # Per-point rotation, from the point itself (identical for the whole group)
+    turn = (np.abs(qlat * 73856093 ^ qlng * 19349663) % 3600) / 3600 * 2 * math.pi
+    theta = slot * GOLDEN_ANGLE + turn
+    r = spacing * np.sqrt(slot)
+    dlat = r * np.sin(theta)
+    dlng = r * np.cos(theta) / np.maximum(np.cos(np.radians(lat)), 0.2)
+
+    out_lat, out_lng = lat + dlat, lng + dlng
+    if states is not None:
+        # Keep pins in their state: halve the offset of any that left it (a few passes)
+        for _ in range(6):
+            out = ~in_claimed_state(out_lat, out_lng, states) & (slot > 0) & ~np.isnan(lat)
+            if not out.any():
+                break
+            dlat[out] /= 2
+            dlng[out] /= 2
+            out_lat, out_lng = lat + dlat, lng + dlng
+    return out_lat, out_lng
@@ -0,0 +1,259 @@
+import argparse
+import json
+import math
+import os
+import re
+import time
+import numpy as np
+import assets
+from spatial_index import geohash, geohash_bounds
+
+# Typeahead search over pilot name, business, city and state.
+#
+# Build side: every token of those fields is indexed under each of its
+# prefixes (MIN_PREFIX..MAX_PREFIX letters), and every posting list is kept
+# whole. Pilots are grouped into geohash cells (docs/<cell>.json holds the
+# fields of every pilot in a cell; pilots without a pin go in "_<n>" chunks),
+# and each posting list is split the same way: prefix -> {cell: [best score
+# in the cell, pilot, score, pilot, score, ...]}. Prefixes are grouped into
+# shards by their first SHARD_CHARS letters (search/<letters>.json). A
+# prefix matching more than PREFIX_CAP pilots keeps only the best score per
+# cell in its shard; its postings move to search/<prefix>/<area>.json, one
+# file per larger SPLIT_PRECISION cell.
+#
+# Query side (index.html mirrors search() below): read every term's entry and
+# keep the cells all of them reach. A cell's best possible result is the sum
+# of the terms' best scores there, at the cell's nearest edge; cells are
+# visited best first, and only until none left can beat the RESULTS-th
+# result. In each visited cell the pilots on every term's list are scored
+# (field weight, doubled for a whole-word match) and ties break by distance.
+
+# --- CONFIGURATION ---
+SEARCH_DIR = "search"
+SHARD_CHARS = 2
+MIN_PREFIX = 2
+MAX_PREFIX = 10
+PREFIX_CAP = 100       # Longer posting lists are stored one file per cell
+CELL_PRECISION = 3     # Geohash cells of ~156 x 156 km
+SPLIT_PRECISION = 2    # ~1250 x 625 km per file of a split posting list
+UNLOCATED_CHUNK = 1000
+FIELDS = ("name", "business", "city", "state")
+FIELD_WEIGHTS = (8, 4, 2, 1)
+RESULTS = 8
+# ---------------------
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text or "").lower().replace("'", ""))
+
+
+def split_area(cell):
+    return cell if cell.startswith("_") else cell[:SPLIT_PRECISION]
+
+
+def build_files(docs):
+    # docs: list of {"name", "business", "city", "state", "slug", "lat", "lng"}
+    # (lat/lng may be None). Returns {file name under SEARCH_DIR: JSON value}.
+    cells, where = {}, []
+    unlocated = 0
+    for doc in docs:
+        lat, lng = doc.get("lat"), doc.get("lng")
+        lat, lng = (None, None) if lat is None or lng is None else (round(lat, 4), round(lng, 4))
+        if lat is None:
+            cell = f"_{unlocated // UNLOCATED_CHUNK}"
+            unlocated += 1
+        else:
+            cell = geohash(lat, lng, CELL_PRECISION)
+        rows = cells.setdefault(cell, [])
+        where.append((cell, len(rows)))
+        rows.append([doc.get(f, "") for f in FIELDS] + [doc["slug"], lat, lng])
+
+    postings = {}
+    for (cell, local), doc in zip(where, docs):
+        best = {}
+        for weight, field in zip(FIELD_WEIGHTS, FIELDS):
+            for token in tokenize(doc.get(field)):
+                for k in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+                    score = weight * (2 if k == len(token) else 1)
+                    if score > best.get(token[:k], 0):
+                        best[token[:k]] = score
+        for prefix, score in best.items():
+            postings.setdefault(prefix, {}).setdefault(cell, []).extend((local, score))
+
+    files = {f"docs/{cell}.json": rows for cell, rows in cells.items()}
+    for prefix, by_cell in postings.items():
+        shard = files.setdefault(f"{prefix[:SHARD_CHARS]}.json", {})
+        split = sum(len(flat) for flat in by_cell.values()) // 2 > PREFIX_CAP
+        shard[prefix] = {}
+        for cell, flat in by_cell.items():
+            shard[prefix][cell] = [max(flat[1::2])] + ([] if split else flat)
+            if split:
+                files.setdefault(f"{prefix}/{split_area(cell)}.json", {})[cell] = flat
+    return files
+
+
+def write_index(docs, out_dir=SEARCH_DIR):
+    # search/**.json (+ .gz/.br); unchanged files are left alone, stale ones removed
+    files = build_files(docs)
+    keep, size = set(), 0
+    for name, value in files.items():
+        path = os.path.join(out_dir, *name.split("/"))
+        payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        keep.add(path)
+        size += len(payload)
+        if os.path.exists(path) and os.path.getsize(path) == len(payload):
+            with open(path, "rb") as f:
+                if f.read() == payload:
+                    continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        assets.write_compressed(path, payload, assets.BROTLI_PAGE_QUALITY)
+    for folder, _, filenames in os.walk(out_dir, topdown=False):
+        for filename in filenames:
+            path = os.path.join(folder, filename)
+            if path.split(".json")[0] + ".json" not in keep:
+                os.remove(path)
+        if folder != out_dir and not os.listdir(folder):
+            os.rmdir(folder)
+    return len(files), size
+
+
+def miles(lat1, lng1, lat2, lng2):
+    r = math.pi / 180
+    a = math.sin((lat2 - lat1) * r / 2) ** 2 + math.cos(lat1 * r) * math.cos(lat2 * r) * math.sin((lng2 - lng1) * r / 2) ** 2
+    return 7917.5 * math.asin(math.sqrt(a))
+
+
+def cell_miles(lat, lng, cell):
+    # Distance to the nearest point of a geohash cell (0 inside it)
+    if lat is None or cell.startswith("_"):
+        return math.inf
+    south, north, west, east = geohash_bounds(cell)
+    if west <= lng <= east:
+        return miles(lat, lng, min(max(lat, south), north), lng)
+    # Outside the cell's longitudes: the nearest point is on its nearer side,
+    # where that meridian comes closest to us; past 90 degrees away, at a corner
+    edge = west if (west - lng) % 360 < (lng - east) % 360 else east
+    c = math.cos(math.radians(lng - edge))
+    if c <= 0:
+        return min(miles(lat, lng, south, edge), miles(lat, lng, north, edge))
+    foot = math.degrees(math.atan(math.tan(math.radians(lat)) / c))
+    return miles(lat, lng, min(max(foot, south), north), edge)
+
+
+def score_doc(doc, terms):
+    # Sum of each term's best field match; 0 unless every term matches
+    fields = [tokenize(doc[f]) for f in range(len(FIELDS))]
+    score = 0
+    for term in terms:
+        best = max((w * (2 if tok == term else 1) for w, toks in zip(FIELD_WEIGHTS, fields)
+                    for tok in toks if tok.startswith(term)), default=0)
+        if not best:
+            return 0
+        score += best
+    return score
+
+
+def search(load, query, lat=None, lng=None, limit=RESULTS):
+    # Same ranking as the page: [(score, miles, doc)], best first. load(name)
+    # returns a file of the index (None when missing); limit=None returns all.
+    terms = [t for t in tokenize(query) if len(t) >= MIN_PREFIX]
+    if not terms:
+        return []
+    entries = []
+    for term in terms:
+        entry = (load(f"{term[:SHARD_CHARS]}.json") or {}).get(term[:MAX_PREFIX])
+        if entry is None:
+            return []
+        entries.append((term[:MAX_PREFIX], entry))
+    cells = set.intersection(*(set(entry) for _, entry in entries))
+    order = sorted((-sum(entry[cell][0] for _, entry in entries), cell_miles(lat, lng, cell), cell) for cell in cells)
+    out = []
+    for bound, near, cell in order:
+        if limit and len(out) >= limit and (-bound, -near) <= (out[limit - 1][0], -out[limit - 1][1]):
+            break   # Nothing left can beat the last result kept
+        docs = load(f"docs/{cell}.json")
+        ids = None
+        for prefix, entry in entries:
+            flat = entry[cell][1:] or load(f"{prefix}/{split_area(cell)}.json")[cell]
+            ids = set(flat[::2]) if ids is None else ids & set(flat[::2])
+        for i in sorted(ids):
+            doc = docs[i]
+            score = score_doc(doc, terms)
+            if score:
+                far = math.inf if lat is None or doc[-2] is None else miles(lat, lng, doc[-2], doc[-1])
+                out.append((score, far, doc))
+        out.sort(key=lambda r: (-r[0], r[1]))
+        del out[limit or len(out):]
+    return out
+
+
+# --- CLI / BENCHMARK ---
+def synthetic_docs(n, seed=0):
+    from benchmark import FIRST, LAST, BUSINESS, TOWN_START, TOWN_END
+    from gazetteer import STATE_CENTERS
+    rng = np.random.default_rng(seed)
+    states = sorted(STATE_CENTERS)
+    docs = []
+    for i in range(n):
+        state = states[rng.integers(len(states))]
+        lat, lng = STATE_CENTERS[state]
+        docs.append({"name": f"{FIRST[rng.integers(len(FIRST))]} {LAST[rng.integers(len(LAST))]}",
+                     "business": BUSINESS[rng.integers(len(BUSINESS))],
+                     "city": TOWN_START[rng.integers(len(TOWN_START))] + TOWN_END[rng.integers(len(TOWN_END))],
+                     "state": state, "slug": f"p{i}",
+                     "lat": lat + rng.uniform(-1, 1), "lng": lng + rng.uniform(-1, 1)})
+    return docs
+
+
+def load_dir(out_dir=SEARCH_DIR):
+    # load() for search() over a written index
+    def load(name):
+        path = os.path.join(out_dir, *name.split("/"))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return load
+
+
+def benchmark(sizes=(1000, 10000, 100000), queries=("jo", "john", "john smi", "thermal oh", "cedarville", "zz")):
+    # "KB/query" is what the page fetches for one query with a cold cache
+    print(f"{'pilots':>8} {'build s':>8} {'files':>7} {'max KB':>7} {'KB/query':>9} {'query ms':>9}")
+    for n in sizes:
+        docs = synthetic_docs(n)
+        start = time.perf_counter()
+        files = build_files(docs)
+        build = time.perf_counter() - start
+        sizes_kb = {name: len(json.dumps(v, separators=(",", ":"))) / 1024 for name, v in files.items()}
+        fetched = []
+
+        def load(name):
+            if name in files:
+                fetched.append(sizes_kb[name])
+            return files.get(name)
+        start = time.perf_counter()
+        for q in queries:
+            search(load, q, 39.8, -98.6)
+        per_query = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{n:>8} {build:>8.2f} {len(files):>7} {max(sizes_kb.values()):>7.1f} "
+              f"{sum(fetched) / len(queries):>9.1f} {per_query:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build-time prefix index for the pilot search box.")
+    parser.add_argument("query", nargs="?", help="search the built index in SEARCH_DIR")
+    parser.add_argument("--near", nargs=2, type=float, metavar=("LAT", "LNG"))
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    elif args.query:
+        lat, lng = args.near or (None, None)
+        for score, far, doc in search(load_dir(), args.query, lat, lng):
+            where = "" if far == math.inf else f"{far:6.0f} mi"
+            print(f"{score:3d} {where:>9}  {doc[0]} ({doc[1]}) {', '.join(p for p in doc[2:4] if p)}")
+    else:
+        parser.print_help()
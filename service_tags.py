@@ -0,0 +1,57 @@
+import base64
+import re
+import numpy as np
+
+# Build-time service classifier for the "Filter by Service" dropdown.
+#
+# Each pilot gets zero or more tags from whole-word keywords in Business / Bio
+# (so "field" is not Springfield and "hunt" is not Huntington). The directory
+# every listing was imported from says nothing about the pilot, so its URL is
+# cut out of the text first. The result ships to the page as one bitset per
+# tag (bit i = pilot i of the data file), so filtering is a bit test per marker
+# rather than a scan over pilot objects.
+
+# (key, dropdown label, pattern) - order is the bit/column order on the page
+TAGS = [
+    ("thermal", "Thermal Recovery",
+     r"\b(thermal|deer|whitetails?|bucks?|game|recover(y|ies|ed|ing)?|track(s|ed|ing|er|ers)?"
+     r"|wildlife|hunt(s|ed|ing|er|ers)?|troph(y|ies)|tines|antlers?)\b"),
+    ("agriculture", "Agriculture",
+     r"\b(ag|agri\w*|farm(s|ed|ing|er|ers|land)?|crops?|spray(s|ed|ing|er|ers)?|seed(s|ed|ing)?"
+     r"|fields?|ranch(es|er|ers|ing)?|acres?|acreage)\b"),
+    ("photo", "Photo & Video",
+     r"\b(photo\w*|video\w*|imag(e|es|ery|ing)|film(s|ed|ing)?|(multi)?media|cinema\w*|visuals?"
+     r"|snapshots?|shoot(s|ing)?)\b"),
+    ("mapping", "Mapping & Inspection",
+     r"\b(mapping|survey\w*|inspect\w*|roof\w*|solar|precision|scan(s|ned|ning)?|lidar|construction)\b"),
+]
+
+# The directory the listings came from; its URL is not a keyword source
+DIRECTORY_URL = re.compile(r"\S*dronedeerrecovery\.com\S*", re.IGNORECASE)
+
+_patterns = [re.compile(pattern, re.IGNORECASE) for _, _, pattern in TAGS]
+
+
+def classify(business="", bio=""):
+    text = DIRECTORY_URL.sub(" ", f"{business or ''} {bio or ''}")
+    return {key for (key, _, _), pattern in zip(TAGS, _patterns) if pattern.search(text)}
+
+
+def tag_matrix(tag_sets):
+    # n x len(TAGS) 0/1 matrix, in TAGS order
+    keys = [key for key, _, _ in TAGS]
+    matrix = np.zeros((len(tag_sets), len(keys)), dtype=np.int64)
+    for i, tags in enumerate(tag_sets):
+        for j, key in enumerate(keys):
+            matrix[i, j] = key in tags
+    return matrix
+
+
+def bitsets(matrix):
+    # One little-endian bitset per tag, base64 encoded for the JSON asset:
+    # pilot i is byte i >> 3, bit i & 7.
+    return [
+        {"key": key, "label": label, "count": int(matrix[:, j].sum()),
+         "bits": base64.b64encode(np.packbits(matrix[:, j].astype(np.uint8), bitorder="little").tobytes()).decode("ascii")}
+        for j, (key, label, _) in enumerate(TAGS)
+    ]
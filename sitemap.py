@@ -0,0 +1,112 @@
+import glob
+import os
+import re
+from xml.sax.saxutils import escape, unescape
+
+# Streaming sitemap writer.
+#
+# URLs are written straight to disk as they come, rolling over to a new
+# sitemap-N.xml shard before either protocol limit (50,000 URLs or 50 MB
+# uncompressed per file) is hit. With a single shard the result is a plain
+# sitemap.xml; with more, sitemap.xml becomes a <sitemapindex> pointing at
+# the shards. lastmod comes from the build manifest: it is the date a page's
+# rendered bytes last changed, so crawlers only come back for pages that did.
+
+# --- CONFIGURATION ---
+SITEMAP_FILE = "sitemap.xml"
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+# ---------------------
+
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+URLSET_OPEN = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'
+URLSET_CLOSE = "</urlset>\n"
+
+
+class SitemapWriter:
+    def __init__(self, domain, out_dir=".", max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.domain = domain.rstrip("/")
+        self.out_dir = out_dir
+        self.max_urls, self.max_bytes = max_urls, max_bytes
+        self.shards = []          # (filename, newest lastmod)
+        self.file = None
+        self.total = 0
+
+    def _open(self):
+        name = f"sitemap-{len(self.shards) + 1}.xml"
+        self.file = open(os.path.join(self.out_dir, name), "w", encoding="utf-8")
+        self.file.write(URLSET_OPEN)
+        self.shards.append([name, ""])
+        self.count, self.size = 0, len(URLSET_OPEN) + len(URLSET_CLOSE)
+
+    def _close(self):
+        if self.file is not None:
+            self.file.write(URLSET_CLOSE)
+            self.file.close()
+            self.file = None
+
+    def add(self, path, lastmod=None):
+        loc = escape(f"{self.domain}/{path.lstrip('/')}")
+        line = f"  <url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>\n" if lastmod else f"  <url><loc>{loc}</loc></url>\n"
+        size = len(line.encode("utf-8"))
+        if self.file is None or self.count >= self.max_urls or self.size + size > self.max_bytes:
+            self._close()
+            self._open()
+        self.file.write(line)
+        self.count += 1
+        self.size += size
+        self.total += 1
+        if lastmod and lastmod > self.shards[-1][1]:
+            self.shards[-1][1] = lastmod
+
+    def close(self):
+        # Returns the number of shard files (1 = plain sitemap.xml)
+        self._close()
+        if not self.shards:
+            self._open()
+            self._close()
+        index = os.path.join(self.out_dir, SITEMAP_FILE)
+        if len(self.shards) == 1:
+            os.replace(os.path.join(self.out_dir, self.shards[0][0]), index)
+            keep = set()
+        else:
+            with open(index, "w", encoding="utf-8") as f:
+                f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n')
+                for name, lastmod in self.shards:
+                    stamp = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+                    f.write(f"  <sitemap><loc>{escape(self.domain)}/{name}</loc>{stamp}</sitemap>\n")
+                f.write("</sitemapindex>\n")
+            keep = {name for name, _ in self.shards}
+        # Shards left over from a bigger previous build
+        for old in glob.glob(os.path.join(self.out_dir, "sitemap-*.xml")):
+            if os.path.basename(old) not in keep:
+                os.remove(old)
+        return len(self.shards)
+
+
+URL_ENTRY = re.compile(r"<url><loc>(.*?)</loc><lastmod>(.*?)</lastmod></url>")
+
+
+def read_lastmods(domain, out_dir="."):
+    # {path: lastmod} from the sitemap already on disk (plain or sharded), so a
+    # build without its manifest keeps the dates crawlers have already seen
+    prefix = domain.rstrip("/") + "/"
+    lastmods = {}
+    files = [os.path.join(out_dir, SITEMAP_FILE)] + sorted(glob.glob(os.path.join(out_dir, "sitemap-*.xml")))
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for loc, lastmod in URL_ENTRY.findall(f.read()):
+                loc = unescape(loc)
+                if loc.startswith(prefix):
+                    lastmods[loc[len(prefix):]] = lastmod
+    return lastmods
+
+
+def write_sitemap(domain, entries, out_dir="."):
+    # entries: iterable of (path relative to the domain, lastmod "YYYY-MM-DD")
+    writer = SitemapWriter(domain, out_dir)
+    for path, lastmod in entries:
+        writer.add(path, lastmod)
+    return writer.total, writer.close()
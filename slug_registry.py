@@ -0,0 +1,201 @@
+import json
+import os
+import re
+from pilot_store import clean_slug
+
+# Stable, collision-free page slugs.
+#
+# Every pilot gets one slug, remembered in REGISTRY_FILE (committed) so a URL
+# never moves or gets handed to somebody else once published. Rows that are
+# the same pilot listed twice are merged: they share a Profile Link, or the
+# same normalized name in the same state or with the same phone number.
+# Phone alone is not enough - scraped numbers are shared by whole groups of
+# pilots (one Ohio number is on seven different listings). Slugs that
+# earlier builds used for a pilot (name only, name-city-state) become
+# redirects to the pilot's slug.
+#
+# Everything is dict lookups over the rows: O(n), no pairwise comparisons.
+
+# --- CONFIGURATION ---
+REGISTRY_FILE = "slugs.json"
+# ---------------------
+
+NON_DIGIT = re.compile(r"\D")
+LINK_SCHEME = re.compile(r"^https?://(www\.)?")
+
+
+def normalize_phone(text):
+    digits = NON_DIGIT.sub("", str(text or ""))
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) == 10 else ""
+
+
+def normalize_link(text):
+    link = str(text or "").strip().lower()
+    link = LINK_SCHEME.sub("", link)
+    return link.split("?")[0].split("#")[0].rstrip("/")
+
+
+def full_name(row):
+    return f"{row.get('first_name', '')} {row.get('last_name', '')}"
+
+
+def identity_keys(row):
+    # Any shared key means "same pilot"
+    name = clean_slug(full_name(row))
+    state = str(row.get("state", "")).strip().upper()
+    keys = []
+    link = normalize_link(row.get("profile_link"))
+    if link:
+        keys.append("link:" + link)
+    if name and state:
+        keys.append(f"name:{name}|{state}")
+    phone = normalize_phone(row.get("phone"))
+    if name and phone:
+        keys.append(f"name:{name}|tel:{phone}")
+    return keys
+
+
+def candidate_slugs(row):
+    # Shortest first; numbered suffixes only when every readable form is taken
+    name = full_name(row)
+    city, state = row.get("city", ""), row.get("state", "")
+    forms = [clean_slug(name), clean_slug(f"{name}-{state}"), clean_slug(f"{name}-{city}-{state}")]
+    seen = []
+    for slug in forms:
+        if slug and slug not in seen:
+            seen.append(slug)
+    return seen
+
+
+def legacy_slugs(row):
+    # What earlier builders named this pilot's page
+    name = full_name(row)
+    return {clean_slug(name), clean_slug(f"{name}-{row.get('city', '')}-{row.get('state', '')}")} - {""}
+
+
+def group_rows(row_keys):
+    # Union-find over each row's identity keys -> list of row-index groups, in row order
+    parent = list(range(len(row_keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, keys in enumerate(row_keys):
+        for key in keys:
+            if key in owner:
+                a, b = find(owner[key]), find(i)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                owner[key] = i
+    groups = {}
+    for i in range(len(row_keys)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def completeness(row):
+    return sum(1 for value in row.values() if str(value).strip() not in ("", "nan"))
+
+
+class SlugRegistry:
+    def __init__(self, slugs=None, redirects=None, path=REGISTRY_FILE):
+        self.path = path
+        self.slugs = slugs or {}            # slug -> identity keys of its pilot
+        self.redirects = redirects or {}    # old slug -> current slug
+        self.index = {key: slug for slug, keys in self.slugs.items() for key in keys}
+
+    @classmethod
+    def load(cls, path=REGISTRY_FILE):
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data.get("slugs"), data.get("redirects"), path)
+        return cls(path=path)
+
+    def save(self):
+        # Only rewritten when something changed: the file is an input to the
+        # pipeline's scatter stage, and a new mtime alone would make it re-hash
+        text = json.dumps({"slugs": self.slugs, "redirects": self.redirects}, indent=1, sort_keys=True) + "\n"
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                if f.read() == text:
+                    return False
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+        return True
+
+    def _claim(self, row, keys, used):
+        # The slug this pilot had before, if any key of it is registered
+        for key in keys:
+            slug = self.index.get(key)
+            if slug and slug not in used:
+                return slug
+        # Otherwise the first free readable form. Slugs of pilots no longer in
+        # the CSV stay reserved so an old URL never shows someone else.
+        taken = lambda s: s in used or s in self.slugs or s in self.redirects
+        forms = candidate_slugs(row)
+        for slug in forms:
+            if not taken(slug):
+                return slug
+        n = 2
+        while taken(f"{forms[-1]}-{n}"):
+            n += 1
+        return f"{forms[-1]}-{n}"
+
+    def assign(self, rows):
+        # rows: list of row dicts. Returns ([(slug, row index)], duplicate row count);
+        # one entry per pilot, using the most complete of its duplicate rows.
+        pages, used, duplicates = [], set(), 0
+        row_keys = [identity_keys(row) for row in rows]
+        for group in group_rows(row_keys):
+            best = group[0] if len(group) == 1 else max(group, key=lambda i: (completeness(rows[i]), -i))
+            keys = sorted({key for i in group for key in row_keys[i]})
+            slug = self._claim(rows[best], keys, used)
+            used.add(slug)
+            self.slugs[slug] = sorted(set(self.slugs.get(slug, [])) | set(keys))
+            for key in keys:
+                # Two registered pilots that turn out to be one: the loser redirects
+                previous = self.index.get(key)
+                if previous and previous != slug and previous not in used:
+                    self.redirects[previous] = slug
+                self.index[key] = slug
+            for i in group:
+                for old in legacy_slugs(rows[i]):
+                    # Never point another pilot's registered slug at this one
+                    if old != slug and old not in self.slugs:
+                        self.redirects.setdefault(old, slug)
+            pages.append((slug, best))
+            duplicates += len(group) - 1
+        # A slug can't be a page and a redirect; chains collapse to their target
+        for old in list(self.redirects):
+            if old in used:
+                del self.redirects[old]
+        for old, new in self.redirects.items():
+            seen = {old}
+            while new in self.redirects and new not in seen:
+                seen.add(new)
+                new = self.redirects[new]
+            self.redirects[old] = new
+        return pages, duplicates
+
+    def row_slugs(self, rows):
+        # The page slug of every row as assign() would hand them out (duplicate
+        # rows share their pilot's), leaving this registry untouched
+        trial = SlugRegistry({slug: list(keys) for slug, keys in self.slugs.items()}, dict(self.redirects), self.path)
+        pages, _ = trial.assign(rows)
+        out = [None] * len(rows)
+        for slug, i in pages:
+            out[i] = slug
+        for i, slug in enumerate(out):
+            if slug is None:
+                out[i] = trial.index[identity_keys(rows[i])[0]]
+        return out
@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+import numpy as np
+from cluster_tiles import KDTree, project, synthetic_pilots
+from pilot_store import PilotStore
+
+# Nearest-pilot queries.
+#
+# Python side: a KD-tree over Web Mercator coordinates answers radius queries
+# with a search radius widened for Mercator stretch, then trims the candidates
+# with an exact vectorized haversine. k-nearest doubles the radius until k
+# pilots are inside it.
+#
+# Static side: near/<geohash>.json buckets for the page. Each bucket holds the
+# pilots of its own cell *and* its 8 neighbours, so "Find Near Me" needs to
+# fetch exactly one small file.
+
+# --- CONFIGURATION ---
+EARTH_RADIUS_KM = 6371.0088
+BUCKET_PRECISION = 3      # ~156 x 156 km cells at the equator
+NEAR_DIR = "near"
+# ---------------------
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class PilotIndex:
+    def __init__(self, lat, lng):
+        self.lat = np.asarray(lat, dtype="float64")
+        self.lng = np.asarray(lng, dtype="float64")
+        x, y = project(self.lat, self.lng)
+        self.tree = KDTree(x, y)
+
+    def radius(self, lat, lng, km):
+        # Returns (ids, distances_km) of every pilot within km, nearest first.
+        # Mercator stretches by 1/cos(lat), so search as if at the highest
+        # latitude the circle can reach; the haversine pass then trims exactly.
+        reach = min(85.0, abs(lat) + math.degrees(km / EARTH_RADIUS_KM))
+        r = km / (2 * math.pi * EARTH_RADIUS_KM * math.cos(math.radians(reach)))
+        x, y = project(lat, lng)
+        ids = self.tree.within(float(x), float(y), r)
+        dist = haversine_km(lat, lng, self.lat[ids], self.lng[ids])
+        keep = dist <= km
+        ids, dist = ids[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return ids[order], dist[order]
+
+    def nearest(self, lat, lng, k=5, start_km=25.0):
+        k = min(k, len(self.lat))
+        km = start_km
+        while True:
+            ids, dist = self.radius(lat, lng, km)
+            if len(ids) >= k or km > 2 * math.pi * EARTH_RADIUS_KM:
+                return ids[:k], dist[:k]
+            km *= 2
+
+
+# --- GEOHASH BUCKETS ---
+def geohash(lat, lng, precision=BUCKET_PRECISION):
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    bits, code, even = 0, [], True
+    value = 0
+    while len(code) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            value = value * 2 + (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = value * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(code)
+
+
+def geohash_bounds(code):
+    # (south, north, west, east) of a geohash cell
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for char in code:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def cell_size(precision=BUCKET_PRECISION):
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def neighbours(lat, lng, precision=BUCKET_PRECISION):
+    # The cell containing (lat, lng) plus the 8 around it
+    dlat, dlng = cell_size(precision)
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            nlat = lat + i * dlat
+            if -90 <= nlat <= 90:
+                cells.add(geohash(nlat, (lng + j * dlng + 180) % 360 - 180, precision))
+    return cells
+
+
+def write_buckets(lat, lng, out_dir=NEAR_DIR, precision=BUCKET_PRECISION):
+    # near/<hash>.json = [[lat, lng, index], ...] for the cell and its neighbours
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    buckets = {}
+    for i, (a, b) in enumerate(zip(lat, lng)):
+        entry = [round(float(a), 5), round(float(b), 5), i]
+        for cell in neighbours(a, b, precision):
+            buckets.setdefault(cell, []).append(entry)
+    for cell, entries in buckets.items():
+        with open(os.path.join(out_dir, f"{cell}.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+    return len(buckets)
+
+
+# --- CLI / BENCHMARK ---
+def load_pilots(path):
+    # Located pilots only, through PilotStore (shared column aliases, .npz snapshot)
+    store = PilotStore.load(path)
+    located = store.has_location()
+    names = [f"{n.strip()} ({s})" for n, s in zip(store.full_names()[located], store["state"][located])]
+    return names, store.lat[located], store.lng[located]
+
+
+def benchmark(sizes=(1000, 10000, 100000), queries=200):
+    print(f"{'pilots':>8} {'build ms':>9} {'knn5 us':>9} {'r50km us':>9} {'brute us':>9}")
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        lat, lng = synthetic_pilots(n)
+        start = time.perf_counter()
+        index = PilotIndex(lat, lng)
+        build = (time.perf_counter() - start) * 1000
+        pick = rng.integers(0, n, queries)
+        qlat, qlng = lat[pick] + 0.1, lng[pick] + 0.1
+
+        def per_query(fn):
+            start = time.perf_counter()
+            for a, b in zip(qlat, qlng):
+                fn(a, b)
+            return (time.perf_counter() - start) / queries * 1e6
+
+        knn = per_query(lambda a, b: index.nearest(a, b, 5))
+        rad = per_query(lambda a, b: index.radius(a, b, 50))
+        brute = per_query(lambda a, b: np.argpartition(haversine_km(a, b, lat, lng), 5)[:5])
+        print(f"{n:>8} {build:>9.1f} {knn:>9.0f} {rad:>9.0f} {brute:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the pilots nearest a point.")
+    parser.add_argument("--near", nargs=2, type=float, metavar=("LAT", "LNG"))
+    parser.add_argument("-k", type=int, default=5, help="how many pilots to return")
+    parser.add_argument("--radius", type=float, help="return every pilot within this many km instead")
+    parser.add_argument("--csv", default="drone_pilots_WITH_PHONES_FINAL.csv")
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    elif args.near:
+        names, lats, lngs = load_pilots(args.csv)
+        index = PilotIndex(lats, lngs)
+        lat, lng = args.near
+        ids, dist = index.radius(lat, lng, args.radius) if args.radius else index.nearest(lat, lng, args.k)
+        for i, d in zip(ids, dist):
+            print(f"{d:8.1f} km  {names[i]}")
+    else:
+        parser.print_help()
@@ -0,0 +1,104 @@
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# What geocode_server.py and contact_server.py have in common: a threaded
+# JSON-over-GET server with one route, configurable latency and injected
+# failures, and a /status page with the request counters. Each server
+# subclasses StandIn with its route and answer().
+
+
+class StandIn:
+    # Shared by every request thread
+    route = None    # e.g. "/search"
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=0):
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = self.errors = self.found = 0
+
+    def delay_and_fail(self):
+        # Returns True when this request should fail (an injected error_status)
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        return fail
+
+    def hit(self):
+        with self.lock:
+            self.found += 1
+
+    def answer(self, params):
+        # params: the query string as {name: first value}; returns the JSON body
+        raise NotImplementedError
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "found": self.found}
+
+
+class Handler(BaseHTTPRequestHandler):
+    standin = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.rstrip("/") == "/status":
+            return self.reply(200, self.standin.stats())
+        if url.path.rstrip("/") != self.standin.route:
+            return self.reply(404, {"error": "not found"})
+        if self.standin.delay_and_fail():
+            return self.reply(self.standin.error_status, {"error": "injected failure"})
+        self.reply(200, self.standin.answer(params))
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass   # One line per request would swamp the throughput runs
+
+
+def make_server(standin, host, port):
+    handler = type("StandInHandler", (Handler,), {"standin": standin})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve_in_background(server):
+    # Returns (server, base_url); call server.shutdown() when done
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def add_arguments(parser, host, port, error_help="share of requests answered with HTTP 503"):
+    parser.add_argument("--host", default=host)
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help=error_help)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def serve_forever(server, banner):
+    # banner gets the base URL; it is flushed, since serve_in_subprocess waits on it
+    host, port = server.server_address[:2]
+    print(banner.format(url=f"http://{host}:{port}"), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.RequestHandlerClass.standin.stats())
@@ -0,0 +1,160 @@
+import argparse
+import os
+import resource
+import tempfile
+import time
+import pandas as pd
+from geocode_cache import backend_choice
+
+# Chunked, bounded-memory version of the read -> fix -> save cycle.
+#
+# The fix_* scripts load the whole CSV and write the whole CSV back, which is
+# fine for a few hundred pilots but not for a national registry import. Here
+# the input is read CHUNK_SIZE rows at a time, every stage transforms one
+# chunk, and the chunk is appended to a temp file that replaces the output
+# only once the last chunk is written (so input and output may be the same
+# file). Memory stays at roughly one chunk however big the file is.
+#
+#   python stream_csv.py registry.csv --out registry_located.csv --stages resolve,geocode
+#   python stream_csv.py registry.csv --geocoder offline      # no network: gazetteer only
+
+# --- CONFIGURATION ---
+CHUNK_SIZE = 50000
+USER_AGENT = "drone_directory_stream_v1"
+# ---------------------
+
+
+# Every cell is read as the text in the file. Type inference would run again
+# per chunk and turn "+12707294721" into "12707294721.0" on the way back out;
+# the stages parse the columns they need (locations uses pd.to_numeric).
+READ_OPTIONS = {"dtype": str, "keep_default_na": False}
+
+
+def read_chunks(path, chunksize=CHUNK_SIZE):
+    # Generator of DataFrames; pandas only holds one chunk of the file at a time
+    with pd.read_csv(path, chunksize=chunksize, **READ_OPTIONS) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+class ChunkWriter:
+    # Appends chunks to a temp file next to `path`, renamed over it on close.
+    # Columns are fixed by the first chunk so every later chunk lines up.
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".csv", dir=folder)
+        self.file = os.fdopen(fd, "w", newline="", encoding="utf-8")
+        self.columns = None
+        self.rows = 0
+
+    def write(self, chunk):
+        # The first chunk (even an empty one) writes the header
+        header = self.columns is None
+        if header:
+            self.columns = list(chunk.columns)
+        chunk.reindex(columns=self.columns).to_csv(self.file, header=header, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream(path, out_path, stages, chunksize=CHUNK_SIZE, verbose=True):
+    # Runs each stage (chunk -> chunk) over the file. Returns a report dict.
+    started = time.perf_counter()
+    total = 0
+    with ChunkWriter(out_path) as writer:
+        for n, chunk in enumerate(read_chunks(path, chunksize), 1):
+            for stage in stages:
+                chunk = stage(chunk)
+            writer.write(chunk)
+            total += len(chunk)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"chunk {n}: {total} rows, {total / elapsed:,.0f} rows/s, peak {peak_rss_mb():.0f} MB")
+        if writer.columns is None:
+            # No rows at all: the output still gets a header, including any
+            # columns the stages add
+            chunk = pd.read_csv(path, nrows=0, **READ_OPTIONS)
+            for stage in stages:
+                chunk = stage(chunk)
+            writer.write(chunk)
+    elapsed = time.perf_counter() - started
+    return {"rows": total, "seconds": round(elapsed, 3), "rows_per_sec": round(total / elapsed) if elapsed else 0,
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+# --- STAGES ---
+# Each factory returns a function chunk -> chunk. Anything costly to set up
+# (gazetteer, geocoder, cache) is created once here, not once per chunk.
+
+def resolve_stage():
+    from gazetteer import Gazetteer
+    from locations import resolve
+    gazetteer = Gazetteer()
+
+    def run(chunk):
+        resolve(chunk, gazetteer=gazetteer)
+        return chunk
+    return run
+
+
+def geocode_stage(backend="nominatim"):
+    # City-level lookups for rows not yet located to their city, through any
+    # --geocoder backend ("--geocoder offline" answers from the gazetteer, no network)
+    from batch_geocode import geocode_unique
+    from geocode_async import default_engine
+    from locations import needs, assign
+    geocoder = default_engine(USER_AGENT, backend=backend)
+
+    def run(chunk):
+        lat, lng, _ = geocode_unique(chunk, geocoder, mask=needs(chunk, "place"), verbose=False)
+        assign(chunk, lat.notna(), lat, lng, "stream", "place")
+        return chunk
+    return run
+
+
+STAGES = {"resolve": resolve_stage, "geocode": geocode_stage}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the location pipeline over a CSV in bounded memory.")
+    parser.add_argument("csv")
+    parser.add_argument("--out", help="output CSV (default: rewrite the input)")
+    parser.add_argument("--stages", default="resolve,geocode", help=f"comma separated, from {', '.join(STAGES)}")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--geocoder", default="nominatim", type=backend_choice,
+                        help="nominatim, local, offline or a Nominatim-compatible URL")
+    args = parser.parse_args()
+
+    stages = []
+    for name in args.stages.split(","):
+        stages.append(geocode_stage(args.geocoder) if name == "geocode" else STAGES[name]())
+    report = stream(args.csv, args.out or args.csv, stages, args.chunksize)
+    print("------------------------------------------------")
+    print(f"DONE! {report['rows']} rows in {report['seconds']}s "
+          f"({report['rows_per_sec']:,} rows/s, peak {report['peak_rss_mb']} MB)")
+    print("------------------------------------------------")
@@ -0,0 +1,64 @@
+import os
+import zlib
+import assets
+from assets import fingerprint, prune, references, retire
+
+
+def test_replaced_asset_outlives_cached_html(tmp_path):
+    out = str(tmp_path / "assets")
+    first = fingerprint("map", "a{}", "css", out)
+    generations = retire([], [first], now=1000)
+    second = fingerprint("map", "b{}", "css", out)
+    generations = retire(generations, [second], now=2000, keep_seconds=300)
+    # Pages cached before this deploy still point at the first version
+    prune(generations, [out])
+    assert os.path.exists(first) and os.path.exists(first + ".gz")
+
+    # Same build again once those pages have expired: only the second is left
+    generations = retire(generations, [second], now=2400, keep_seconds=300)
+    assert generations == [{"at": 2000, "files": [second]}]
+    assert prune(generations, [out]) >= 2
+    assert {f.split(".")[1] for f in os.listdir(out)} == {os.path.basename(second).split(".")[1]}
+
+
+def test_reverting_starts_a_new_generation(tmp_path):
+    first = fingerprint("map", "a{}", "css", str(tmp_path))
+    second = fingerprint("map", "b{}", "css", str(tmp_path))
+    generations = retire(retire([], [first], now=1000), [second], now=2000)
+    # Going back to the first content makes it current again; the second just retired
+    generations = retire(generations, [first], now=3000, keep_seconds=300)
+    assert [g["files"] for g in generations] == [[second], [first]]
+    prune(generations, [str(tmp_path)])
+    assert os.path.exists(first) and os.path.exists(second)
+
+
+def test_references_follow_html_into_its_assets(tmp_path, monkeypatch):
+    # A fresh checkout has no build history: the HTML on disk says what is live
+    monkeypatch.chdir(tmp_path)
+    data = fingerprint("pilots", "[]", "json", "data")
+    js = fingerprint("map", f"fetch('{data}')", "js")
+    fingerprint("map", "old()", "js")    # Committed, but nothing points at it
+    with open("index.html", "w", encoding="utf-8") as f:
+        f.write(f'<script src="{js}"></script>')
+    assert references(["index.html", "missing.html"], ["assets", "data"]) == sorted([js, data])
+
+
+class FakeBrotli:
+    @staticmethod
+    def compress(payload, quality):
+        return zlib.compress(payload)
+
+
+def test_siblings_appear_once_brotli_is_installed(tmp_path, monkeypatch):
+    # A tree first built without brotli gets its .br files on the next build,
+    # even though the files themselves are unchanged
+    monkeypatch.setattr(assets, "brotli", None)
+    path = tmp_path / os.path.basename(fingerprint("pilots", "{}", "json", str(tmp_path)))
+    assert not os.path.exists(str(path) + ".br")
+    monkeypatch.setattr(assets, "brotli", FakeBrotli)
+    fingerprint("pilots", "{}", "json", str(tmp_path))
+    with open(str(path) + ".br", "rb") as f:
+        assert zlib.decompress(f.read()) == b"{}"
+    os.remove(str(path) + ".gz")
+    assert assets.write_missing_compressed(str(path), b"{}") == [".gz"]
+    assert assets.write_missing_compressed(str(path), b"{}") == []
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from batch_geocode import geocode_unique
+from geocode_cache import StubGeocoder
+
+ANSWERS = {"Akron, OH, USA": (41.08, -81.52), "Austin, TX, USA": (30.27, -97.74)}
+
+
+def pilots():
+    return pd.DataFrame({
+        "City": ["Akron", " akron ", "Austin", "Akron", "Nowhere", "", "Austin"],
+        "State": ["OH", "oh", "TX", "OH", "OH", "OH", "TX"],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+
+
+def test_each_location_is_geocoded_once_and_broadcast():
+    stub = StubGeocoder(ANSWERS)
+    lat, lng, report = geocode_unique(pilots(), stub, verbose=False)
+    # Akron x3, Austin x2 and Nowhere: three lookups for six rows; no city, no lookup
+    assert stub.calls == 3
+    assert report == {"rows": 6, "unique_locations": 3, "calls_saved": 3, "found": 5, "errors": 0}
+    assert lat.index.tolist() == [10, 11, 12, 13, 14, 15, 16]
+    np.testing.assert_array_equal(lat.to_numpy(), [41.08, 41.08, 30.27, 41.08, np.nan, np.nan, 30.27])
+    np.testing.assert_array_equal(lng.to_numpy(), [-81.52, -81.52, -97.74, -81.52, np.nan, np.nan, -97.74])
+
+
+def test_masked_rows_are_left_alone():
+    stub = StubGeocoder(ANSWERS)
+    mask = pd.Series([False, True, False, False, False, False, True], index=[10, 11, 12, 13, 14, 15, 16])
+    lat, _, report = geocode_unique(pilots(), stub, mask=mask, verbose=False)
+    assert stub.calls == 2
+    assert report["unique_locations"] == 2 and report["calls_saved"] == 0
+    assert lat[~mask].isna().all() and lat[mask].tolist() == [41.08, 30.27]
+
+
+def test_errors_are_counted_per_location():
+    def broken(query, **kwargs):
+        raise TimeoutError(query)
+    lat, _, report = geocode_unique(pilots(), broken, verbose=False)
+    assert (report["errors"], report["found"]) == (3, 0) and lat.isna().all()
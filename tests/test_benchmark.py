@@ -0,0 +1,26 @@
+from benchmark import check, compare
+
+
+def report(calibration, **stages):
+    return {"meta": {"calibration": calibration}, "results": {"1000": stages}}
+
+
+def test_timings_are_scaled_to_this_machine():
+    baseline = report(0.1, resolve=1.0, geocode_cold=2.0, geocode_calls=197)
+    # Same code on a machine half as fast: twice the time is expected, not a regression
+    assert compare(report(0.2, resolve=2.1, geocode_cold=2.1, geocode_calls=197), baseline) == []
+    # ...but the geocoder's sleep doesn't get faster on a faster machine either
+    assert compare(report(0.05, resolve=0.5, geocode_cold=2.1, geocode_calls=197), baseline) == []
+    problems = compare(report(0.1, resolve=2.0, geocode_cold=2.0, geocode_calls=198), baseline)
+    assert [p.split()[1] for p in problems] == ["resolve:", "geocode_calls:"]
+
+
+def test_baseline_without_calibration_only_checks_counters():
+    baseline = {"meta": {}, "results": {"1000": {"resolve": 1.0, "geocode_calls": 197}}}
+    assert compare(report(0.1, resolve=9.0, geocode_calls=197), baseline) == []
+    assert len(compare(report(0.1, resolve=9.0, geocode_calls=1), baseline)) == 1
+
+
+def test_incremental_build_must_beat_the_full_build():
+    assert check(report(0.1, build=0.72, build_incremental=0.2)) == []
+    assert len(check(report(0.1, build=0.72, build_incremental=0.96))) == 1
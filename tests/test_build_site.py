@@ -0,0 +1,50 @@
+import os
+import shutil
+import pandas as pd
+import build_site
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build(folder, csv, jobs):
+    # Every file the build wrote, by path relative to its folder
+    os.makedirs(folder)
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        build_site.run_build(jobs=jobs, db_file=csv)
+    finally:
+        os.chdir(cwd)
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, folder)] = f.read()
+    return files
+
+
+def test_parallel_build_matches_serial(tmp_path):
+    csv = str(tmp_path / "pilots.csv")
+    pd.read_csv(os.path.join(REPO, "drone_pilots_WITH_PHONES_FINAL.csv")).head(60).to_csv(csv, index=False)
+    serial = build(str(tmp_path / "serial"), csv, jobs=1)
+    parallel = build(str(tmp_path / "parallel"), csv, jobs=3)
+    assert sum(name.startswith(build_site.PAGES_DIR) for name in serial) > 60
+    assert serial.keys() == parallel.keys()
+    assert [name for name in serial if serial[name] != parallel[name]] == []
+
+
+def test_unchanged_rebuild_reuses_tiles_near_and_search(tmp_path, monkeypatch):
+    csv = str(tmp_path / "pilots.csv")
+    pd.read_csv(os.path.join(REPO, "drone_pilots_WITH_PHONES_FINAL.csv")).head(30).to_csv(csv, index=False)
+    monkeypatch.chdir(tmp_path)
+    first = build_site.run_build(db_file=csv)
+    assert first["reused"] == []
+    again = build_site.run_build(db_file=csv)
+    assert again["rendered"] == 0 and again["reused"] == ["tiles", "near", "search"]
+    assert again["tiles"] == first["tiles"]
+    # A stage whose output went missing runs again; --force runs everything
+    shutil.rmtree(build_site.TILES_DIR)
+    assert build_site.run_build(db_file=csv)["reused"] == ["near", "search"]
+    assert os.path.exists(os.path.join(build_site.TILES_DIR, "meta.json"))
+    assert build_site.run_build(db_file=csv, force=True)["reused"] == []
@@ -0,0 +1,46 @@
+import json
+import pandas as pd
+from checkpoint import Journal
+
+
+def csv_file(tmp_path):
+    path = str(tmp_path / "pilots.csv")
+    pd.DataFrame({"City": ["Akron", "Dayton", "Kent"]}).to_csv(path, index=False)
+    return path
+
+
+def test_resume_after_torn_last_line(tmp_path):
+    path = csv_file(tmp_path)
+    journal = Journal(path, "geocode", columns=("lat", "lng"))
+    journal.record(0, 41.08, -81.52)
+    journal.record(1)   # Processed, nothing found
+    journal.file.write('{"row": 2, "lat": 41.1')   # Crash mid-append
+    journal.file.close()
+
+    journal = Journal(path, "geocode", columns=("lat", "lng"))
+    assert journal.done(0) and journal.done(1) and not journal.done(2)
+    journal.record(2, 41.15, -81.36)
+    journal.file.close()
+    with open(path + ".journal", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]   # Every line parses again
+    assert [line.get("row") for line in lines] == [None, 0, 1, 2]
+
+    journal = Journal(path, "geocode", columns=("lat", "lng"))
+    df = pd.read_csv(path)
+    journal.compact(df)
+    df = pd.read_csv(path)
+    assert df["lat"].tolist()[::2] == [41.08, 41.15] and pd.isna(df["lat"][1])
+    assert not (tmp_path / "pilots.csv.journal").exists()
+
+
+def test_stale_or_foreign_entries_are_ignored(tmp_path):
+    path = csv_file(tmp_path)
+    journal = Journal(path, "geocode")
+    journal.record(0, 41.08, -81.52)
+    journal.file.write('{"note": "no row"}\n')
+    journal.file.close()
+    assert set(Journal(path, "geocode").entries) == {0}
+
+    # A journal started against different CSV contents no longer applies
+    pd.DataFrame({"City": ["Toledo"]}).to_csv(path, index=False)
+    assert Journal(path, "geocode").entries == {}
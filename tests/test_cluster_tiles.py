@@ -0,0 +1,49 @@
+import os
+import scatter
+from cluster_tiles import MAX_ZOOM, build_levels, project, synthetic_pilots, write_tiles
+
+
+def test_pins_a_town_apart_split_at_max_zoom():
+    levels = build_levels([40.0, 40.01], [-83.0, -83.0])
+    _, _, count, point_id, _ = levels[MAX_ZOOM]
+    assert count.tolist() == [1, 1] and sorted(point_id.tolist()) == [0, 1]
+    assert levels[0][2].tolist() == [2]
+
+
+def test_pilots_scattered_around_one_town_all_split():
+    lat, lng = scatter.displace([40.0] * 60, [-83.0] * 60, [f"pilot-{i}" for i in range(60)],
+                                precision=["place"] * 60)
+    _, _, count, _, _ = build_levels(lat, lng)[MAX_ZOOM]
+    assert (count == 1).all() and len(count) == 60
+
+
+def test_every_pilot_is_counted_once_per_zoom():
+    lat, lng = synthetic_pilots(2000)
+    for zoom, (_, _, count, _, _) in build_levels(lat, lng).items():
+        assert count.sum() == 2000, zoom
+
+
+
+def tile_files(out_dir):
+    return {os.path.relpath(os.path.join(folder, f), out_dir).replace(os.sep, "/"): os.path.getmtime(os.path.join(folder, f))
+            for folder, _, files in os.walk(out_dir) for f in files}
+
+
+def test_rebuild_rewrites_only_changed_tiles(tmp_path):
+    out = str(tmp_path / "tiles")
+    # One pilot in Ohio, one in Texas: moving the Texan leaves Ohio's own tile alone
+    write_tiles([40.0, 31.0], [-83.0, -97.0], out)
+    for path in tile_files(out):
+        os.utime(os.path.join(out, path), (0, 0))
+    write_tiles([40.0, 31.5], [-83.0, -97.5], out)
+    x, y = project(40.0, -83.0)
+    n = 2 ** MAX_ZOOM
+    files = tile_files(out)
+    assert files[f"{MAX_ZOOM}/{int(x * n)}/{int(y * n)}.json"] == 0
+    assert files["meta.json"] == 0
+    assert sum(1 for mtime in files.values() if mtime > 0) > 0
+
+    # Tiles nobody lands in any more are removed, empty folders too
+    assert write_tiles([40.0], [-83.0], out) == MAX_ZOOM + 1
+    assert len(tile_files(out)) == MAX_ZOOM + 2
+    assert all(len(os.listdir(os.path.join(out, z))) == 1 for z in os.listdir(out) if z != "meta.json")
@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+import enrich_contacts
+from contact_server import load_directory, serve_in_background
+from enrich_contacts import ContactCache, Enricher, HttpLookup, FAILED, contact_key, enrich, to_e164
+
+DIRECTORY = {contact_key("Hagan's Drone Service", "", "KY"): "+12707294721",
+             contact_key("", "Josh Cooper", "TX"): "+19209491651"}
+
+
+def pilots():
+    return pd.DataFrame({
+        "First Name": ["Grant", "Josh", "Amy", "Ray"],
+        "Last Name": ["Hagan", "Cooper", "Lee", "Fox"],
+        "Business": ["Hagan's Drone Service", "", "Lee Aerial", ""],
+        "City": ["", "Austin", "", ""],
+        "State": ["KY", "tx", "OH", "MN"],
+        "Found_Phone": ["", "n/a", "", "(612) 555-0142"],
+    })
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**options):
+        server, url = serve_in_background(directory=DIRECTORY, **options)
+        servers.append(server)
+        return server.RequestHandlerClass.standin, url
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(enrich_contacts, "backoff_delay", lambda attempt: 0)
+
+
+def test_to_e164():
+    raw = pd.Series(["270-729-4721", "(920) 949-1651", "1 615 607 0830", "+1 (612) 555-0142",
+                     "123-456-7890", "555-0142", "", None, "nan", "2707294721 ext 5"])
+    assert to_e164(raw).tolist() == ["+12707294721", "+19209491651", "+16156070830", "+16125550142",
+                                     "", "", "", "", "", ""]
+
+
+def test_cache_miss_then_hit(server, tmp_path):
+    standin, url = server()
+    cache = ContactCache(str(tmp_path / "contacts.sqlite"))
+    df = pilots()
+    report = enrich(df, HttpLookup(url), cache, verbose=False)
+    # Ray already has a valid number; the other three are looked up once each
+    assert (report["cached"], report["looked_up"], report["found"]) == (0, 3, 2)
+    assert df["Phone_E164"].tolist() == ["+12707294721", "+19209491651", "", "+16125550142"]
+    assert standin.requests == 3
+
+    report = enrich(pilots(), HttpLookup(url), cache, verbose=False)
+    # Both numbers and the "nothing found" for Amy come from the cache
+    assert (report["cached"], report["looked_up"], report["found"]) == (3, 0, 2)
+    assert standin.requests == 3
+    assert (cache.hits, cache.misses) == (3, 3)
+    cache.close()
+
+
+def test_negative_answers_expire(tmp_path):
+    cache = ContactCache(str(tmp_path / "contacts.sqlite"), negative_ttl_days=30)
+    cache.put_many({"found|ky": "+12707294721", "fresh|oh": None, "stale|mn": None})
+    cache.conn.execute("UPDATE contacts SET created = created - 31 * 86400 WHERE key != 'fresh|oh'")
+    # An old number is still good; only the old "nothing found" is retried
+    assert cache.get_many(["found|ky", "fresh|oh", "stale|mn"]) == {"found|ky": "+12707294721", "fresh|oh": None}
+    cache.close()
+
+
+def test_rate_limited_lookups_are_retried(server):
+    standin, url = server(error_rate=0.5, error_status=429, seed=1)
+    engine = Enricher(HttpLookup(url), rate=1000, burst=1000, max_retries=20)
+    queries = {f"k{i}": ("Hagan's Drone Service", "", "", "KY") for i in range(20)}
+    answers = engine.lookup_many(queries)
+    assert set(answers.values()) == {"+12707294721"}
+    assert engine.errors == standin.errors > 0
+    assert not engine.failures
+
+
+def test_retries_give_up(server):
+    standin, url = server(error_rate=1.0, error_status=429)
+    engine = Enricher(HttpLookup(url), max_retries=2)
+    assert engine.lookup_many({"k": ("Lee Aerial", "", "", "OH")}) == {"k": FAILED}
+    assert standin.requests == engine.errors == 3
+
+
+def test_non_retryable_failures_are_counted(server):
+    class Broken:
+        def lookup(self, business, name, city, state):
+            raise ValueError("not JSON")
+
+    _, url = server()
+    engine = Enricher(HttpLookup(url + "/nowhere"), max_retries=3)
+    assert engine.lookup_many({"a": ("A", "", "", "KY"), "b": ("B", "", "", "KY")}) == {"a": FAILED, "b": FAILED}
+    assert engine.failures == {"HTTP 404": 2}
+    assert engine.calls == 2    # not retried
+    engine = Enricher(Broken())
+    engine.lookup_many({"a": ("A", "", "", "KY")})
+    assert engine.failures == {"ValueError": 1}
+
+
+def test_aliased_headers(server, tmp_path):
+    # Same pilots under other spellings: answers land in the CSV's own columns
+    _, url = server()
+    df = pilots().rename(columns={"First Name": "First", "Last Name": "Last", "Business": "Company",
+                                  "City": "Town", "State": "ST", "Found_Phone": "Phone"})
+    cache = ContactCache(str(tmp_path / "contacts.sqlite"))
+    report = enrich(df, HttpLookup(url), cache, verbose=False)
+    cache.close()
+    assert (report["looked_up"], report["found"]) == (3, 2)
+    assert df["Phone_E164"].tolist() == ["+12707294721", "+19209491651", "", "+16125550142"]
+    assert df["Phone"].tolist() == ["+12707294721", "+19209491651", "", "(612) 555-0142"]
+    assert "Found_Phone" not in df.columns
+
+
+def test_stand_in_directory_reads_aliased_headers(tmp_path):
+    path = tmp_path / "pilots.csv"
+    path.write_text("Name,Company,ST,Phone\n"
+                    "Grant Hagan,Hagan's Drone Service,ky,270-729-4721\n"
+                    "Josh Cooper,,TX,(920) 949-1651\n"
+                    "Amy Lee,Lee Aerial,OH,n/a\n")
+    assert load_directory(str(path)) == DIRECTORY
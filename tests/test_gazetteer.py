@@ -0,0 +1,32 @@
+import numpy as np
+from gazetteer import Gazetteer, GazetteerGeocoder, STATE_BOUNDS, PLACE, COUNTY, STATE
+
+
+def test_every_entry_lies_in_its_state():
+    g = Gazetteer()
+    bounds = np.array([STATE_BOUNDS[s] for s in g.state.astype(str)])
+    lat, lng = np.asarray(g.lat), np.asarray(g.lng)
+    assert ((lat >= bounds[:, 0]) & (lat <= bounds[:, 1]) & (lng >= bounds[:, 2]) & (lng <= bounds[:, 3])).all()
+
+
+def test_lookup_levels():
+    g = Gazetteer()
+    _, _, level = g.lookup(["Pensacola", "Escambia", "", "Nowhereville"], ["FL", "FL", "FL", "FL"], return_level=True)
+    assert level.tolist() == [PLACE, COUNTY, STATE, STATE]
+
+
+def test_geocoder_answers_city_queries_with_places_only():
+    geocoder = GazetteerGeocoder()
+    assert geocoder.geocode("Pensacola, FL, USA") is not None
+    assert geocoder.geocode("Escambia, FL, USA") is None   # only a county by that name
+    assert geocoder.geocode("FL, USA") is not None
+
+
+def test_misspelled_cities_match_and_misses_are_remembered(monkeypatch):
+    g = Gazetteer()
+    assert g.find("Cincinatti", "OH") == g.find("Cincinnati", "OH") >= 0
+    assert g.find("Colombus", "OH") == g.find("Columbus", "OH")
+    assert g.find("Zzyzxqville", "OH") == -1
+    # A second miss is answered from memory, without another difflib scan
+    monkeypatch.setattr("difflib.get_close_matches", lambda *a, **k: 1 / 0)
+    assert g.find("Zzyzxqville", "OH") == -1
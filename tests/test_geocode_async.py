@@ -0,0 +1,99 @@
+import asyncio
+import time
+import pytest
+from geopy.exc import GeocoderAuthenticationFailure, GeocoderQueryError, GeocoderTimedOut, GeocoderUnavailable
+import geocode_async
+from geocode_async import GeocodeEngine, Provider, TokenBucket, backoff_delay
+from geocode_cache import CachedGeocoder, GeocodeCache, Location, StubGeocoder
+
+
+class Flaky:
+    # Raises the queued errors in order, then answers like a StubGeocoder
+    def __init__(self, errors=(), answers=None):
+        self.errors = list(errors)
+        self.stub = StubGeocoder(answers or {"Akron, OH": (41.08, -81.52)})
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.stub.geocode(query)
+
+
+def provider(name, geocoder):
+    return Provider(name, geocoder, rate=1000, burst=1000)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(geocode_async, "backoff_delay", lambda attempt: delays.append(attempt) or 0)
+    return delays
+
+
+def test_token_bucket_holds_the_rate():
+    async def take(n):
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+    # The first token is free; ten more at 50/s take 0.2s
+    assert 0.19 <= asyncio.run(take(11)) < 0.5
+
+
+def test_backoff_is_capped_full_jitter():
+    assert all(0 <= backoff_delay(attempt, base=1.0, cap=5.0) <= min(5.0, 2 ** attempt) for attempt in range(8) for _ in range(20))
+
+
+def test_transient_errors_are_retried_with_backoff(no_backoff):
+    flaky = Flaky([GeocoderTimedOut(), GeocoderUnavailable()])
+    engine = GeocodeEngine([provider("a", flaky)], max_retries=3)
+    assert engine.geocode("Akron, OH") == Location(41.08, -81.52)
+    assert flaky.calls == 3 and no_backoff == [0, 1]
+    assert engine.errors == 0
+
+
+def test_retries_give_up(no_backoff):
+    flaky = Flaky([GeocoderTimedOut()] * 10)
+    engine = GeocodeEngine([provider("a", flaky)], max_retries=2)
+    assert engine.geocode("Akron, OH") is None
+    assert flaky.calls == 3 and engine.errors == 1
+
+
+def test_failover_to_the_next_provider(no_backoff):
+    down, up = Flaky([GeocoderUnavailable()] * 10), Flaky()
+    engine = GeocodeEngine([provider("down", down), provider("up", up)], max_retries=1)
+    engine.providers[1].rate = 0   # Every query starts on "down"
+    assert engine.geocode("Akron, OH") == Location(41.08, -81.52)
+    assert (down.calls, up.calls) == (2, 1)
+
+
+@pytest.mark.parametrize("error", [GeocoderAuthenticationFailure("bad key"), GeocoderQueryError("bad query")])
+def test_non_retryable_errors_are_tried_once(no_backoff, error):
+    broken = Flaky([error] * 10)
+    engine = GeocodeEngine([provider("a", broken)], max_retries=3)
+    assert engine.geocode("Akron, OH") is None
+    assert broken.calls == 1 and no_backoff == []
+    assert engine.errors == 1
+
+
+def test_restricted_and_unrestricted_answers_do_not_collide(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    # Worldwide, "Paris" is France; restricted to the US it is Paris, TX
+    CachedGeocoder(StubGeocoder({"Paris": (48.8566, 2.3522)}), cache, min_delay=0).geocode("Paris")
+    us_only = Provider("us", StubGeocoder({"Paris": (33.6609, -95.5555)}), rate=1000, burst=1000,
+                       geocode_kwargs={"timeout": 10, "country_codes": "us"})
+    engine = GeocodeEngine([us_only], cache=cache)
+
+    assert engine.geocode("Paris") == Location(33.6609, -95.5555)
+    assert (engine.cache_hits, us_only.calls) == (0, 1)
+    assert cache.get("Paris") == Location(48.8566, 2.3522)
+    assert cache.get("Paris", country_codes="us") == Location(33.6609, -95.5555)
+
+    # A second run answers from the US row, not the worldwide one
+    engine = GeocodeEngine([us_only], cache=cache)
+    assert engine.geocode("Paris") == Location(33.6609, -95.5555)
+    assert (engine.cache_hits, us_only.calls) == (1, 1)
+    cache.close()
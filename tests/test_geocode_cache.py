@@ -0,0 +1,62 @@
+import argparse
+import pytest
+from geocode_cache import CachedGeocoder, GeocodeCache, Location, MISS, StubGeocoder, backend_choice, cache_key
+
+DAY = 86400
+
+
+def age(cache, query, days):
+    cache.conn.execute("UPDATE geocode SET created = created - ? WHERE query = ?", (days * DAY, cache_key(query)))
+
+
+def test_keys_are_normalized():
+    assert cache_key("  Akron , oh,USA ") == cache_key("akron, OH, USA") == "akron, oh, usa"
+    assert cache_key("Akron, OH", timeout=10, exactly_one=True) == cache_key("Akron, OH")
+    assert cache_key("Akron, OH", country_codes="us") != cache_key("Akron, OH")
+
+
+def test_found_and_negative_entries_expire(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), ttl_days=180, negative_ttl_days=14)
+    cache.put("Akron, OH", Location(41.08, -81.52))
+    cache.put("Nowhere, ZZ", None)
+    assert cache.get("akron, oh") == Location(41.08, -81.52)
+    assert cache.get("Nowhere, ZZ") is None   # A cached "not found"
+
+    age(cache, "Akron, OH", 30)
+    age(cache, "Nowhere, ZZ", 30)
+    assert cache.get("Akron, OH") == Location(41.08, -81.52)
+    assert cache.get("Nowhere, ZZ") is MISS
+    age(cache, "Akron, OH", 200)
+    assert cache.get("Akron, OH") is MISS
+    assert (cache.hits, cache.misses) == (3, 2)
+    cache.close()
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("A", Location(1, 1))
+    cache.put("B", Location(2, 2))
+    cache.conn.execute("UPDATE geocode SET last_used = last_used - 10")
+    cache.get("A")   # Older than B until this read
+    cache.put("C", Location(3, 3))
+    assert len(cache) == 2
+    assert cache.get("B") is MISS and cache.get("A") == Location(1, 1)
+    cache.close()
+
+
+def test_cached_geocoder_calls_the_network_once(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    stub = StubGeocoder({"Akron, OH": (41.08, -81.52)})
+    geocoder = CachedGeocoder(stub, cache, min_delay=0)
+    for _ in range(3):
+        assert geocoder.geocode("Akron, OH") == Location(41.08, -81.52)
+        assert geocoder.geocode("Nowhere, ZZ") is None
+    assert stub.calls == 2
+    cache.close()
+
+
+def test_backend_choice_rejects_typos():
+    assert backend_choice("offline") == "offline"
+    assert backend_choice("http://localhost:8080") == "http://localhost:8080"
+    with pytest.raises(argparse.ArgumentTypeError):
+        backend_choice("nominatm")
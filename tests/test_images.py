@@ -0,0 +1,53 @@
+import os
+import pytest
+import images
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def headshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "CACHE_DIR", str(tmp_path / "cache"))
+    sha = "ab" * 10
+    os.makedirs(os.path.dirname(images.original_path(sha)))
+    Image.new("RGB", (300, 400), "tan").save(images.original_path(sha), format="PNG")
+    out = tmp_path / "img"
+    out.mkdir()
+    images.writable_formats.cache_clear()
+    yield sha, str(out)
+    images.writable_formats.cache_clear()
+
+
+@pytest.fixture
+def no_avif(monkeypatch):
+    # Pillow built without an AVIF encoder
+    save = Image.Image.save
+
+    def without_avif(self, fp, format=None, **params):
+        if str(format or fp).lower().endswith("avif"):
+            raise KeyError("AVIF")
+        return save(self, fp, format, **params)
+    monkeypatch.setattr(Image.Image, "save", without_avif)
+
+
+def test_webp_is_kept_when_avif_is_disabled(headshot, no_avif):
+    sha, out = headshot
+    assert images.writable_formats() == ("webp",)
+    assert images.make_thumbnails(sha, out) == (sha, None)
+    assert sorted(os.listdir(out)) == [f"{sha}-128.webp", f"{sha}-256.webp"]
+    page = images.picture(sha, "Pilot", out_dir=out)
+    assert 'type="image/avif"' not in page and f'src="img/{sha}-128.webp"' in page
+
+
+def test_a_failed_avif_save_does_not_stop_webp(headshot, monkeypatch):
+    sha, out = headshot
+    save = Image.Image.save
+
+    def failing_avif(self, fp, format=None, **params):
+        if str(fp).endswith(".avif"):
+            raise OSError("encoder error")
+        return save(self, fp, format, **params)
+    monkeypatch.setattr(Image.Image, "save", failing_avif)
+
+    assert images.make_thumbnails(sha, out) == (sha, None)
+    assert images.has_thumbnails(sha, out) and images.formats(sha, out) == ["webp"]
@@ -0,0 +1,77 @@
+import csv
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+from locations import assign, in_claimed_state, resolve, LAT_COL, LNG_COL, SOURCE_COL, PRECISION_COL, UPDATED_COL
+
+# City-level geocodes far from their state's center (or near its edge)
+EDGE_CITIES = [
+    ("Pensacola", "FL", 30.4213, -87.2169),
+    ("Amarillo", "TX", 35.2220, -101.8313),
+    ("El Paso", "TX", 31.7619, -106.4850),
+]
+
+
+def test_edge_cities_are_in_their_state():
+    lat, lng, states = zip(*[(a, b, s) for _, s, a, b in EDGE_CITIES])
+    assert in_claimed_state(lat, lng, states).all()
+
+
+def test_points_in_another_state_are_rejected():
+    # Kentucky pilot placed in Georgia, Florida pilot placed in Alabama's north
+    assert not in_claimed_state([33.75, 34.73], [-84.39, -86.59], ["KY", "FL"]).any()
+
+
+def test_unknown_state_passes_and_missing_point_fails():
+    assert in_claimed_state([40.0, np.nan], [-80.0, -80.0], ["", "OH"]).tolist() == [True, False]
+
+
+def test_resolve_keeps_edge_city_geocodes():
+    df = pd.DataFrame({
+        "City": [c for c, _, _, _ in EDGE_CITIES],
+        "State": [s for _, s, _, _ in EDGE_CITIES],
+        LAT_COL: [a for _, _, a, _ in EDGE_CITIES],
+        LNG_COL: [b for _, _, _, b in EDGE_CITIES],
+        SOURCE_COL: ["geocode"] * 3,
+        PRECISION_COL: ["place"] * 3,
+    })
+    resolve(df)
+    assert df[SOURCE_COL].tolist() == ["geocode"] * 3
+    np.testing.assert_allclose(df[LAT_COL], [a for _, _, a, _ in EDGE_CITIES])
+
+
+def test_assign_only_writes_finer_locations():
+    df = pd.DataFrame({"City": ["", "", "Akron"], "State": ["OH", "OH", "OH"],
+                       LAT_COL: [40.4, np.nan, 41.08], LNG_COL: [-82.8, np.nan, -81.52],
+                       SOURCE_COL: ["gazetteer", "", "geocode"], PRECISION_COL: ["state", "", "place"],
+                       UPDATED_COL: ["2025-01-01", "", "2025-01-01"]})
+    before = df.copy()
+    # A re-run answering the same precision leaves the row and its timestamp alone
+    written = assign(df, [0, 1, 2], [40.5, 40.5, 41.1], [-82.9, -82.9, -81.6], "rerun", ["state", "state", "place"])
+    assert written.tolist() == [False, True, False]
+    assert df.drop(index=1).equals(before.drop(index=1))
+    assert assign(df, [0], 41.0, -81.0, "city", "place").tolist() == [True, False, False]
+    assert assign(df, [2], 40.0, -83.0, "force", "scatter", force=True).tolist() == [False, False, True]
+    assert df[SOURCE_COL].tolist() == ["city", "rerun", "force"]
+
+
+def test_cli_keeps_cells_it_does_not_resolve(tmp_path):
+    path = tmp_path / "pilots.csv"
+    path.write_text("Name,City,State,Found_Phone,Phone_E164,Zip,latitude,longitude,"
+                    "location_source,location_precision,location_updated\n"
+                    "Grant Hagan,Paducah,KY,(270) 729-4721,+12707294721,02134,37.08,-88.6,"
+                    "maps,place,2025-01-01T00:00:00Z\n"
+                    "Amy Lee, Kent ,oh,,,nan,,,,,\n")
+    with open(path, newline="", encoding="utf-8") as f:
+        before = list(csv.DictReader(f))
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, os.path.join(repo, "locations.py"), str(path)], cwd=repo, check=True,
+                   stdout=subprocess.DEVNULL)
+    with open(path, newline="", encoding="utf-8") as f:
+        after = list(csv.DictReader(f))
+    untouched = ["Name", "City", "State", "Found_Phone", "Phone_E164", "Zip"]
+    assert [[r[c] for c in untouched] for r in after] == [[r[c] for c in untouched] for r in before]
+    assert after[0] == before[0]         # already resolved: left exactly as it was
+    assert after[1][SOURCE_COL] == "gazetteer"
@@ -0,0 +1,54 @@
+import json
+import metrics
+from metrics import LatencyHistogram, Run, bound_text
+
+
+def test_buckets_and_percentiles():
+    h = LatencyHistogram([100, 1000])
+    for ms in (20, 100, 101, 500, 999, 1000, 1000, 5000):
+        h.record(ms)
+    # A value on a bound belongs to that bucket (le = "less than or equal")
+    assert h.counts == [2, 5, 1]
+    assert (h.percentile(25), h.percentile(50), h.percentile(87.5), h.percentile(95)) == (100, 1000, 1000, None)
+    assert LatencyHistogram().percentile(50) == 0.0
+    assert (bound_text(250), bound_text(None)) == ("<= 250ms", "> 10000ms")
+
+
+def test_json_report_is_strict_json(tmp_path):
+    run = Run("unit")
+    run.mark("read")
+    run.count("rows", 3)
+    run.count("rows")
+    run.observe("geocode_latency", 12000)   # Slower than the last bucket (a timeout)
+    run.finish(str(tmp_path))
+
+    def no_constants(name):
+        raise ValueError(f"not strict JSON: {name}")
+    with open(tmp_path / "unit.json", encoding="utf-8") as f:
+        report = json.loads(f.read(), parse_constant=no_constants)
+    assert report["run"] == "unit" and report["counters"] == {"rows": 4}
+    assert set(report["stages"]) == {"read"}
+    latency = report["histograms"]["geocode_latency"]
+    assert (latency["count"], latency["p50_ms"], latency["p95_ms"]) == (1, None, None)
+    assert latency["buckets"]["+Inf"] == 1
+
+
+def test_prometheus_text(tmp_path):
+    run = Run("unit")
+    run.count("geocode_calls", 2)
+    for ms in (40, 300, 12000):
+        run.observe("geocode_latency", ms)
+    run.finish(str(tmp_path))
+    with open(tmp_path / "unit.prom", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert "# TYPE drone_geocode_calls_total counter" in lines
+    assert 'drone_geocode_calls_total{run="unit"} 2' in lines
+    buckets = [line for line in lines if line.startswith("drone_geocode_latency_seconds_bucket")]
+    # Cumulative counts, bounds in seconds, ending at +Inf
+    assert buckets[0] == 'drone_geocode_latency_seconds_bucket{run="unit",le="0.05"} 1'
+    assert 'drone_geocode_latency_seconds_bucket{run="unit",le="0.5"} 2' in buckets
+    assert buckets[-1] == 'drone_geocode_latency_seconds_bucket{run="unit",le="+Inf"} 3'
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and len(buckets) == len(metrics.LATENCY_BUCKETS_MS) + 1
+    assert 'drone_geocode_latency_seconds_sum{run="unit"} 12.340000' in lines
+    assert 'drone_geocode_latency_seconds_count{run="unit"} 3' in lines
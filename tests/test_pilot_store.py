@@ -0,0 +1,77 @@
+import os
+import numpy as np
+from checkpoint import write_csv_atomic
+from pilot_store import PilotStore, read_frame, resolve_columns
+
+CSV = ("First,Last,Company,Town,ST,Lat,Lng,Rating,Notes\n"
+       "Grant,Hagan,Hagan Drones,Paducah,ky,37.08,-88.6,4.5,owner\n"
+       "Amy, Lee ,,Kent,OH,nan,,,\n")
+
+
+def write_csv(tmp_path, text=CSV):
+    path = str(tmp_path / "pilots.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def test_aliases_resolve_to_canonical_names():
+    header = ["First", "Last", "Company", "Town", "ST", "Lat", "Lng", "Pilot City"]
+    assert resolve_columns(header) == {"first_name": "First", "last_name": "Last", "business": "Company",
+                                       "city": "Town", "state": "ST", "latitude": "Lat", "longitude": "Lng"}
+    assert resolve_columns(["Pilot City", "Home State"])["city"] == "Pilot City"
+
+
+def test_typed_columns(tmp_path):
+    store = PilotStore.load(write_csv(tmp_path))
+    assert store.lat.dtype == np.float64 and store["rating"].dtype == np.float64
+    assert np.isnan(store.lat[1]) and np.isnan(store["rating"][1])
+    assert store.has_location().tolist() == [True, False]
+    assert store["state"].tolist() == ["KY", "OH"]
+    assert store["name"].tolist() == ["Grant Hagan", "Amy Lee"]
+    assert store["business"].tolist() == ["Hagan Drones", ""]
+    assert store["Notes"].tolist() == ["owner", ""]   # Unknown columns ride along
+    codes, categories = store.state_codes()
+    assert codes.dtype == np.int16 and categories.tolist() == ["KY", "OH"]
+    assert store.in_state("oh").tolist() == [False, True]
+    # Written back under the directory's own spelling
+    assert list(store.to_csv_frame().columns)[:5] == ["First Name", "Last Name", "Business", "City", "State"]
+
+
+def test_snapshot_is_reused_until_the_csv_changes(tmp_path, monkeypatch):
+    path = write_csv(tmp_path)
+    first = PilotStore.load(path)
+    assert os.path.exists(path + ".npz")
+
+    def no_parsing(cls, path):
+        raise AssertionError("CSV parsed despite a current snapshot")
+    with monkeypatch.context() as m:
+        m.setattr(PilotStore, "from_csv", classmethod(no_parsing))
+        again = PilotStore.load(path)
+    assert again.source == path and list(again.columns) == list(first.columns)
+    for name, values in first.columns.items():
+        assert again[name].dtype == values.dtype
+        if values.dtype.kind == "f":
+            np.testing.assert_array_equal(again[name], values)
+        else:
+            assert again[name].tolist() == values.tolist()
+
+    write_csv(tmp_path, CSV + "Ray,Fox,,Duluth,MN,46.78,-92.1,,\n")
+    store = PilotStore.load(path)
+    assert len(store) == 3 and store["city"][2] == "Duluth"
+
+
+def test_read_frame_writes_untouched_cells_back_unchanged(tmp_path):
+    # Cleaning is for queries only: a script that edits nothing rewrites the same bytes
+    text = ("Name,First Name,Business,City,State,Rating,Found_Phone,Phone_E164,latitude,longitude\n"
+            "Grant Hagan, Grant,Hagan Drones ,Paducah,ky,5,(270) 729-4721,+12707294721,37.08,-88.6\n"
+            "Amy Lee,Amy,nan,Kent,OH,,,,,\n")
+    path = write_csv(tmp_path, text)
+    store = PilotStore.load(path)
+    assert store["business"].tolist() == ["Hagan Drones", ""] and store["state"].tolist() == ["KY", "OH"]
+    for _ in range(2):   # from the CSV, then from the snapshot
+        df = read_frame(path)
+        assert df["latitude"].dtype == np.float64
+        write_csv_atomic(df, path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == text
@@ -0,0 +1,72 @@
+import os
+import pandas as pd
+import pytest
+import pipeline
+from enrich_contacts import enrich
+from pipeline import Stage, run
+
+calls = []
+
+
+def source(inputs, params):
+    calls.append("source")
+    return pd.read_csv(params["csv"])
+
+
+def double(inputs, params):
+    calls.append("double")
+    with open("out.txt", "w") as f:
+        f.write("done")
+    return inputs["source"] * params["factor"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "CACHE_DIR", ".pipeline")
+    monkeypatch.setattr(pipeline, "STATE_FILE", os.path.join(".pipeline", "state.json"))
+    monkeypatch.setattr(pipeline, "_state", None)
+    pd.DataFrame({"x": [1, 2]}).to_csv("in.csv", index=False)
+    calls.clear()
+    return tmp_path
+
+
+def stages(factor=2):
+    return [Stage("source", source, params={"csv": "in.csv", "input": pipeline.file_key("in.csv")}),
+            Stage("double", double, ["source"], outputs=("out.txt",), params={"factor": factor})]
+
+
+def test_second_run_is_all_cached(workdir):
+    assert run(stages(), verbose=False)[0] == {"source": "ran", "double": "ran"}
+    assert run(stages(), verbose=False)[0] == {"source": "cached", "double": "cached"}
+    assert calls == ["source", "double"]
+    assert pipeline.read_output("double", pipeline.load_state())["x"].tolist() == [2, 4]
+
+
+def test_changes_invalidate_only_downstream(workdir):
+    run(stages(), verbose=False)
+    calls.clear()
+    # A new parameter re-runs that stage alone
+    assert run(stages(factor=3), verbose=False)[0] == {"source": "cached", "double": "ran"}
+    # A changed input re-runs everything that reads it
+    pd.DataFrame({"x": [5]}).to_csv("in.csv", index=False)
+    assert run(stages(factor=3), verbose=False)[0] == {"source": "ran", "double": "ran"}
+    # A missing promised output re-runs its stage
+    os.remove("out.txt")
+    assert run(stages(factor=3), verbose=False)[0] == {"source": "cached", "double": "ran"}
+    assert calls == ["double", "source", "double", "double"]
+    # --force takes everything downstream along
+    assert run(stages(factor=3), force=["source"], dry_run=True, verbose=False)[0] == \
+        {"source": "would run", "double": "would run"}
+
+
+def test_clean_and_images_tolerate_missing_columns(workdir, monkeypatch):
+    import images
+    df = pd.DataFrame({"Business": ["Sky Eye"], "State": ["oh"]})
+    assert enrich(df.copy(), verbose=False)["rows"] == 1
+    assert pipeline.clean_stage({"load": df}, {})["State"].tolist() == ["OH"]
+    seen = []
+    monkeypatch.setattr(images, "process", lambda urls, **kw: seen.append(list(urls)) or dict.fromkeys(
+        ("urls", "fetched", "failed", "converted", "ready"), 0))
+    pipeline.images_stage({"load": df}, {"jobs": 1})
+    assert seen == [[""]]
@@ -0,0 +1,61 @@
+import pandas as pd
+import scatter
+from pilot_store import PilotStore
+from slug_registry import SlugRegistry
+
+
+def test_frame_slugs_match_the_builders_slugs(tmp_path):
+    # Same pilot twice (shared profile link), a name-only slug, and a name clash
+    df = pd.DataFrame({
+        "First Name": ["Grant", "Grant", "Josh", "Josh"],
+        "Last Name": ["Hagan", "Hagan", "Cooper", "Cooper"],
+        "City": ["", "Paducah", "", "Austin"],
+        "State": ["KY", "KY", "TX", "MN"],
+        "Profile Link": ["https://x/pilot/grant", "https://x/pilot/grant/", "https://x/pilot/josh", "https://x/pilot/jc"],
+    })
+    csv = tmp_path / "pilots.csv"
+    df.to_csv(csv, index=False)
+    registry = SlugRegistry(path=str(tmp_path / "slugs.json"))
+    slugs = scatter.frame_slugs(df, registry)
+    assert registry.slugs == {}   # looking slugs up doesn't claim them
+
+    pages, _ = registry.assign(list(PilotStore.from_csv(str(csv)).rows()))
+    assert slugs == ["grant-hagan", "grant-hagan", "josh-cooper", "josh-cooper-mn"]
+    assert all(slugs[i] == slug for slug, i in pages)
+
+
+def co_located(n=40):
+    # n pilots on the Kentucky centroid, n more on a town by the Ohio river
+    from gazetteer import STATE_CENTERS
+    lat = [STATE_CENTERS["KY"][0]] * n + [37.0834] * n
+    lng = [STATE_CENTERS["KY"][1]] * n + [-88.6] * n
+    precision = ["state"] * n + ["place"] * n
+    slugs = [f"pilot-{i}" for i in range(2 * n)]
+    return lat, lng, slugs, ["KY"] * (2 * n), precision
+
+
+def test_displace_is_deterministic_per_slug():
+    lat, lng, slugs, states, precision = co_located()
+    first = scatter.displace(lat, lng, slugs, states, precision)
+    again = scatter.displace(lat, lng, slugs, states, precision)
+    assert all((a == b).all() for a, b in zip(first, again))
+    # Row order doesn't matter: a pilot's spot depends on its slug
+    flip = slice(None, None, -1)
+    flipped = scatter.displace(lat[flip], lng[flip], slugs[flip], states[flip], precision[flip])
+    assert (flipped[0][flip] == first[0]).all() and (flipped[1][flip] == first[1]).all()
+
+
+def test_pins_sharing_a_point_do_not_coincide():
+    lat, lng, slugs, states, precision = co_located()
+    out_lat, out_lng = scatter.displace(lat, lng, slugs, states, precision)
+    points = set(zip(out_lat.round(5), out_lng.round(5)))
+    assert len(points) == len(slugs)
+    # One pin of each group stays on the point itself
+    assert (lat[0], lng[0]) in zip(out_lat, out_lng) and (lat[-1], lng[-1]) in zip(out_lat, out_lng)
+
+
+def test_scattered_pins_stay_in_their_state():
+    from locations import in_claimed_state
+    lat, lng, slugs, states, precision = co_located(200)
+    out_lat, out_lng = scatter.displace(lat, lng, slugs, states, precision)
+    assert in_claimed_state(out_lat, out_lng, states).all()
@@ -0,0 +1,64 @@
+import math
+import numpy as np
+import search_index
+from search_index import build_files, search, score_doc, miles, cell_miles, synthetic_docs, FIELDS, MIN_PREFIX, tokenize
+from spatial_index import geohash_bounds
+
+QUERIES = ("john smith", "jo smith", "smith", "jo", "thermal oh", "cedarville", "mi mi", "zz", "s")
+ORIGINS = ((30.4, -87.2), (47.6, -122.3), (52.0, 179.5), (None, None))
+
+
+def corpus(n=5000):
+    # Synthetic pilots, every tenth one without a pin
+    docs = synthetic_docs(n)
+    for doc in docs[::10]:
+        doc["lat"] = doc["lng"] = None
+    return docs
+
+
+def brute_force(docs, query, lat, lng):
+    terms = [t for t in tokenize(query) if len(t) >= MIN_PREFIX]
+    out = []
+    for doc in docs:
+        pin = (None, None) if doc["lat"] is None else (round(doc["lat"], 4), round(doc["lng"], 4))
+        row = [doc[f] for f in FIELDS] + [doc["slug"], *pin]
+        score = score_doc(row, terms) if terms else 0
+        if score:
+            out.append((score, math.inf if lat is None or pin[0] is None else miles(lat, lng, *pin), row[4]))
+    return sorted(out, key=lambda r: (-r[0], r[1]))
+
+
+def check(files, docs):
+    for query in QUERIES:
+        for lat, lng in ORIGINS:
+            expected = brute_force(docs, query, lat, lng)
+            found = search(files.get, query, lat, lng, limit=None)
+            assert sorted(doc[4] for _, _, doc in found) == sorted(slug for _, _, slug in expected), query
+            # Top results: same scores and distances (order within exact ties is free)
+            top = search(files.get, query, lat, lng)
+            assert [(s, m) for s, m, _ in top] == [(s, m) for s, m, _ in expected[:search_index.RESULTS]], query
+
+
+def test_search_matches_brute_force():
+    docs = corpus()
+    check(build_files(docs), docs)
+
+
+def test_split_postings_match_brute_force(monkeypatch):
+    # Every posting list over 5 pilots moves out to per-area files
+    monkeypatch.setattr(search_index, "PREFIX_CAP", 5)
+    monkeypatch.setattr(search_index, "UNLOCATED_CHUNK", 50)
+    docs = corpus(2000)
+    files = build_files(docs)
+    assert any("/" in name and not name.startswith("docs/") for name in files)
+    check(files, docs)
+
+
+def test_cell_miles_is_a_lower_bound():
+    rng = np.random.default_rng(5)
+    for cell in ("dpq", "9q8", "b0", "zb", "dr5r"):
+        south, north, west, east = geohash_bounds(cell)
+        inside = list(zip(rng.uniform(south, north, 200), rng.uniform(west, east, 200)))
+        for lat, lng in zip(rng.uniform(-80, 80, 50), rng.uniform(-180, 180, 50)):
+            near = cell_miles(lat, lng, cell)
+            assert near <= min(miles(lat, lng, a, b) for a, b in inside) + 1e-9
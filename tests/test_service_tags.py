@@ -0,0 +1,32 @@
+import pytest
+from service_tags import classify
+
+# Words that only contain a keyword: none of them should earn a tag
+FALSE_POSITIVES = [
+    ("Crihfield Aerial", ""),
+    ("Springfield Drones", ""),
+    ("", "Available immediately."),
+    ("Buckeye Sky Services", ""),
+    ("Huntington Aerial", ""),
+    ("", "Handles troubleshooting for clients."),
+]
+
+
+@pytest.mark.parametrize("business,bio", FALSE_POSITIVES)
+def test_keywords_inside_other_words_do_not_match(business, bio):
+    assert classify(business, bio) == set()
+
+
+def test_sacred_hunting_ground_is_thermal_not_agriculture():
+    # "hunting" is a real keyword; "acre" inside "sacred" is not
+    assert classify("", "We treat every sacred hunting ground with respect.") == {"thermal"}
+
+
+def test_whole_words_match():
+    assert classify("Buck Hunt Recovery", "") == {"thermal"}
+    assert classify("", "Crop spraying on 400 acres, aerial photos and video.") == {"agriculture", "photo"}
+    assert classify("", "Roof inspections and LiDAR mapping") == {"mapping"}
+
+
+def test_directory_url_is_not_a_keyword_source():
+    assert classify("", "Listed at https://www.dronedeerrecovery.com/thermal-deer-recovery/grant") == set()
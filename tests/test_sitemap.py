@@ -0,0 +1,17 @@
+import sitemap
+
+DOMAIN = "https://example.com/site"
+
+
+def test_lastmods_round_trip_through_sharded_sitemaps(tmp_path):
+    # Three shards plus a <sitemapindex>: every page's date comes back
+    entries = [("index.html", "2025-01-02")] + [(f"pilot/p{i}&x.html", f"2025-02-0{i}") for i in range(1, 5)]
+    writer = sitemap.SitemapWriter(DOMAIN, str(tmp_path), max_urls=2)
+    for path, lastmod in entries:
+        writer.add(path, lastmod)
+    assert writer.close() == 3
+    assert sitemap.read_lastmods(DOMAIN, str(tmp_path)) == dict(entries)
+
+
+def test_no_sitemap_means_no_dates(tmp_path):
+    assert sitemap.read_lastmods(DOMAIN, str(tmp_path)) == {}
@@ -0,0 +1,59 @@
+import os
+import build_site
+from slug_registry import SlugRegistry
+
+
+def pilot(first, last, city="", state="", link="", phone="", bio=""):
+    return {"first_name": first, "last_name": last, "city": city, "state": state,
+            "profile_link": link, "phone": phone, "bio": bio}
+
+
+def test_slugs_are_stable_across_builds(tmp_path):
+    path = str(tmp_path / "slugs.json")
+    rows = [pilot("John", "Smith", "Akron", "OH"), pilot("Amy", "Lee", "Kent", "OH")]
+    registry = SlugRegistry.load(path)
+    pages, _ = registry.assign(rows)
+    assert registry.save() is True
+    assert pages == [("john-smith", 0), ("amy-lee", 1)]
+
+    # A second John Smith arrives and is listed first: the first one keeps his URL
+    rows = [pilot("John", "Smith", "Austin", "TX")] + rows
+    registry = SlugRegistry.load(path)
+    pages, _ = registry.assign(rows)
+    assert sorted(pages) == [("amy-lee", 2), ("john-smith", 1), ("john-smith-tx", 0)]
+    registry.save()
+
+    # Nothing changed: the file is not rewritten
+    mtime = os.stat(path).st_mtime_ns
+    registry = SlugRegistry.load(path)
+    registry.assign(rows)
+    assert registry.save() is False and os.stat(path).st_mtime_ns == mtime
+
+
+def test_duplicates_merge_into_the_most_complete_row(tmp_path):
+    registry = SlugRegistry(path=str(tmp_path / "slugs.json"))
+    rows = [pilot("Grant", "Hagan", state="KY", link="https://www.dronedeerrecovery.com/pilot/grant"),
+            pilot("Grant", "Hagan", "Paducah", "KY", link="http://dronedeerrecovery.com/pilot/grant/",
+                  bio="Thermal deer recovery"),
+            pilot("Grant", "Hagan", "Murray", "ky", phone="270-729-4721"),
+            # Same shared phone, different person: not merged
+            pilot("Ray", "Fox", "Murray", "KY", phone="(270) 729-4721")]
+    pages, duplicates = registry.assign(rows)
+    assert pages == [("grant-hagan", 1), ("ray-fox", 3)]
+    assert duplicates == 2
+
+
+def test_old_slugs_redirect_to_the_page(tmp_path, monkeypatch):
+    registry = SlugRegistry(path=str(tmp_path / "slugs.json"))
+    rows = [pilot("John", "Smith", "Akron", "OH")]
+    registry.assign(rows)
+    # The name-city-state page earlier builders wrote now points at the short slug
+    assert registry.redirects == {"john-smith-akron-oh": "john-smith"}
+
+    monkeypatch.chdir(tmp_path)
+    os.mkdir(build_site.PAGES_DIR)
+    build_site.write_redirects(registry.redirects)
+    with open(build_site.REDIRECTS_FILE, encoding="utf-8") as f:
+        assert f.read() == "/pilot/john-smith-akron-oh.html /pilot/john-smith.html 301\n"
+    with open(os.path.join(build_site.PAGES_DIR, "john-smith-akron-oh.html"), encoding="utf-8") as f:
+        assert 'url=john-smith.html"' in f.read()
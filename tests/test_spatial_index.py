@@ -0,0 +1,54 @@
+import json
+import os
+import numpy as np
+from cluster_tiles import synthetic_pilots
+from spatial_index import PilotIndex, load_pilots, haversine_km, geohash, write_buckets, cell_size, BUCKET_PRECISION
+
+
+def queries(n=100, seed=3):
+    rng = np.random.default_rng(seed)
+    return zip(rng.uniform(25, 49, n), rng.uniform(-124, -67, n))
+
+
+def test_radius_matches_brute_force():
+    lat, lng = synthetic_pilots(5000)
+    index = PilotIndex(lat, lng)
+    for qlat, qlng in queries():
+        for km in (10, 50, 250):
+            ids, dist = index.radius(qlat, qlng, km)
+            brute = np.flatnonzero(haversine_km(qlat, qlng, lat, lng) <= km)
+            assert sorted(ids.tolist()) == brute.tolist()
+            assert np.all(np.diff(dist) >= 0)
+
+
+def test_nearest_matches_brute_force():
+    lat, lng = synthetic_pilots(5000)
+    index = PilotIndex(lat, lng)
+    for qlat, qlng in queries():
+        ids, dist = index.nearest(qlat, qlng, k=5)
+        brute = np.sort(haversine_km(qlat, qlng, lat, lng))[:5]
+        np.testing.assert_allclose(dist, brute)
+
+
+def test_bucket_holds_everyone_within_a_cell(tmp_path):
+    # Find Near Me only fetches the bucket of the visitor's own cell
+    lat, lng = synthetic_pilots(3000)
+    out = tmp_path / "near"
+    write_buckets(lat, lng, out_dir=str(out))
+    reach_km = min(cell_size(BUCKET_PRECISION)) * 111.0 * np.cos(np.radians(49))
+    for qlat, qlng in queries(50):
+        path = os.path.join(out, geohash(qlat, qlng) + ".json")
+        bucket = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                bucket = {e[2] for e in json.load(f)}
+        close = np.flatnonzero(haversine_km(qlat, qlng, lat, lng) <= reach_km)
+        assert set(close.tolist()) <= bucket
+
+
+def test_load_pilots_resolves_aliased_headers(tmp_path):
+    path = tmp_path / "pilots.csv"
+    path.write_text("First,Last,ST,Lat,Lng\nGrant,Hagan,ky,37.08,-88.6\nAmy,Lee,OH,nan,\n")
+    names, lats, lngs = load_pilots(str(path))
+    assert names == ["Grant Hagan (KY)"]
+    assert lats.tolist() == [37.08] and lngs.tolist() == [-88.6]
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from stream_csv import stream
+
+
+def pilots(n=23):
+    places = [("Akron", "OH"), ("Austin", "TX"), ("Dayton", "OH")]
+    return pd.DataFrame({
+        "Name": [f"Pilot {i}" for i in range(n)],
+        "City": [places[i % 3][0] for i in range(n)],
+        "State": [places[i % 3][1] for i in range(n)],
+    })
+
+
+def shout(chunk):
+    # A stage that adds a column, so the header has to come from the stages too
+    chunk["Loud"] = chunk["City"].str.upper()
+    return chunk
+
+
+@pytest.mark.parametrize("chunksize", [1, 4, 23, 1000])
+def test_chunked_output_matches_a_single_pass(tmp_path, chunksize):
+    src = tmp_path / "pilots.csv"
+    pilots().to_csv(src, index=False)
+    stream(src, tmp_path / "whole.csv", [shout], chunksize=10 ** 6, verbose=False)
+    report = stream(src, tmp_path / "chunked.csv", [shout], chunksize=chunksize, verbose=False)
+    assert report["rows"] == 23
+    assert (tmp_path / "chunked.csv").read_bytes() == (tmp_path / "whole.csv").read_bytes()
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "chunked.csv"), shout(pilots()))
+
+
+def test_empty_input_writes_only_the_header(tmp_path):
+    src = tmp_path / "empty.csv"
+    pilots(0).to_csv(src, index=False)
+    report = stream(src, tmp_path / "out.csv", [shout], chunksize=4, verbose=False)
+    assert report["rows"] == 0
+    assert (tmp_path / "out.csv").read_text().splitlines() == ["Name,City,State,Loud"]
+
+
+def test_rewrites_the_input_in_place(tmp_path):
+    src = tmp_path / "pilots.csv"
+    pilots().to_csv(src, index=False)
+    stream(src, src, [shout], chunksize=4, verbose=False)
+    pd.testing.assert_frame_equal(pd.read_csv(src), shout(pilots()))
+    # The temp file was renamed over the input, not left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["pilots.csv"]
+
+
+def test_a_failing_stage_leaves_the_output_untouched(tmp_path):
+    src = tmp_path / "pilots.csv"
+    pilots().to_csv(src, index=False)
+    before = src.read_bytes()
+
+    def broken(chunk):
+        raise RuntimeError("stage failed")
+    with pytest.raises(RuntimeError):
+        stream(src, src, [broken], chunksize=4, verbose=False)
+    assert src.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["pilots.csv"]
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 1000])
+def test_cells_come_back_as_written(tmp_path, chunksize):
+    # Phone numbers, ZIPs and blanks must not be re-typed chunk by chunk
+    src = tmp_path / "pilots.csv"
+    text = ("Name,Found_Phone,Phone_E164,Zip,latitude\n"
+            "Pilot 0,(270) 729-4721,+12707294721,02134,37.08\n"
+            "Pilot 1,,,,\n"
+            "Pilot 2,2707294721,+12707294722,40601,nan\n")
+    src.write_text(text)
+    stream(src, tmp_path / "out.csv", [], chunksize=chunksize, verbose=False)
+    assert (tmp_path / "out.csv").read_text() == text